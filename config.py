@@ -1,239 +1,318 @@
-#!/usr/bin/env python3
-"""
-config.py
-
-Configurazioni e costanti dell'applicazione PyEditor.
-"""
-
-from PySide6.QtGui import QColor
-
-# --------------------------- UI Constants ---------------------------
-
-class UIConfig:
-    """Costanti per l'interfaccia utente."""
-    
-    # Colori
-    BG_COLOR = QColor(15, 20, 25)
-    TRACK_BG = QColor(24, 28, 34)
-    AUDIO_BG = QColor(20, 24, 28)
-    SELECTED_COLOR = QColor(40, 46, 54)
-    HOVER_COLOR = QColor(34, 40, 48)
-    BASE_COLOR = QColor(30, 34, 40)
-    PLAYHEAD_COLOR = QColor(0, 180, 220)
-    
-    # Dimensioni Timeline
-    BASE_PX_PER_SEC = 100.0
-    RULER_HEIGHT = 2
-    TRACK_HEIGHT_VIDEO = 60
-    TRACK_HEIGHT_AUDIO = 60
-    PADDING = 0
-    GAP = 0
-    
-    # Clip Graphics
-    CLIP_RADIUS = 8
-    HANDLE_WIDTH = 8
-    MIN_CLIP_DURATION = 0.2
-    
-    # Preview
-    THUMBNAIL_WIDTH = 240
-    THUMBNAIL_COUNT = 6
-    WAVEFORM_SIZE = (1000, 100)
-
-
-class FFmpegConfig:
-    """Configurazioni per FFmpeg."""
-    
-    PRESET = "fast"
-    CRF = 20
-    AUDIO_BITRATE = "192k"
-    VOLUME_BG_MUSIC = 0.6
-    CROSSFADE_DURATION = 1.0
-
-
-class AppConfig:
-    """Configurazioni generali dell'applicazione."""
-    
-    WINDOW_TITLE = "PyEditor — Timeline Interattiva"
-    WINDOW_WIDTH = 1300
-    WINDOW_HEIGHT = 860
-    
-    # Threading
-    MAX_PREVIEW_THREADS = 3
-    THROTTLE_INTERVAL_MS = 16  # ~60 FPS
-    SEEK_THROTTLE_MS = 10
-    
-    # File extensions
-    VIDEO_EXTENSIONS = [".mp4", ".mov", ".mkv", ".avi", ".webm"]
-    AUDIO_EXTENSIONS = [".mp3", ".wav", ".aac", ".m4a", ".ogg"]
-    IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
-
-
-# --------------------------- Dark Theme QSS ---------------------------
-
-DARK_THEME_QSS = """
-QMainWindow { background-color: #0f161b; color: #e6eef6; }
-QWidget { color: #e6eef6; font-family: 'Segoe UI', Roboto, Arial; font-size: 9pt; }
-
-/* General controls */
-QPushButton {
-    background: transparent;
-    color: #e6eef6;
-    border: 1px solid rgba(255,255,255,0.04);
-    border-radius: 6px;
-    padding: 6px 8px;
-    min-height: 28px;
-    font-size: 9pt;
-    font-weight: 600;
-}
-QPushButton:hover {
-    background: rgba(255,255,255,0.02);
-}
-QPushButton[primary="true"] {
-    background: qlineargradient(spread:pad, x1:0, y1:0, x2:1, y2:0, stop:0 #00b4d6, stop:1 #00e0ff);
-    color: #042026;
-    border: none;
-}
-QPushButton[secondary="true"] {
-    background: rgba(255,255,255,0.02);
-}
-
-/* Toolbar buttons: compact */
-QFrame#toolbar QPushButton {
-    padding: 4px 6px;
-    min-height: 24px;
-    font-size: 8pt;
-    font-weight: 600;
-}
-
-/* Tools panel buttons: larger and more prominent */
-QWidget#toolsPanel QPushButton {
-    padding: 6px 8px;
-    min-height: 30px;
-    font-size: 9pt;
-    font-weight: 600;
-    border-radius: 8px;
-}
-
-/* Inputs */
-QLineEdit, QComboBox, QSpinBox, QTextEdit {
-    background: #0b1114;
-    border: 1px solid rgba(255,255,255,0.04);
-    padding: 6px 8px;
-    border-radius: 6px;
-    color: #e6eef6;
-}
-
-/* Lists */
-QListWidget {
-    background: transparent;
-    border: none;
-}
-QListWidget::item {
-    padding: 10px;
-    margin: 4px 8px;
-    border-radius: 8px;
-}
-QListWidget::item:selected {
-    background: rgba(0,180,220,0.12);
-    color: #e6eef6;
-}
-
-/* Toolbar */
-QFrame#toolbar {
-    background: transparent;
-    border-bottom: 1px solid rgba(255,255,255,0.02);
-    padding: 8px 12px;
-}
-
-/* Menus */
-QMenu {
-    background-color: #0b1114;
-    border: 1px solid rgba(255,255,255,0.04);
-    color: #e6eef6;
-}
-QMenu::item:selected { background-color: rgba(0,180,220,0.10); }
-
-/* Subtle headings and labels */
-QLabel { color: rgba(230,238,246,0.86); font-size: 8pt; font-weight: 400; }
-
-/* ==================== SCROLLBAR STYLING ==================== */
-
-/* Scrollbar verticale */
-QScrollBar:vertical {
-    background: rgba(15, 20, 25, 0.3);
-    width: 12px;
-    margin: 0px;
-    border-radius: 6px;
-}
-
-QScrollBar::handle:vertical {
-    background: rgba(100, 120, 140, 0.4);
-    min-height: 30px;
-    border-radius: 6px;
-    margin: 2px;
-}
-
-QScrollBar::handle:vertical:hover {
-    background: rgba(120, 140, 160, 0.6);
-}
-
-QScrollBar::handle:vertical:pressed {
-    background: rgba(0, 180, 220, 0.7);
-}
-
-QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-    height: 0px;
-    background: none;
-}
-
-QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-    background: none;
-}
-
-/* Scrollbar orizzontale */
-QScrollBar:horizontal {
-    background: rgba(15, 20, 25, 0.3);
-    height: 12px;
-    margin: 0px;
-    border-radius: 6px;
-}
-
-QScrollBar::handle:horizontal {
-    background: rgba(100, 120, 140, 0.4);
-    min-width: 30px;
-    border-radius: 6px;
-    margin: 2px;
-}
-
-QScrollBar::handle:horizontal:hover {
-    background: rgba(120, 140, 160, 0.6);
-}
-
-QScrollBar::handle:horizontal:pressed {
-    background: rgba(0, 180, 220, 0.7);
-}
-
-QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-    width: 0px;
-    background: none;
-}
-
-QScrollBar::add-page:horizontal, QScrollBar::sub-page:horizontal {
-    background: none;
-}
-
-/* ScrollArea styling */
-QScrollArea {
-    background: transparent;
-    border: none;
-}
-
-QScrollArea > QWidget > QWidget {
-    background: transparent;
-}
-
-/* Corner widget tra scrollbar verticale e orizzontale */
-QScrollBar::corner {
-    background: transparent;
-}
-"""
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+config.py
+
+Configurazioni e costanti dell'applicazione PyEditor.
+"""
+
+import os
+import subprocess
+from functools import lru_cache
+
+# --------------------------- UI Constants ---------------------------
+
+class _LazyUIConfigMeta(type):
+    """
+    Metaclass che crea QColor/QBrush al primo accesso.
+
+    Importare QtGui a livello di modulo caricherebbe la libreria C++
+    anche per gli usi headless di config (export da CLI, script): qui
+    l'import avviene solo quando un attributo colore/brush viene letto,
+    e il valore viene poi cache-ato sulla classe, quindi il paint path
+    paga un normale lookup di attributo.
+    """
+
+    # Specifiche RGB dei colori, senza toccare Qt
+    _COLOR_SPECS = {
+        "BG_COLOR": (15, 20, 25),
+        "TRACK_BG": (24, 28, 34),
+        "AUDIO_BG": (20, 24, 28),
+        "SELECTED_COLOR": (40, 46, 54),
+        "HOVER_COLOR": (34, 40, 48),
+        "BASE_COLOR": (30, 34, 40),
+        "PLAYHEAD_COLOR": (0, 180, 220),
+    }
+
+    # Brush pre-costruiti: il paint() dei clip gira a ogni repaint e
+    # riusarli evita un'allocazione QBrush(QColor) per frame
+    _BRUSH_SPECS = {
+        "BG_BRUSH": "BG_COLOR",
+        "TRACK_BRUSH": "TRACK_BG",
+        "AUDIO_BRUSH": "AUDIO_BG",
+        "SELECTED_BRUSH": "SELECTED_COLOR",
+        "HOVER_BRUSH": "HOVER_COLOR",
+        "BASE_BRUSH": "BASE_COLOR",
+        "PLAYHEAD_BRUSH": "PLAYHEAD_COLOR",
+    }
+
+    def __getattr__(cls, name):
+        if name in cls._COLOR_SPECS:
+            from PySide6.QtGui import QColor
+            value = QColor(*cls._COLOR_SPECS[name])
+        elif name in cls._BRUSH_SPECS:
+            from PySide6.QtGui import QBrush
+            value = QBrush(getattr(cls, cls._BRUSH_SPECS[name]))
+        else:
+            raise AttributeError(name)
+
+        # Cache sulla classe: i lookup successivi non passano di qui
+        setattr(cls, name, value)
+        return value
+
+
+class UIConfig(metaclass=_LazyUIConfigMeta):
+    """Costanti per l'interfaccia utente."""
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def brush_for(role: str) -> "QBrush":
+        """
+        Ritorna il brush pre-costruito per un ruolo colore.
+
+        Args:
+            role: Uno tra 'bg', 'track', 'audio', 'selected', 'hover',
+                'base', 'playhead'
+
+        Returns:
+            QBrush condiviso per il ruolo richiesto
+        """
+        return {
+            "bg": UIConfig.BG_BRUSH,
+            "track": UIConfig.TRACK_BRUSH,
+            "audio": UIConfig.AUDIO_BRUSH,
+            "selected": UIConfig.SELECTED_BRUSH,
+            "hover": UIConfig.HOVER_BRUSH,
+            "base": UIConfig.BASE_BRUSH,
+            "playhead": UIConfig.PLAYHEAD_BRUSH,
+        }[role]
+
+    # Dimensioni Timeline
+    BASE_PX_PER_SEC = 100.0
+    RULER_HEIGHT = 2
+    TRACK_HEIGHT_VIDEO = 60
+    TRACK_HEIGHT_AUDIO = 60
+    PADDING = 0
+    GAP = 0
+    
+    # Clip Graphics
+    CLIP_RADIUS = 8
+    HANDLE_WIDTH = 8
+    MIN_CLIP_DURATION = 0.2
+    
+    # Viewport OpenGL per la timeline (opt-in). Per una scena 2D di
+    # rettangoli e linee il backend raster e' spesso piu' veloce sulle
+    # GPU integrate: l'upload di pixmap e testo come texture a ogni frame
+    # costa piu' dei repaint parziali raster, che sfruttano gia' la
+    # QPixmapCache nativa e i drawLines raggruppati
+    USE_OPENGL = os.environ.get("PYEDITOR_OPENGL", "") == "1"
+
+    # Accelerazione hardware nelle preview: decode dei thumbnail con
+    # -hwaccel auto ed encode dei proxy con l'encoder rilevato da
+    # FFmpegConfig. Disattivabile con PYEDITOR_HW_PREVIEW=0 se il driver
+    # crea problemi
+    HW_PREVIEW = os.environ.get("PYEDITOR_HW_PREVIEW", "1") != "0"
+
+    # Preview
+    THUMBNAIL_WIDTH = 240
+    THUMBNAIL_COUNT = 6
+    WAVEFORM_SIZE = (1000, 100)
+
+
+# Cache del rilevamento encoder: eseguito una sola volta per processo
+_detected_encoder = None
+
+
+class FFmpegConfig:
+    """Configurazioni per FFmpeg."""
+
+    PRESET = "fast"
+    CRF = 20
+    AUDIO_BITRATE = "192k"
+    VOLUME_BG_MUSIC = 0.6
+    CROSSFADE_DURATION = 1.0
+
+    # Se True l'export renderizza dai proxy invece che dai sorgenti:
+    # decodifica molto piu' leggera, ma la qualita' finale e' limitata
+    # a quella del proxy (compromesso tipico degli NLE)
+    EXPORT_FROM_PROXY = False
+
+    # Tuning x264 per i clip corti tipici della timeline: sliced threading
+    # satura i core senza la coda di latenza del frame threading e con
+    # meno RAM di lookahead
+    X264_EXTRA_PARAMS = "sliced-threads=1:rc-lookahead=10"
+
+    # Encoder hardware provati in ordine di preferenza; fallback software.
+    # h264_vaapi e' escluso: richiede -vaapi_device e una catena
+    # format=nv12,hwupload che i comandi di export non emettono, quindi
+    # rifiuterebbe sempre i frame software
+    HW_ENCODERS = (
+        "h264_nvenc",
+        "h264_qsv",
+        "h264_videotoolbox",
+    )
+
+    @classmethod
+    def detect_encoder(cls) -> str:
+        """
+        Rileva il miglior encoder H.264 disponibile.
+
+        Interroga `ffmpeg -encoders` una sola volta (il risultato e' messo
+        in cache a livello di modulo) e sceglie il primo encoder hardware
+        che supera un encode di prova, con libx264 come fallback.
+
+        Returns:
+            Nome dell'encoder da usare
+        """
+        global _detected_encoder
+
+        if _detected_encoder is not None:
+            return _detected_encoder
+
+        _detected_encoder = "libx264"
+
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-encoders"],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            if result.returncode == 0:
+                for encoder in cls.HW_ENCODERS:
+                    if encoder in result.stdout and cls._encoder_works(encoder):
+                        _detected_encoder = encoder
+                        break
+        except Exception:
+            pass
+
+        return _detected_encoder
+
+    @staticmethod
+    def _encoder_works(encoder: str) -> bool:
+        """
+        Verifica l'encoder con un encode di prova da un frame.
+
+        Essere elencato da `ffmpeg -encoders` significa solo che il
+        supporto e' compilato: le build di distro e quelle statiche
+        elencano nvenc/qsv anche senza GPU o driver. Un frame nero via
+        lavfi smaschera l'hardware mancante senza toccare file.
+
+        Args:
+            encoder: Nome dell'encoder da provare
+
+        Returns:
+            True se l'encode di prova riesce
+        """
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-v", "error",
+                 "-f", "lavfi", "-i", "color=black:s=64x64",
+                 "-frames:v", "1", "-c:v", encoder, "-f", "null", "-"],
+                capture_output=True,
+                timeout=15
+            )
+            return result.returncode == 0
+        except Exception:
+            return False
+
+    @classmethod
+    def video_encoder_args(cls, preset: str = None, crf: int = None) -> list:
+        """
+        Costruisce gli argomenti video per l'encoder rilevato.
+
+        Args:
+            preset: Preset x264 (default: FFmpegConfig.PRESET)
+            crf: Qualita' CRF/CQ (default: FFmpegConfig.CRF)
+
+        Returns:
+            Lista di argomenti ffmpeg per la codifica video
+        """
+        preset = preset if preset is not None else cls.PRESET
+        crf = crf if crf is not None else cls.CRF
+
+        encoder = cls.detect_encoder()
+
+        if encoder == "h264_nvenc":
+            return ["-c:v", "h264_nvenc", "-preset", "p4",
+                    "-rc", "vbr", "-cq", str(crf)]
+        if encoder == "h264_qsv":
+            return ["-c:v", "h264_qsv", "-global_quality", str(crf)]
+        if encoder == "h264_videotoolbox":
+            return ["-c:v", "h264_videotoolbox", "-b:v", "8M"]
+
+        return cls.software_encoder_args(preset, crf)
+
+    @classmethod
+    def software_encoder_args(cls, preset: str = None, crf: int = None) -> list:
+        """
+        Argomenti video per l'encode software libx264.
+
+        Usati come tail di video_encoder_args e come secondo tentativo
+        quando l'encoder hardware rifiuta un file a runtime.
+
+        Args:
+            preset: Preset x264 (default: FFmpegConfig.PRESET)
+            crf: Qualita' CRF (default: FFmpegConfig.CRF)
+
+        Returns:
+            Lista di argomenti ffmpeg per la codifica video
+        """
+        preset = preset if preset is not None else cls.PRESET
+        crf = crf if crf is not None else cls.CRF
+
+        return ["-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+                "-x264-params", cls.X264_EXTRA_PARAMS, "-threads", "0"]
+
+
+class AppConfig:
+    """Configurazioni generali dell'applicazione."""
+    
+    WINDOW_TITLE = "PyEditor — Timeline Interattiva"
+    WINDOW_WIDTH = 1300
+    WINDOW_HEIGHT = 860
+    
+    # Chat: messaggi mantenuti in history/UI (ring buffer)
+    CHAT_HISTORY_MAX = 200
+
+    # Threading
+    MAX_PREVIEW_THREADS = 3
+    THROTTLE_INTERVAL_MS = 16  # ~60 FPS
+    # ~6 seek/sec durante lo scrubbing: oltre questa frequenza il decoder
+    # passa il tempo a cancellare decode in corso invece di mostrare frame
+    SEEK_THROTTLE_MS = 160
+    
+    # File extensions
+    VIDEO_EXTENSIONS = [".mp4", ".mov", ".mkv", ".avi", ".webm"]
+    AUDIO_EXTENSIONS = [".mp3", ".wav", ".aac", ".m4a", ".ogg"]
+    IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".bmp", ".gif"]
+
+
+# --------------------------- Dark Theme QSS ---------------------------
+
+# Cache del foglio di stile: letto dal file una sola volta per processo
+_dark_theme_cache = None
+
+
+def load_dark_theme() -> str:
+    """
+    Carica il tema scuro da resources/dark.qss.
+
+    Il file viene letto e messo in cache alla prima chiamata, cosi' Qt
+    effettua il parse del QSS una sola volta per avvio dell'applicazione.
+
+    Returns:
+        Contenuto del foglio di stile (stringa vuota se mancante)
+    """
+    global _dark_theme_cache
+
+    if _dark_theme_cache is None:
+        qss_path = os.path.join(
+            os.path.dirname(__file__), "resources", "dark.qss"
+        )
+        try:
+            with open(qss_path, "r", encoding="utf-8") as f:
+                _dark_theme_cache = f.read()
+        except OSError:
+            _dark_theme_cache = ""
+
+    return _dark_theme_cache
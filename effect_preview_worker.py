@@ -7,15 +7,37 @@ Asynchronous worker that renders an effect preview clip for a TimelineClip
 by the QMediaPlayer for accurate preview.
 """
 
+import hashlib
+import itertools
 import os
-import uuid
+import threading
+from collections import OrderedDict
 from typing import Optional
 
 from PySide6.QtCore import QObject, QRunnable, Signal, Slot
 
+from config import FFmpegConfig, UIConfig
 from models import TimelineClip
 from utils import ensure_dir, run_cmd
 
+# Cache dei preview gia' renderizzati, chiave = firma del filtergraph.
+# Evita un intero encode quando l'utente torna su parametri gia' visti.
+_preview_cache: "OrderedDict[str, str]" = OrderedDict()
+_preview_cache_lock = threading.Lock()
+_PREVIEW_CACHE_MAX = 32
+
+# Separatore cache-ato per i percorsi temporanei generati a ogni render
+_SEP = os.sep
+
+# Al piu' meta' dei core occupati da encode di effect preview: il pool
+# puo' accodare molti worker, ma i processi ffmpeg concorrenti restano
+# limitati e non strozzano thumbnails/waveform ne' la UI
+_effect_sem = threading.Semaphore(max(1, (os.cpu_count() or 2) // 2))
+
+# Nomi progressivi per le directory create qui (prefisso diverso da
+# quelle di preview_worker): la root e' gia' unica per sessione
+_fx_dir_ids = itertools.count()
+
 
 class EffectPreviewSignals(QObject):
     started = Signal(object)
@@ -29,10 +51,18 @@ class EffectPreviewWorker(QRunnable):
         self.clip = clip
         self.temp_root = temp_root
         self.lut_dir = lut_dir
+        # Il player di preview mostra ~240px: codificare alla risoluzione
+        # sorgente (anche 4K) e' lavoro sprecato, il costo encode e' ~O(pixel)
+        self.preview_width = UIConfig.THUMBNAIL_WIDTH * 3
+        # Impostato dalla GUI quando un worker piu' recente per lo stesso
+        # clip viene accodato: controllato prima di lanciare ffmpeg
+        self.cancelled = False
         self.signals = EffectPreviewSignals()
 
     @Slot()
     def run(self):
+        if self.cancelled:
+            return
         try:
             self.signals.started.emit(self.clip)
         except Exception:
@@ -42,14 +72,12 @@ class EffectPreviewWorker(QRunnable):
             # Where to store effect preview
             clip_dir = getattr(self.clip, 'preview_dir', None)
             if not clip_dir:
-                clip_dir = ensure_dir(os.path.join(self.temp_root, f"clip_{uuid.uuid4().hex}"))
+                clip_dir = ensure_dir(os.path.join(self.temp_root, f"fx_{next(_fx_dir_ids)}"))
                 try:
                     self.clip.preview_dir = clip_dir
                 except Exception:
                     pass
 
-            out_path = os.path.join(clip_dir, "effect_preview.mp4")
-
             # Build ffmpeg args
             src = self.clip.proxy_path if getattr(self.clip, 'proxy_path', None) else self.clip.media.path
             start = float(self.clip.start or 0.0)
@@ -61,73 +89,104 @@ class EffectPreviewWorker(QRunnable):
                 media_dur = getattr(self.clip.media, 'duration', None)
                 dur = max(0.1, float((media_dur - start) if media_dur else 5.0))
 
-            vf_filters = []
-            af_filters = []
+            # Velocita' (usata sia nei filtri che nella chiave di cache)
+            spd = float(getattr(self.clip, 'speed', 1.0) or 1.0)
+
+            # Cache hit: stesso sorgente e stessi parametri effetto
+            key = hashlib.blake2b(
+                repr((src, start, dur, self.clip.lut, self.clip.title,
+                      self.clip.title_size, self.clip.title_pos,
+                      spd)).encode(),
+                digest_size=16
+            ).hexdigest()
+
+            with _preview_cache_lock:
+                cached = _preview_cache.get(key)
+                if cached and os.path.exists(cached):
+                    _preview_cache.move_to_end(key)
+                    try:
+                        self.clip.effect_preview_path = cached
+                    except Exception:
+                        pass
+                    self.signals.done.emit(self.clip)
+                    return
+
+            # Un file per firma, cosi' le voci di cache restano valide
+            # anche dopo render successivi dello stesso clip
+            out_path = f"{clip_dir}{_SEP}effect_preview_{key}.mp4"
 
-            # LUT
-            if self.clip.lut and self.clip.lut != 'none':
-                lut_path = os.path.join(self.lut_dir, self.clip.lut)
-                if os.path.exists(lut_path):
-                    vf_filters.append(f"lut3d=file='{lut_path}'")
+            vf_filters = []
 
-            # Title (drawtext)
-            if getattr(self.clip, 'title', ''):
-                text_esc = str(self.clip.title).replace("'", "\\'")
+            # Downscale come primo filtro, cosi' LUT e drawtext lavorano
+            # gia' sui pixel ridotti
+            if getattr(self.clip.media, 'type', 'video') != 'audio':
                 vf_filters.append(
-                    f"drawtext=text='{text_esc}':fontcolor=white:fontsize={int(self.clip.title_size)}:x={self.clip.title_pos}:y=(h-{int(self.clip.title_size)}-40):shadowcolor=black:shadowx=2:shadowy=2"
+                    f"scale={self.preview_width}:-2:flags=bilinear"
                 )
 
-            # Speed (video setpts, audio atempo)
-            spd = float(getattr(self.clip, 'speed', 1.0) or 1.0)
-            if spd != 1.0:
-                # Video: setpts=PTS/speed
-                vf_filters.append(f"setpts=PTS/{spd}")
-                # Audio: chain atempo in 0.5..2.0 chunks
-                def atempo_chain(v: float) -> str:
-                    if v <= 0:
-                        v = 1.0
-                    chain = []
-                    remaining = v
-                    # Decompose into factors within [0.5, 2.0]
-                    while remaining > 2.0:
-                        chain.append("atempo=2.0")
-                        remaining /= 2.0
-                    while remaining < 0.5:
-                        chain.append("atempo=0.5")
-                        remaining *= 2.0
-                    chain.append(f"atempo={remaining:.6f}")
-                    return ",".join(chain)
-
-                af_filters.append(atempo_chain(spd))
-
-            cmd = [
-                "ffmpeg", "-y",
-                "-ss", str(start),
-                "-t", str(dur),
-                "-i", src,
-            ]
-
-            if vf_filters:
-                cmd += ["-vf", ",".join(vf_filters)]
-            if af_filters:
-                cmd += ["-af", ",".join(af_filters)]
-
-            cmd += [
-                "-c:v", "libx264",
-                "-preset", "veryfast",
-                "-crf", "25",
-                "-c:a", "aac",
-                "-b:a", "128k",
-                out_path
-            ]
-
-            code, _, err = run_cmd(cmd, timeout=600)
+            # LUT, titolo e speed: frammenti memoizzati sul clip
+            vf_frag, af_frag = self.clip.effect_filter_fragments(self.lut_dir)
+            vf_filters.extend(vf_frag)
+            af_filters = list(af_frag)
+
+            def build_cmd(video_args):
+                c = [
+                    "ffmpeg", "-y",
+                    "-ss", str(start),
+                    "-t", str(dur),
+                    "-i", src,
+                ]
+                if vf_filters:
+                    c += ["-vf", ",".join(vf_filters)]
+                if af_filters:
+                    c += ["-af", ",".join(af_filters)]
+                c += video_args
+                if video_args[1] == "libx264":
+                    c += ["-tune", "fastdecode"]
+                c += [
+                    "-c:a", "aac",
+                    "-b:a", "128k",
+                    out_path
+                ]
+                return c
+
+            # Spawn contingentato dal semaforo; un worker annullato mentre
+            # era in attesa esce senza lanciare ffmpeg
+            _effect_sem.acquire()
+            try:
+                if self.cancelled:
+                    return
+                code, _, err = run_cmd(
+                    build_cmd(FFmpegConfig.video_encoder_args(
+                        preset="ultrafast", crf=25
+                    )),
+                    timeout=600
+                )
+                # L'encoder hardware puo' rifiutare questo file anche se
+                # il rilevamento l'ha promosso: un tentativo in software
+                # prima di dichiarare fallita la preview
+                if (code != 0 and not self.cancelled
+                        and FFmpegConfig.detect_encoder() != "libx264"):
+                    code, _, err = run_cmd(
+                        build_cmd(FFmpegConfig.software_encoder_args(
+                            preset="ultrafast", crf=25
+                        )),
+                        timeout=600
+                    )
+            finally:
+                _effect_sem.release()
             if code != 0 or not os.path.exists(out_path):
                 try:
                     self.signals.failed.emit(self.clip, err or "Failed to build effect preview")
                 finally:
                     return
 
+            with _preview_cache_lock:
+                _preview_cache[key] = out_path
+                _preview_cache.move_to_end(key)
+                while len(_preview_cache) > _PREVIEW_CACHE_MAX:
+                    _preview_cache.popitem(last=False)
+
             try:
                 self.clip.effect_preview_path = out_path
             except Exception:
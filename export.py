@@ -5,15 +5,48 @@ export.py
 Gestisce l'esportazione del progetto in un video finale.
 """
 
+import hashlib
 import os
 import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 from config import FFmpegConfig
 from models import TimelineClip
 from utils import run_cmd, safe_path_for_concat
 
+# Separatore cache-ato per i percorsi temporanei generati nei loop di
+# render: os.path.join costa qualche call Python per invocazione
+_SEP = os.sep
+
+
+def _run_encode_with_fallback(build_cmd, timeout: int = 300):
+    """
+    Esegue un encode con l'encoder rilevato; su errore ritenta in software.
+
+    Un encoder hardware puo' rifiutare a runtime file che l'encode di
+    prova del rilevamento accetta (pixel format, risoluzioni, limiti di
+    sessione del driver): l'export non deve fallire per questo quando
+    libx264 e' sempre disponibile.
+
+    Args:
+        build_cmd: Callable che costruisce il comando ffmpeg a partire
+            dagli argomenti video dell'encoder
+        timeout: Timeout in secondi per ciascun tentativo
+
+    Returns:
+        Tupla (code, stdout, stderr) dell'ultimo tentativo
+    """
+    code, out, err = run_cmd(
+        build_cmd(FFmpegConfig.video_encoder_args()), timeout=timeout
+    )
+    if code != 0 and FFmpegConfig.detect_encoder() != "libx264":
+        code, out, err = run_cmd(
+            build_cmd(FFmpegConfig.software_encoder_args()), timeout=timeout
+        )
+    return code, out, err
+
 
 class ProjectExporter:
     """Gestisce l'esportazione del progetto."""
@@ -39,21 +72,46 @@ class ProjectExporter:
     def export(self, output_path: str, parent_widget=None):
         """
         Esporta il progetto come video finale.
-        
+
         Args:
             output_path: Percorso del file di output
             parent_widget: Widget parent per messaggi di errore (opzionale)
-            
+
         Raises:
             RuntimeError: Se l'export fallisce
         """
-        # Crea directory temporanea
+        # Timeline senza effetti ne' transizioni: basta un remux con il
+        # concat demuxer direttamente sui sorgenti, zero codifiche.
+        try:
+            if self._export_remux_only(output_path):
+                return
+        except Exception:
+            pass
+
+        # Prova poi il percorso single-pass: un solo comando ffmpeg con
+        # filter_complex e una sola codifica libx264, invece di una codifica
+        # per clip piu' una per ogni transizione.
+        try:
+            if self._export_single_pass(output_path):
+                return
+        except Exception:
+            # Qualsiasi problema nel costruire/eseguire il grafo: si ripiega
+            # sulla pipeline multi-pass clip-per-clip.
+            pass
+
+        # Directory di cache stabile per progetto (non uuid): i clip gia'
+        # renderizzati con firma valida sopravvivono tra un export e l'altro,
+        # cosi' rieseguire l'export ri-renderizza solo i clip modificati
+        project_key = hashlib.blake2b(
+            repr(sorted({c.media.path for c in self.timeline})).encode(),
+            digest_size=8
+        ).hexdigest()
         temp_dir = os.path.join(
             tempfile.gettempdir(),
-            f"pyeditor_{uuid.uuid4().hex}"
+            f"pyeditor_render_{project_key}"
         )
         os.makedirs(temp_dir, exist_ok=True)
-        
+
         try:
             # Renderizza tutti i clip
             rendered_clips = self._render_all_clips(temp_dir)
@@ -76,6 +134,278 @@ class ProjectExporter:
         except Exception as e:
             raise RuntimeError(f"Export failed: {str(e)}")
     
+    def _export_remux_only(self, output_path: str) -> bool:
+        """
+        Esporta la timeline con un solo remux, senza alcuna codifica.
+
+        Applicabile solo quando nessun clip ha LUT, titolo, velocita' o
+        transizione: i trim vengono espressi come inpoint/outpoint nel
+        file di lista del concat demuxer, direttamente sui sorgenti.
+
+        Args:
+            output_path: Percorso del file di output
+
+        Returns:
+            True se l'export remux-only ha avuto successo, False se la
+            timeline richiede effetti e quindi una codifica
+
+        Raises:
+            RuntimeError: Se il remux fallisce
+        """
+        if not self.timeline:
+            return False
+
+        any_effects = any(
+            (c.lut and c.lut != "none")
+            or c.title
+            or float(getattr(c, 'speed', 1.0) or 1.0) != 1.0
+            or (c.transition or "none") != "none"
+            for c in self.timeline
+        )
+        if any_effects:
+            return False
+
+        # Il concat demuxer in -c copy scrive tutti i pacchetti con i
+        # parametri di stream del primo file e esce comunque 0: con
+        # sorgenti eterogenei (codec, risoluzione o sample rate diversi)
+        # il file risultante e' corrotto senza che nessun errore scatti.
+        # Il remux e' quindi riservato ai tagli di un singolo sorgente
+        if len({c.media.path for c in self.timeline}) != 1:
+            return False
+
+        temp_dir = os.path.join(
+            tempfile.gettempdir(),
+            f"pyeditor_{uuid.uuid4().hex}"
+        )
+        os.makedirs(temp_dir, exist_ok=True)
+
+        concat_list = os.path.join(temp_dir, "concat_list.txt")
+
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for clip in self.timeline:
+                f.write(f"file '{safe_path_for_concat(clip.media.path)}'\n")
+                start = clip.start or 0.0
+                if start > 0:
+                    f.write(f"inpoint {start}\n")
+                end = clip.end if clip.end is not None else clip.media.duration
+                if end is not None and end > start:
+                    f.write(f"outpoint {end}\n")
+
+        # Con musica di sottofondo il remux passa da un file intermedio,
+        # poi il mix audio ricodifica solo l'audio (video in copy)
+        concat_out = (
+            os.path.join(temp_dir, "concatenated.mp4")
+            if self.bg_music else output_path
+        )
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", concat_list,
+            "-c", "copy",
+            "-avoid_negative_ts", "make_zero",
+            "-movflags", "+faststart",
+            "-flush_packets", "0",
+            concat_out
+        ]
+
+        code, _, err = run_cmd(cmd, timeout=3600)
+
+        if code != 0 or not os.path.exists(concat_out):
+            raise RuntimeError(f"Remux-only export failed: {err}")
+
+        if self.bg_music:
+            self._add_background_music(concat_out, output_path, temp_dir)
+
+        return True
+
+    def _export_single_pass(self, output_path: str) -> bool:
+        """
+        Esporta l'intera timeline con un solo comando ffmpeg.
+
+        Costruisce un unico filter_complex che applica trim, LUT, titoli,
+        velocita', transizioni e musica di sottofondo, con una sola codifica
+        finale: per N clip evita gli N encode intermedi della pipeline
+        multi-pass.
+
+        Args:
+            output_path: Percorso del file di output
+
+        Returns:
+            True se l'export single-pass ha avuto successo
+
+        Raises:
+            RuntimeError: Se la timeline non e' esprimibile come grafo unico
+        """
+        inputs, filter_complex, v_label, a_label = self._build_filter_graph()
+
+        def build_cmd(video_args):
+            cmd = ["ffmpeg", "-y"]
+            for src in inputs:
+                cmd += ["-i", src]
+            cmd += [
+                "-filter_complex", filter_complex,
+                "-map", f"[{v_label}]",
+                "-map", f"[{a_label}]",
+            ] + video_args + [
+                "-c:a", "aac",
+                "-b:a", FFmpegConfig.AUDIO_BITRATE,
+                # moov in testa al file e scritture meno frammentate sul mux finale
+                "-movflags", "+faststart",
+                "-flush_packets", "0",
+                output_path
+            ]
+            return cmd
+
+        code, _, err = _run_encode_with_fallback(build_cmd, timeout=3600)
+
+        if code != 0:
+            raise RuntimeError(f"Single-pass export failed: {err}")
+
+        return True
+
+    def _build_filter_graph(self):
+        """
+        Costruisce il grafo filter_complex per l'export single-pass.
+
+        Ogni clip produce una coppia di label [v{i}]/[a{i}] con trim, LUT,
+        drawtext e setpts/atempo; le coppie vengono poi concatenate (o unite
+        con xfade/acrossfade) e mixate con la musica di sottofondo.
+
+        Returns:
+            Tupla (input_paths, filter_complex, video_label, audio_label)
+
+        Raises:
+            RuntimeError: Se un clip non ha durata nota (necessaria al grafo)
+        """
+        if not self.timeline:
+            raise RuntimeError("Empty timeline")
+
+        # Dedupe degli input per percorso sorgente
+        inputs: List[str] = []
+        input_index = {}
+        for clip in self.timeline:
+            path = clip.media.path
+            if path not in input_index:
+                input_index[path] = len(inputs)
+                inputs.append(path)
+
+        parts = []
+        durations = []
+
+        for i, clip in enumerate(self.timeline):
+            idx = input_index[clip.media.path]
+            start = clip.start or 0.0
+            end = clip.end if clip.end is not None else clip.media.duration
+
+            if end is None or end <= start:
+                raise RuntimeError("Clip without a known duration")
+
+            try:
+                spd = float(getattr(clip, 'speed', 1.0) or 1.0)
+            except Exception:
+                spd = 1.0
+            if spd <= 0:
+                spd = 1.0
+
+            durations.append((end - start) / spd)
+
+            # Catena video: trim -> frammenti effetto memoizzati sul clip
+            # (lut3d/drawtext/setpts, composti una volta per parametri)
+            vf_frag, af_frag = clip.effect_filter_fragments(self.lut_dir)
+
+            v_chain = [
+                f"trim=start={start}:end={end}",
+                "setpts=PTS-STARTPTS"
+            ]
+            v_chain.extend(vf_frag)
+
+            parts.append(f"[{idx}:v]" + ",".join(v_chain) + f"[v{i}]")
+
+            # Catena audio: atrim -> asetpts -> atempo
+            a_chain = [
+                f"atrim=start={start}:end={end}",
+                "asetpts=PTS-STARTPTS"
+            ]
+            a_chain.extend(af_frag)
+
+            parts.append(f"[{idx}:a]" + ",".join(a_chain) + f"[a{i}]")
+
+        n = len(self.timeline)
+        use_transitions = any(
+            (c.transition or "none") != "none" for c in self.timeline[:-1]
+        )
+
+        if n == 1:
+            v_label, a_label = "v0", "a0"
+        elif use_transitions:
+            v_label, a_label = self._chain_transitions(parts, durations)
+        else:
+            seq = "".join(f"[v{i}][a{i}]" for i in range(n))
+            parts.append(f"{seq}concat=n={n}:v=1:a=1[vcat][acat]")
+            v_label, a_label = "vcat", "acat"
+
+        # Musica di sottofondo: input aggiuntivo mixato con amix
+        if self.bg_music:
+            music_idx = len(inputs)
+            inputs.append(self.bg_music)
+            parts.append(
+                f"[{music_idx}:a]volume={FFmpegConfig.VOLUME_BG_MUSIC}[bgm]"
+            )
+            parts.append(
+                f"[{a_label}][bgm]amix=inputs=2:duration=first:"
+                f"dropout_transition=2[amixed]"
+            )
+            a_label = "amixed"
+
+        return inputs, ";".join(parts), v_label, a_label
+
+    def _chain_transitions(self, parts: List[str], durations: List[float]):
+        """
+        Aggiunge al grafo la catena xfade/acrossfade tra clip consecutivi.
+
+        Args:
+            parts: Lista (mutata) dei segmenti del filter_complex
+            durations: Durate effettive dei clip, in ordine
+
+        Returns:
+            Tupla (video_label, audio_label) finali
+        """
+        d = FFmpegConfig.CROSSFADE_DURATION
+        n = len(durations)
+
+        v_cur, a_cur = "v0", "a0"
+        offset = 0.0
+
+        for i in range(1, n):
+            tr = getattr(self.timeline[i - 1], 'transition', 'none') or 'none'
+            if tr == 'crossfade':
+                tr = 'fade'
+
+            v_out = f"vx{i}"
+            a_out = f"ax{i}"
+
+            if tr == 'none':
+                parts.append(
+                    f"[{v_cur}][{a_cur}][v{i}][a{i}]"
+                    f"concat=n=2:v=1:a=1[{v_out}][{a_out}]"
+                )
+                offset += durations[i - 1]
+            else:
+                offset += durations[i - 1] - d
+                parts.append(
+                    f"[{v_cur}][v{i}]xfade=transition={tr}:"
+                    f"duration={d}:offset={offset:.6f}[{v_out}]"
+                )
+                parts.append(
+                    f"[{a_cur}][a{i}]acrossfade=d={d}[{a_out}]"
+                )
+
+            v_cur, a_cur = v_out, a_out
+
+        return v_cur, a_cur
+
     def _render_all_clips(self, temp_dir: str) -> List[str]:
         """
         Renderizza tutti i clip applicando effetti.
@@ -90,27 +420,125 @@ class ProjectExporter:
             RuntimeError: Se il rendering fallisce
         """
         rendered_clips = []
-        
-        for idx, clip in enumerate(self.timeline):
-            rendered_path = os.path.join(temp_dir, f"clip_{idx}.mp4")
-            self._render_single_clip(clip, rendered_path)
-            rendered_clips.append(rendered_path)
-        
+
+        # Ogni render blocca su un subprocess ffmpeg: eseguirli in parallelo
+        # satura i core che resterebbero inattivi con il loop seriale
+        workers = max(1, (os.cpu_count() or 2) // 2)
+        ffmpeg_threads = max(1, (os.cpu_count() or 2) // workers)
+
+        # Lo stream copy degli intermedi e' lecito solo se il concat
+        # finale (-c copy) unira' stream omogenei: tutti i clip senza
+        # effetti e tutti dallo stesso sorgente. In ogni altro caso un
+        # intermedio copiato nel codec del sorgente finirebbe accodato a
+        # intermedi ricodificati con parametri diversi, e ffmpeg lo
+        # accetta uscendo 0 ma produce un file corrotto
+        allow_copy = (
+            len({c.media.path for c in self.timeline}) == 1
+            and not any(
+                (c.lut and c.lut != "none")
+                or c.title
+                or float(getattr(c, 'speed', 1.0) or 1.0) != 1.0
+                for c in self.timeline
+            )
+        )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for idx, clip in enumerate(self.timeline):
+                rendered_path = f"{temp_dir}{_SEP}clip_{idx}.mp4"
+                futures.append(executor.submit(
+                    self._render_single_clip, clip, rendered_path,
+                    ffmpeg_threads, allow_copy
+                ))
+                rendered_clips.append(rendered_path)
+
+            # Propaga la prima eccezione mantenendo l'ordine dei clip
+            for future in futures:
+                future.result()
+
         return rendered_clips
-    
-    def _render_single_clip(self, clip: TimelineClip, output_path: str):
+
+    def _clip_signature(self, clip: TimelineClip, src: str) -> str:
+        """
+        Calcola la firma di un render: sorgente, mtime e parametri effetto.
+
+        Args:
+            clip: Clip da firmare
+            src: Percorso del sorgente usato per il render
+
+        Returns:
+            Digest esadecimale della firma
+        """
+        try:
+            src_mtime = os.path.getmtime(src)
+        except OSError:
+            src_mtime = 0.0
+
+        try:
+            spd = float(getattr(clip, 'speed', 1.0) or 1.0)
+        except Exception:
+            spd = 1.0
+
+        return hashlib.sha256(repr((
+            src, src_mtime,
+            clip.start, clip.end,
+            clip.lut, clip.title, clip.title_size, clip.title_pos,
+            spd,
+            FFmpegConfig.CRF, FFmpegConfig.PRESET,
+            FFmpegConfig.detect_encoder(),
+        )).encode()).hexdigest()
+
+    @staticmethod
+    def _write_signature(sig_path: str, signature: str):
+        """Scrive il sidecar di firma; un fallimento non blocca l'export."""
+        try:
+            with open(sig_path, "w", encoding="utf-8") as f:
+                f.write(signature)
+        except OSError:
+            pass
+
+    def _render_single_clip(self, clip: TimelineClip, output_path: str,
+                            threads: int = 0, allow_copy: bool = False):
         """
         Renderizza un singolo clip con tutti gli effetti.
-        
+
         Args:
             clip: Clip da renderizzare
             output_path: Percorso del file di output
-            
+            threads: Thread ffmpeg per processo (0 = default ffmpeg),
+                usato per evitare oversubscription nei render paralleli
+            allow_copy: Consente il fast path in stream copy per i clip
+                senza filtri; va passato True solo se TUTTI gli intermedi
+                della timeline avranno parametri di stream identici,
+                perche' il concat finale li unisce in -c copy
+
         Raises:
             RuntimeError: Se il rendering fallisce
         """
-        src = clip.media.path
-        
+        # Con EXPORT_FROM_PROXY attivo si decodifica il proxy (molto piu'
+        # economico di un sorgente 4K) accettando la sua qualita' come tetto
+        if FFmpegConfig.EXPORT_FROM_PROXY and getattr(clip, 'proxy_path', None):
+            src = clip.proxy_path
+        else:
+            src = clip.media.path
+
+        # Cache incrementale stile make: se output e firma sidecar esistono
+        # e la firma coincide, il render precedente e' ancora valido
+        sig_path = output_path + ".sig"
+        # La modalita' (copy vs encode) entra nella firma: un intermedio
+        # in copy messo in cache non deve essere riusato quando la
+        # composizione della timeline ora impone la ricodifica
+        signature = self._clip_signature(clip, src) + (
+            "|copy" if allow_copy else "|enc"
+        )
+        try:
+            if os.path.exists(output_path):
+                with open(sig_path, "r", encoding="utf-8") as f:
+                    if f.read().strip() == signature:
+                        return
+        except OSError:
+            pass
+
         # Argomenti per trim
         start_args = []
         if clip.start and clip.start > 0:
@@ -120,71 +548,59 @@ class ProjectExporter:
         if clip.end and (clip.end > (clip.start or 0.0)):
             duration_args += ["-t", str(clip.end - (clip.start or 0.0))]
         
-        # Costruisci filtri video/audio
-        filters = []
-        a_filters = []
-        
-        # LUT
-        if clip.lut and clip.lut != "none":
-            lut_path = os.path.join(self.lut_dir, clip.lut)
-            if os.path.exists(lut_path):
-                filters.append(f"lut3d=file='{lut_path}'")
-        
-        # Titolo
-        if clip.title:
-            text_esc = clip.title.replace("'", "\\'")
-            draw_filter = (
-                f"drawtext=text='{text_esc}':fontcolor=white:"
-                f"fontsize={clip.title_size}:x={clip.title_pos}:"
-                f"y=(h-{clip.title_size}-40):shadowcolor=black:shadowx=2:shadowy=2"
-            )
-            filters.append(draw_filter)
-
-        # Speed (velocity)
-        try:
-            spd = float(getattr(clip, 'speed', 1.0) or 1.0)
-        except Exception:
-            spd = 1.0
-        if spd != 1.0:
-            # Video: setpts=PTS/speed
-            filters.append(f"setpts=PTS/{spd}")
-            # Audio: chain atempo within 0.5..2.0 ranges
-            def atempo_chain(v: float) -> str:
-                if v <= 0:
-                    v = 1.0
-                chain = []
-                remaining = v
-                while remaining > 2.0:
-                    chain.append("atempo=2.0")
-                    remaining /= 2.0
-                while remaining < 0.5:
-                    chain.append("atempo=0.5")
-                    remaining *= 2.0
-                chain.append(f"atempo={remaining:.6f}")
-                return ",".join(chain)
-            a_filters.append(atempo_chain(spd))
-        
+        # Filtri video/audio: frammenti memoizzati sul clip (lut/titolo/speed)
+        vf_frag, af_frag = clip.effect_filter_fragments(self.lut_dir)
+        filters = list(vf_frag)
+        a_filters = list(af_frag)
+
+        # Nessun filtro: basta un remux con stream copy, senza re-encode.
+        # -ss prima di -i usa il fast seek keyframe-aligned. Solo se il
+        # chiamante garantisce intermedi omogenei (vedi allow_copy)
+        if allow_copy and not filters and not a_filters:
+            cmd = ["ffmpeg", "-y"]
+            if clip.start and clip.start > 0:
+                cmd += ["-ss", str(clip.start)]
+            if clip.end and (clip.end > (clip.start or 0.0)):
+                # Con -ss prima di -i i timestamp ripartono da 0: si usa la
+                # durata, non il tempo assoluto di fine
+                cmd += ["-t", str(clip.end - (clip.start or 0.0))]
+            cmd += [
+                "-i", src,
+                "-c", "copy",
+                "-avoid_negative_ts", "make_zero",
+                output_path
+            ]
+
+            code, _, _ = run_cmd(cmd)
+            if code == 0:
+                self._write_signature(sig_path, signature)
+                return
+            # Stream copy fallito (es. container non compatibile):
+            # prosegue con il percorso re-encode.
+
         # Comando FFmpeg
-        cmd = ["ffmpeg", "-y"] + start_args + ["-i", src] + duration_args
-        
-        if filters:
-            cmd += ["-vf", ",".join(filters)]
-        if a_filters:
-            cmd += ["-af", ",".join(a_filters)]
-        
-        cmd += [
-            "-c:v", "libx264",
-            "-preset", FFmpegConfig.PRESET,
-            "-crf", str(FFmpegConfig.CRF),
-            "-c:a", "aac",
-            "-b:a", FFmpegConfig.AUDIO_BITRATE,
-            output_path
-        ]
-        
-        code, _, err = run_cmd(cmd)
-        
+        def build_cmd(video_args):
+            cmd = ["ffmpeg", "-y"] + start_args + ["-i", src] + duration_args
+            if filters:
+                cmd += ["-vf", ",".join(filters)]
+            if a_filters:
+                cmd += ["-af", ",".join(a_filters)]
+            cmd += video_args
+            if threads > 0:
+                cmd += ["-threads", str(threads)]
+            cmd += [
+                "-c:a", "aac",
+                "-b:a", FFmpegConfig.AUDIO_BITRATE,
+                output_path
+            ]
+            return cmd
+
+        code, _, err = _run_encode_with_fallback(build_cmd)
+
         if code != 0:
             raise RuntimeError(f"Failed to render clip: {err}")
+
+        self._write_signature(sig_path, signature)
     
     def _concatenate_simple(self, clips: List[str], temp_dir: str) -> str:
         """
@@ -224,75 +640,92 @@ class ProjectExporter:
         
         return concat_out
     
-    def _concatenate_with_transitions(self, clips: List[str], temp_dir: str) -> str:
+    def _concatenate_with_transitions(self, clips: List[str], temp_dir: str) -> str:
         """
         Concatena i clip con transizioni crossfade.
-        
+
+        Un solo comando ffmpeg con tutti i clip in input e una catena
+        xfade/acrossfade a offset cumulativi: ogni clip viene decodificato
+        e codificato una volta sola, invece di ricodificare l'intermedio
+        che cresce a ogni passo.
+
         Args:
             clips: Lista di percorsi ai clip
             temp_dir: Directory temporanea
-            
+
         Returns:
             Percorso del file finale con transizioni
-            
+
         Raises:
             RuntimeError: Se la concatenazione fallisce
         """
-        current = clips[0]
-        # Apply transition set on clip i to transition into clip i+1
-        for i in range(1, len(clips)):
-            next_clip = clips[i]
-            out_chain = os.path.join(temp_dir, f"xfade_{i-1}.mp4")
-
-            # Determine transition type
-            try:
-                tr = getattr(self.timeline[i-1], 'transition', 'none') or 'none'
-            except Exception:
-                tr = 'none'
-            # Map friendly names
-            if tr == 'crossfade':
-                tr = 'fade'
-            if tr == 'none':
-                # Simple concat of current and next when no transition
-                # Implement by concatenating two clips at this step
-                cmd = [
-                    "ffmpeg", "-y",
-                    "-i", current,
-                    "-i", next_clip,
-                    "-filter_complex",
-                    "[0:v][0:a][1:v][1:a]concat=n=2:v=1:a=1[v][a]",
-                    "-map", "[v]",
-                    "-map", "[a]",
-                    "-c:v", "libx264",
-                    "-preset", FFmpegConfig.PRESET,
-                    "-crf", str(FFmpegConfig.CRF),
-                    "-c:a", "aac",
-                    "-b:a", FFmpegConfig.AUDIO_BITRATE,
-                    out_chain
-                ]
-            else:
-                # Use xfade transition (video); audio simple crossfade is not handled here
-                cmd = [
-                    "ffmpeg", "-y",
-                    "-i", current,
-                    "-i", next_clip,
-                    "-filter_complex",
-                    f"[0:v][1:v]xfade=transition={tr}:duration={FFmpegConfig.CROSSFADE_DURATION}:offset=1,format=yuv420p",
-                    "-c:v", "libx264",
-                    "-preset", FFmpegConfig.PRESET,
-                    "-crf", str(FFmpegConfig.CRF),
-                    "-c:a", "aac",
-                    "-b:a", FFmpegConfig.AUDIO_BITRATE,
-                    out_chain
-                ]
-
-            code, _, err = run_cmd(cmd)
-            if code != 0:
-                raise RuntimeError(f"Failed transition step: {err}")
-
-            current = out_chain
-
-        return current
+        if len(clips) == 1:
+            return clips[0]
+
+        d = FFmpegConfig.CROSSFADE_DURATION
+        # Durate effettive dei clip renderizzati (trim e velocita' inclusi),
+        # necessarie per gli offset cumulativi delle xfade
+        durations = [clip.duration_effective() for clip in self.timeline]
+
+        cmd = ["ffmpeg", "-y"]
+        for path in clips:
+            cmd += ["-i", path]
+
+        parts = []
+        v_cur, a_cur = "0:v", "0:a"
+        offset = 0.0
+
+        for i in range(1, len(clips)):
+            try:
+                tr = getattr(self.timeline[i-1], 'transition', 'none') or 'none'
+            except Exception:
+                tr = 'none'
+            # Map friendly names
+            if tr == 'crossfade':
+                tr = 'fade'
+
+            v_out = f"vx{i}"
+            a_out = f"ax{i}"
+
+            if tr == 'none':
+                parts.append(
+                    f"[{v_cur}][{a_cur}][{i}:v][{i}:a]"
+                    f"concat=n=2:v=1:a=1[{v_out}][{a_out}]"
+                )
+                offset += durations[i - 1]
+            else:
+                offset += durations[i - 1] - d
+                parts.append(
+                    f"[{v_cur}][{i}:v]xfade=transition={tr}:"
+                    f"duration={d}:offset={offset:.6f}[{v_out}]"
+                )
+                parts.append(
+                    f"[{a_cur}][{i}:a]acrossfade=d={d}[{a_out}]"
+                )
+
+            v_cur, a_cur = v_out, a_out
+
+        out_path = os.path.join(temp_dir, "transitions.mp4")
+
+        def build_cmd(video_args):
+            return list(cmd) + [
+                "-filter_complex", ";".join(parts),
+                "-map", f"[{v_cur}]",
+                "-map", f"[{a_cur}]",
+            ] + video_args + [
+                # Conversione pixel format una sola volta all'ingresso encoder,
+                # non come passo di filtro dentro il grafo
+                "-pix_fmt", "yuv420p",
+                "-c:a", "aac",
+                "-b:a", FFmpegConfig.AUDIO_BITRATE,
+                out_path
+            ]
+
+        code, _, err = _run_encode_with_fallback(build_cmd, timeout=3600)
+        if code != 0:
+            raise RuntimeError(f"Failed transition step: {err}")
+
+        return out_path
     
     def _add_background_music(self, video_path: str, output_path: str, temp_dir: str):
         """
@@ -306,35 +739,23 @@ class ProjectExporter:
         Raises:
             RuntimeError: Se l'aggiunta della musica fallisce
         """
-        # Processa la musica (abbassa il volume)
-        music_adj = os.path.join(temp_dir, "bg.aac")
-        
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", self.bg_music,
-            "-filter:a", f"volume={FFmpegConfig.VOLUME_BG_MUSIC}",
-            "-c:a", "aac",
-            "-b:a", FFmpegConfig.AUDIO_BITRATE,
-            music_adj
-        ]
-        
-        code, _, err = run_cmd(cmd)
-        
-        if code != 0:
-            raise RuntimeError(f"Failed to process music: {err}")
-        
-        # Mixa video audio + background music
+        # Mixa video audio + background music; il volume della musica e'
+        # applicato inline nell'amix, senza il passo di pre-encode in bg.aac
         cmd = [
             "ffmpeg", "-y",
             "-i", video_path,
-            "-i", music_adj,
+            "-i", self.bg_music,
             "-filter_complex",
-            "[0:a]volume=1[a0];[1:a]volume=1[a1];[a0][a1]amix=inputs=2:duration=longest:dropout_transition=2[aout]",
+            f"[0:a]volume=1[a0];"
+            f"[1:a]volume={FFmpegConfig.VOLUME_BG_MUSIC}[a1];"
+            f"[a0][a1]amix=inputs=2:duration=longest:dropout_transition=2[aout]",
             "-map", "0:v",
             "-map", "[aout]",
             "-c:v", "copy",
             "-c:a", "aac",
             "-b:a", FFmpegConfig.AUDIO_BITRATE,
+            "-movflags", "+faststart",
+            "-flush_packets", "0",
             output_path
         ]
         
@@ -362,10 +783,12 @@ class ProjectExporter:
                 "ffmpeg", "-y",
                 "-i", source,
                 "-c", "copy",
+                "-movflags", "+faststart",
+                "-flush_packets", "0",
                 destination
             ]
             
             code, _, err = run_cmd(cmd)
             
             if code != 0:
-                raise RuntimeError(f"Failed to produce final output: {err}")
+                raise RuntimeError(f"Failed to produce final output: {err}")
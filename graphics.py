@@ -5,38 +5,252 @@ graphics.py
 Componenti grafici della timeline: ClipGraphicsItem e VisualTimeline.
 """
 
+import bisect
 import os
+import weakref
 from typing import Callable, List, Optional
 
+# numpy opzionale: vettorizza somme/cumsum sulle larghezze dei clip,
+# senza di esso si usano i loop Python equivalenti
+try:
+    import numpy as np
+except Exception:
+    np = None
+
 from PySide6.QtWidgets import (
-    QGraphicsView, QGraphicsScene, QGraphicsRectItem,
+    QGraphicsView, QGraphicsScene, QGraphicsRectItem, QGraphicsPixmapItem,
     QStyleOptionGraphicsItem, QFrame, QMenu, QGraphicsItem
 )
-from PySide6.QtCore import Qt, QRectF, QPointF, Signal, QTimer
-from PySide6.QtGui import (
-    QBrush, QColor, QPen, QPixmap, QPainter, QFont, QCursor,
-    QPolygonF, QWheelEvent, QAction, QTransform, QPainterPath
-)
+from PySide6.QtCore import (
+    Qt, QObject, QRect, QRectF, QPointF, QLine, Signal, QTimer
+)
+from PySide6.QtGui import (
+    QBrush, QColor, QPen, QPixmap, QPixmapCache, QPainter, QFont, QCursor,
+    QPolygonF, QWheelEvent, QAction, QTransform, QPainterPath,
+    QStaticText
+)
 
 from config import UIConfig, AppConfig
 from models import TimelineClip
 from utils import format_time
 
+_SENT = object()
+
+# Accessor non-bound risolto una volta al load del modulo: nella risalita
+# della catena dei parent evita il lookup di `parent` (e la creazione del
+# relativo wrapper shiboken) su ogni singolo QObject attraversato
+_parent = QObject.parent
+
+
+def _walk_ancestors(widget, name: str):
+    """
+    Risale la catena dei parent e ritorna il primo attributo `name` trovato.
+
+    Un solo getattr con sentinella per antenato: meta' dei lookup rispetto
+    alla coppia hasattr+getattr, e nessuna AttributeError allocata quando
+    l'antenato non espone il nome (il caso comune lungo la catena).
+
+    Args:
+        widget: Punto di partenza (tipicamente self.parent())
+        name: Nome dell'attributo/metodo cercato
+
+    Returns:
+        L'attributo trovato (di solito un bound method) oppure None
+    """
+    while widget is not None:
+        m = getattr(widget, name, _SENT)
+        if m is not _SENT:
+            return m
+        widget = _parent(widget)
+    return None
+
+
+def _load_pixmap_cached(path: str, target_h: Optional[int] = None) -> QPixmap:
+    """
+    Carica un pixmap passando da QPixmapCache.
+
+    Clip duplicati/splittati che puntano alle stesse thumbnail condividono
+    i pixel e la decodifica PNG avviene una sola volta per (path, altezza).
+
+    Args:
+        path: Percorso del file immagine
+        target_h: Altezza a cui pre-scalare (opzionale)
+
+    Returns:
+        QPixmap (eventualmente nullo se il file non e' leggibile)
+    """
+    key = f"{path}@{target_h}" if target_h else path
+    pix = QPixmap()
+    if not QPixmapCache.find(key, pix):
+        pix = QPixmap(path)
+        if target_h and not pix.isNull():
+            pix = pix.scaledToHeight(target_h, Qt.SmoothTransformation)
+        QPixmapCache.insert(key, pix)
+    return pix
+
+
+class _ProcessingDotItem(QGraphicsItem):
+    """
+    Puntino animato di processing, separato dal clip.
+
+    Vive come figlio del ClipGraphicsItem senza cache: il repaint a 80ms
+    invalida solo questi ~12px, mentre la DeviceCoordinateCache del clip
+    (miniature, testo) resta valida tra un tick e l'altro.
+    """
+
+    SIZE = 12.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.phase = 0.0
+        self.setCacheMode(QGraphicsItem.NoCache)
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self.SIZE, self.SIZE)
+
+    def paint(self, painter: QPainter, option, widget=None):
+        color = QColor(0, 180, 220)
+        alpha = 120 + int(80 * abs((self.phase % 2) - 1))
+        color.setAlpha(alpha)
+        painter.setBrush(color)
+        painter.setPen(Qt.NoPen)
+        painter.drawEllipse(QPointF(self.SIZE / 2, self.SIZE / 2), 5, 5)
+
+
+class _ClipChromeItem(QGraphicsItem):
+    """
+    Overlay di badge, etichetta, trim handle e bordo di selezione.
+
+    Figlio a z alto del clip: le miniature sono QGraphicsPixmapItem a z
+    piu' basso e questo layer ci disegna sopra, preservando l'ordine
+    visivo del vecchio paint() monolitico. Hover e selezione invalidano
+    solo questo overlay, non la cache delle miniature.
+    """
+
+    def __init__(self, host: "ClipGraphicsItem"):
+        super().__init__(host)
+        self._host = host
+        self.setZValue(3)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+        # Cache QStaticText: lo shaping viene rifatto solo se il testo cambia
+        self._label_static: Optional[QStaticText] = None
+        self._label_key = None
+        self._badge_static: Optional[QStaticText] = None
+        self._badge_key = None
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self._host.width, self._host.height)
+
+    def paint(self, painter: QPainter, option, widget=None):
+        host = self._host
+        clip = host.clip
+        rect = self.boundingRect()
+
+        exposed = option.exposedRect
+        if exposed.isEmpty():
+            return
+
+        # Snapshot dei campi del modello in locali: un solo lookup per
+        # frame invece di getattr ripetuti lungo il metodo
+        media = clip.media
+        title = clip.title
+        speed = clip.speed
+
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
+        inner = rect.adjusted(8, 6, -8, -6)
+
+        # Left badge with media type letter
+        badge_rect = QRectF(inner.left(), inner.top(), 18, inner.height())
+        painter.setBrush(host._BADGE_BRUSH)
+        painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(badge_rect, 8, 8)
+        painter.setPen(host._BADGE_PEN)
+        painter.setFont(host._BADGE_FONT)
+        letter = 'A' if media.type == 'audio' else ('T' if title else 'V')
+        if letter != self._badge_key:
+            self._badge_key = letter
+            st = QStaticText(letter)
+            st.setTextFormat(Qt.PlainText)
+            st.setPerformanceHint(QStaticText.AggressiveCaching)
+            st.prepare(QTransform(), host._BADGE_FONT)
+            self._badge_static = st
+        badge_size = self._badge_static.size()
+        painter.drawStaticText(
+            QPointF(badge_rect.center().x() - badge_size.width() / 2,
+                    badge_rect.center().y() - badge_size.height() / 2),
+            self._badge_static
+        )
+
+        # Label text
+        painter.setPen(host._LABEL_PEN)
+        painter.setFont(host._LABEL_FONT)
+        speed_suffix = "" if speed == 1.0 else f"  x{speed:.2f}"
+        name = f"{media.name}{speed_suffix}"
+        if title:
+            name = f"{title} — {name}"
+        if name != self._label_key:
+            self._label_key = name
+            st = QStaticText(name)
+            st.setTextFormat(Qt.PlainText)
+            st.setPerformanceHint(QStaticText.AggressiveCaching)
+            st.prepare(QTransform(), host._LABEL_FONT)
+            self._label_static = st
+        text_rect = QRectF(badge_rect.right() + 6, inner.top(), inner.width() - badge_rect.width() - 12, inner.height())
+        painter.save()
+        painter.setClipRect(text_rect)
+        label_size = self._label_static.size()
+        painter.drawStaticText(
+            QPointF(text_rect.left(),
+                    text_rect.center().y() - label_size.height() / 2),
+            self._label_static
+        )
+        painter.restore()
+
+        # Subtle trim handles on hover/selected
+        if host._hover or host.isSelected():
+            painter.setBrush(host._HANDLE_BRUSH)
+            painter.setPen(Qt.NoPen)
+            h = inner.height()
+            handle_w = 4
+            painter.drawRoundedRect(QRectF(rect.left()+1, rect.center().y()-h/2, handle_w, h), 2, 2)
+            painter.drawRoundedRect(QRectF(rect.right()-handle_w-1, rect.center().y()-h/2, handle_w, h), 2, 2)
+
+        # Border accent when selected
+        if host.isSelected():
+            painter.setPen(host._SEL_PEN)
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPath(host._border_path)
+
+
 class ClipGraphicsItem(QGraphicsRectItem):
     """Clip grafico draggable con trim handles e preview."""
-    
+
+    # Pen/brush/font statici condivisi tra tutti i clip: paint() gira a
+    # ogni repaint e ricostruirli li' alloca decine di oggetti Qt a frame
+    _BORDER_PEN = QPen(QColor(70, 80, 90), 1)
+    _BADGE_BRUSH = QBrush(QColor(0, 0, 0, 80))
+    _BADGE_PEN = QPen(QColor(220, 230, 240))
+    _BADGE_FONT = QFont("Segoe UI", 8, QFont.Medium)
+    _LABEL_PEN = QPen(QColor(230, 235, 245))
+    _LABEL_FONT = QFont("Segoe UI", 8)
+    _HANDLE_BRUSH = QBrush(QColor(220, 230, 240, 140))
+    _SEL_PEN = QPen(QColor(0, 180, 220), 2)
+
     def __init__(
-        self, 
-        clip: TimelineClip, 
-        px_per_sec_getter: Callable[[], float],
+        self,
+        clip: TimelineClip,
+        px_per_sec: float,
         on_trim_changed: Callable,
         parent=None
     ):
         super().__init__(parent)
         self.setCacheMode(QGraphicsRectItem.DeviceCoordinateCache)
-        
+
         self.clip = clip
-        self._get_pps = px_per_sec_getter
+        # Valore numerico, non getter: px_per_sec cambia solo allo zoom e
+        # la view lo propaga con set_pps, senza una call Python per accesso
+        self._pps = float(px_per_sec)
         self._on_trim_changed = on_trim_changed
         
         # Altezza fissa più compatta
@@ -45,43 +259,88 @@ class ClipGraphicsItem(QGraphicsRectItem):
         
         # Setup
         self.setZValue(1)
-        self.setFlags(QGraphicsRectItem.ItemIsMovable | QGraphicsRectItem.ItemIsSelectable)
+        self.setFlags(
+            QGraphicsRectItem.ItemIsMovable
+            | QGraphicsRectItem.ItemIsSelectable
+            # I figli (miniature) vengono clippati alla forma del clip
+            | QGraphicsRectItem.ItemClipsChildrenToShape
+        )
         self.setAcceptHoverEvents(True)
         
         # Stati interni
         self._hover = False
+        self._hover_zone = None
         self._mode = None
         self._drag_anchor_x = 0.0
         self._orig_start = self.clip.start
         self._orig_end = self.clip.end
         self._processing_phase = 0.0
         
-        # Cache pixmap
+        # Indicatore di processing come item figlio (vedi _ProcessingDotItem)
+        self._dot = _ProcessingDotItem(self)
+        self._dot.setZValue(2)
+        self._dot.setVisible(self.clip._processing)
+
+        # Cache pixmap; le miniature vivono come QGraphicsPixmapItem figli
+        # (z=1) cosi' Qt le compone dalla sua cache per-item e il paint()
+        # del clip non le ridisegna piu' a ogni frame
         self._cached_wave: Optional[QPixmap] = None
-        self._cached_thumbs: List[QPixmap] = []
+        self._thumb_items: List[QGraphicsPixmapItem] = []
+        # Versione preview gia' caricata: -1 forza il primo load
+        self._thumbs_version_seen = -1
         self._load_cached_pixmaps()
-        
+
+        # Overlay di badge/etichetta/handle, sopra le miniature (z=3)
+        self._chrome = _ClipChromeItem(self)
+
         # Timer per processing animation
         self._processing_timer = QTimer()
         self._processing_timer.setInterval(80)
         self._processing_timer.timeout.connect(self._on_processing_tick)
-        if getattr(self.clip, '_processing', False):
+        if self.clip._processing:
             self._processing_timer.start()
         
         self._update_rect_width()
     
     def _load_cached_pixmaps(self):
-        """Carica i pixmap in cache."""
+        """Carica i pixmap in cache e (ri)crea gli item delle miniature."""
+        # Ricarica da disco solo se le preview sono davvero cambiate: i
+        # toggle di stato (processing on/off) arrivano qui ma non devono
+        # costare una decodifica PNG per thumbnail
+        version = self.clip._thumbs_version
+        if version == self._thumbs_version_seen:
+            self._sync_processing_state()
+            return
+        self._thumbs_version_seen = version
+
         if self.clip.waveform_path and os.path.exists(self.clip.waveform_path):
-            self._cached_wave = QPixmap(self.clip.waveform_path)
-        
-        self._cached_thumbs = [
-            QPixmap(p) for p in self.clip.thumb_paths 
-            if os.path.exists(p)
-        ]
-        
+            self._cached_wave = _load_pixmap_cached(self.clip.waveform_path)
+
+        # Thumbnail pre-scalate all'altezza di visualizzazione: il resample
+        # avviene una volta qui, non a ogni repaint
+        thumb_h = max(1, self.height - 12)
+        for it in getattr(self, '_thumb_items', []):
+            it.setParentItem(None)
+            if it.scene() is not None:
+                it.scene().removeItem(it)
+        self._thumb_items = []
+        for p in self.clip.thumb_paths:
+            if os.path.exists(p):
+                pix = _load_pixmap_cached(p, thumb_h)
+                if not pix.isNull():
+                    item = QGraphicsPixmapItem(pix, self)
+                    item.setZValue(1)
+                    item.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+                    self._thumb_items.append(item)
+        self._layout_thumb_items()
+        self._sync_processing_state()
+
+    def _sync_processing_state(self):
+        """Allinea puntino e timer di animazione allo stato del clip."""
         try:
-            if getattr(self.clip, '_processing', False):
+            processing = self.clip._processing
+            self._dot.setVisible(processing)
+            if processing:
                 if not self._processing_timer.isActive():
                     self._processing_timer.start()
             else:
@@ -96,105 +355,173 @@ class ClipGraphicsItem(QGraphicsRectItem):
             self._processing_phase += 0.2
             if self._processing_phase > 2.0:
                 self._processing_phase = 0.0
-            self.update()
+            # Solo il puntino viene ridisegnato, non l'intero clip
+            self._dot.phase = self._processing_phase
+            self._dot.update()
         except Exception:
             pass
-    
+
+    def set_pps(self, pps: float):
+        """Aggiorna i pixel per secondo (chiamato dalla view allo zoom)."""
+        self._pps = float(pps)
+        self._update_rect_width()
+
+    def _layout_thumb_items(self):
+        """Distribuisce gli item delle miniature sulla banda interna."""
+        n = len(self._thumb_items)
+        if not n:
+            return
+        inner_left, inner_top = 8.0, 6.0
+        inner_w = max(1.0, self.width - 16.0)
+        # Blit 1:1 dei pixmap gia' scalati, spaziati come nel vecchio paint;
+        # l'eccedenza oltre il bordo e' clippata dalla shape del clip
+        w_each = inner_w / n
+        x = inner_left
+        for it in self._thumb_items:
+            it.setPos(x, inner_top)
+            x += w_each
+
     def _update_rect_width(self):
         """Aggiorna la larghezza del rettangolo in base alla durata."""
         duration = max(self.clip.duration_effective(), UIConfig.MIN_CLIP_DURATION)
-        self.width = max(120, duration * self._get_pps())
+        self.width = max(120, duration * self._pps)
         self.setRect(0, 0, self.width, self.height)
+        self._dot.setPos(self.width - 16, 1)
+        self._layout_thumb_items()
+        if getattr(self, '_chrome', None) is not None:
+            self._chrome.prepareGeometryChange()
+            self._chrome.update()
+
+        # Path del bordo di selezione ricostruito solo qui (cambio di
+        # geometria), non a ogni paint
+        path = QPainterPath()
+        path.addRoundedRect(
+            QRectF(0, 0, self.width, self.height).adjusted(0.5, 0.5, -0.5, -0.5),
+            10, 10
+        )
+        self._border_path = path
     
     def boundingRect(self) -> QRectF:
         """Ritorna il bounding rect del clip."""
         return QRectF(0, 0, self.width, self.height)
     
-    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
-        """Disegna il clip in stile pill, con badge iniziale e miniature video, mantenendo i colori attuali."""
-        rect = self.boundingRect()
-
-        # Base color
-        if self.isSelected():
-            base_color = UIConfig.SELECTED_COLOR
-        elif self._hover:
-            base_color = UIConfig.HOVER_COLOR
-        else:
-            base_color = UIConfig.BASE_COLOR
-
-        # Rounded outer pill
-        radius = 10
-        path = QPainterPath()
-        path.addRoundedRect(rect.adjusted(0.5, 0.5, -0.5, -0.5), radius, radius)
-
-        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
-        painter.setPen(QPen(QColor(70, 80, 90), 1))
-        painter.setBrush(QBrush(base_color))
-        painter.drawPath(path)
-
-        inner = rect.adjusted(8, 6, -8, -6)
-
-        # Thumbnails band
-        if self._cached_thumbs:
-            painter.save()
-            painter.setClipRect(inner)
-            n = len(self._cached_thumbs)
-            w_each = inner.width() / max(n, 1)
-            x = inner.left()
-            for pixmap in self._cached_thumbs:
-                target = QRectF(x, inner.top(), w_each, inner.height())
-                source = QRectF(0, 0, pixmap.width(), pixmap.height())
-                painter.drawPixmap(target, pixmap, source)
-                x += w_each
-            painter.restore()
-
-        # Left badge with media type letter
-        badge_rect = QRectF(inner.left(), inner.top(), 18, inner.height())
-        painter.setBrush(QColor(0, 0, 0, 80))
-        painter.setPen(Qt.NoPen)
-        painter.drawRoundedRect(badge_rect, 8, 8)
-        painter.setPen(QColor(220, 230, 240))
-        painter.setFont(QFont("Segoe UI", 8, QFont.Medium))
-        letter = 'A' if getattr(self.clip.media, 'type', '') == 'audio' else ('T' if getattr(self.clip, 'title', '') else 'V')
-        painter.drawText(badge_rect, Qt.AlignCenter, letter)
-
-        # Label text
-        painter.setPen(QColor(230, 235, 245))
-        painter.setFont(QFont("Segoe UI", 8))
-        speed_suffix = "" if getattr(self.clip, 'speed', 1.0) == 1.0 else f"  x{self.clip.speed:.2f}"
-        name = f"{self.clip.media.name}{speed_suffix}"
-        if getattr(self.clip, 'title', ''):
-            name = f"{self.clip.title} — {name}"
-        text_rect = QRectF(badge_rect.right() + 6, inner.top(), inner.width() - badge_rect.width() - 12, inner.height())
-        painter.drawText(text_rect, Qt.TextSingleLine | Qt.AlignVCenter, name)
-
-        # Subtle trim handles on hover/selected
-        if self._hover or self.isSelected():
-            painter.setBrush(QColor(220, 230, 240, 140))
-            painter.setPen(Qt.NoPen)
-            h = inner.height()
-            handle_w = 4
-            painter.drawRoundedRect(QRectF(rect.left()+1, rect.center().y()-h/2, handle_w, h), 2, 2)
-            painter.drawRoundedRect(QRectF(rect.right()-handle_w-1, rect.center().y()-h/2, handle_w, h), 2, 2)
-
-        # Processing indicator
-        if getattr(self.clip, '_processing', False):
-            radius_d = 5
-            cx = rect.right() - radius_d - 6
-            cy = rect.top() + 6
-            phase = self._processing_phase
-            color = QColor(0, 180, 220)
-            alpha = 120 + int(80 * abs((phase % 2) - 1))
-            color.setAlpha(alpha)
-            painter.setBrush(color)
-            painter.setPen(Qt.NoPen)
-            painter.drawEllipse(QPointF(cx, cy), radius_d, radius_d)
-
-        # Border accent when selected
-        if self.isSelected():
-            painter.setPen(QPen(QColor(0, 180, 220), 2))
-            painter.setBrush(Qt.NoBrush)
-            painter.drawPath(path)
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        """
+        Disegna la sola pill di sfondo del clip.
+
+        Miniature (QGraphicsPixmapItem figli) e chrome (badge, etichetta,
+        handle, bordo di selezione) sono item figli composti dal scene
+        graph: il paint del clip resta minimo e la sua cache non viene
+        invalidata dai loro aggiornamenti.
+        """
+        rect = self.boundingRect()
+
+        # Culling: con la scena senza indice il paint() Python gira per ogni
+        # item, anche fuori schermo — esce subito se nulla e' esposto
+        exposed = option.exposedRect
+        if exposed.isEmpty():
+            return
+
+        # Base brush (pre-costruito in UIConfig, niente allocazioni per frame)
+        if self.isSelected():
+            base_brush = UIConfig.SELECTED_BRUSH
+        elif self._hover:
+            base_brush = UIConfig.HOVER_BRUSH
+        else:
+            base_brush = UIConfig.BASE_BRUSH
+
+        # Rounded outer pill: primitiva dedicata, niente QPainterPath per frame
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.TextAntialiasing)
+        painter.setPen(self._BORDER_PEN)
+        painter.setBrush(base_brush)
+        painter.drawRoundedRect(rect.adjusted(0.5, 0.5, -0.5, -0.5), 10, 10)
+
+        # Banda waveform per i clip senza miniature (audio): si disegna
+        # solo la porzione esposta, mappando il rettangolo sorgente sul
+        # livello mipmap piu' vicino alla larghezza a schermo
+        if not self._thumb_items:
+            wave = self._wave_pixmap_for_width(rect.width())
+            if wave is not None and not wave.isNull():
+                inner = rect.adjusted(8.0, 6.0, -8.0, -6.0)
+                target = exposed.intersected(inner)
+                if not target.isEmpty():
+                    sx = wave.width() / inner.width()
+                    sy = wave.height() / inner.height()
+                    source = QRectF(
+                        (target.x() - inner.x()) * sx,
+                        (target.y() - inner.y()) * sy,
+                        target.width() * sx,
+                        target.height() * sy,
+                    )
+                    painter.drawPixmap(target, wave, source)
+
+    def _wave_pixmap_for_width(self, width: float) -> Optional[QPixmap]:
+        """
+        Sceglie il pixmap waveform piu' adatto alla larghezza a schermo.
+
+        Con i livelli mipmap disponibili prende il piu' piccolo >= width
+        (downscale minimo, niente blur da upscaling); altrimenti ripiega
+        sulla waveform base.
+        """
+        levels = self.clip.waveform_levels
+        if levels:
+            best = None
+            largest = 0
+            for level_w in sorted(levels):
+                best = levels[level_w]
+                largest = level_w
+                if level_w >= width:
+                    break
+            if largest < width:
+                # Zoom oltre il mipmap piu' grande: render esatto dal
+                # PCM memmappato, senza ridecodificare
+                pix = self._wave_pixmap_from_pcm(width)
+                if pix is not None:
+                    return pix
+            pix = _load_pixmap_cached(best)
+            if not pix.isNull():
+                return pix
+        return self._cached_wave
+
+    def _wave_pixmap_from_pcm(self, width: float) -> Optional[QPixmap]:
+        """
+        Renderizza la waveform alla larghezza richiesta dal PCM spillato.
+
+        La larghezza viene arrotondata a multipli di 512 px cosi' lo zoom
+        continuo riusa le voci di QPixmapCache invece di rigenerarle a
+        ogni pixel.
+        """
+        pcm_path = self.clip.waveform_pcm
+        if not pcm_path:
+            return None
+
+        w = max(512, -(-int(width) // 512) * 512)
+        key = f"{pcm_path}@w{w}"
+        pix = QPixmap()
+        if QPixmapCache.find(key, pix):
+            return pix
+
+        try:
+            from waveforms import render_waveform_from_pcm
+            img = render_waveform_from_pcm(
+                pcm_path, w, UIConfig.WAVEFORM_SIZE[1]
+            )
+        except Exception:
+            img = None
+        if img is None or img.isNull():
+            return None
+
+        pix = QPixmap.fromImage(img)
+        QPixmapCache.insert(key, pix)
+        return pix
+
+    def itemChange(self, change, value):
+        """Propaga i cambi di selezione all'overlay (bordo e handle)."""
+        if change == QGraphicsItem.ItemSelectedHasChanged:
+            chrome = getattr(self, '_chrome', None)
+            if chrome is not None:
+                chrome.update()
+        return super().itemChange(change, value)
     
     def _format_duration(self) -> str:
         """Formatta la durata del clip."""
@@ -206,22 +533,43 @@ class ClipGraphicsItem(QGraphicsRectItem):
     def hoverMoveEvent(self, event):
         """Gestisce il movimento del mouse sul clip."""
         x = event.pos().x()
-        
-        if x <= 9 or x >= self.width - 9:
-            self.setCursor(QCursor(Qt.SplitHCursor))
+
+        if x <= 9:
+            zone = 'left'
+        elif x >= self.width - 9:
+            zone = 'right'
         else:
-            movable = bool(self.flags() & QGraphicsItem.ItemIsMovable)
-            self.setCursor(QCursor(Qt.OpenHandCursor if movable else Qt.ArrowCursor))
-        
-        self._hover = True
-        self.update()
+            zone = 'mid'
+
+        # Il repaint serve solo all'ingresso nell'hover (cambia il brush
+        # di base e compaiono gli handle); i movimenti successivi cambiano
+        # al piu' il cursore
+        if not self._hover:
+            self._hover = True
+            self.update()
+            self._chrome.update()
+
+        if zone != self._hover_zone:
+            self._hover_zone = zone
+            if zone in ('left', 'right'):
+                self.setCursor(QCursor(Qt.SplitHCursor))
+            else:
+                movable = bool(self.flags() & QGraphicsItem.ItemIsMovable)
+                self.setCursor(QCursor(Qt.OpenHandCursor if movable else Qt.ArrowCursor))
+            # Ridisegna solo le strisce dei trim handle (nell'overlay),
+            # non l'intero clip
+            self._chrome.update(QRectF(0, 0, 9, self.height))
+            self._chrome.update(QRectF(self.width - 9, 0, 9, self.height))
+
         super().hoverMoveEvent(event)
-    
+
     def hoverLeaveEvent(self, event):
         """Gestisce l'uscita del mouse dal clip."""
         self._hover = False
+        self._hover_zone = None
         self.setCursor(QCursor(Qt.ArrowCursor))
         self.update()
+        self._chrome.update()
         super().hoverLeaveEvent(event)
     
     def mousePressEvent(self, event):
@@ -250,7 +598,7 @@ class ClipGraphicsItem(QGraphicsRectItem):
         """Gestisce il movimento durante il drag."""
         if self._mode in ('trim_left', 'trim_right'):
             dx_scene = event.scenePos().x() - self._drag_anchor_x
-            secs_delta = dx_scene / self._get_pps()
+            secs_delta = dx_scene / self._pps
             
             if self._mode == 'trim_left':
                 self._handle_trim_left(secs_delta)
@@ -277,15 +625,18 @@ class ClipGraphicsItem(QGraphicsRectItem):
             if self.x() < 0:
                 self.setX(0)
             if view and hasattr(view, "notify_item_moved"):
-                view.notify_item_moved()
+                view.notify_item_moved(self)
         elif self._mode in ('trim_left', 'trim_right'):
-            if view:
+            # L'ordine non cambia con un trim: niente sort
+            if view and hasattr(view, "_repack_after_trim"):
+                view._repack_after_trim()
+            elif view:
                 view.repack_by_order()
         
         self._mode = None
         self.setCursor(QCursor(Qt.ArrowCursor))
         
-        if not getattr(self.clip, '_processing', False):
+        if not self.clip._processing:
             try:
                 self._processing_timer.stop()
             except Exception:
@@ -300,7 +651,8 @@ class ClipGraphicsItem(QGraphicsRectItem):
             new_start = max(0.0, base_end - UIConfig.MIN_CLIP_DURATION)
         
         self.clip.start = float(new_start)
-    
+        self.clip.invalidate_duration()
+
     def _handle_trim_right(self, secs_delta: float):
         """Gestisce il trim destro."""
         base_end_orig = self._orig_end if self._orig_end is not None else (self.clip.media.duration or 0.0)
@@ -312,6 +664,58 @@ class ClipGraphicsItem(QGraphicsRectItem):
             new_end = (self.clip.start or 0.0) + UIConfig.MIN_CLIP_DURATION
         
         self.clip.end = float(new_end)
+        self.clip.invalidate_duration()
+
+
+class _ContextMenuActions:
+    """
+    Contenitore a slot fissi delle azioni del context menu.
+
+    VisualTimeline e' un QObject e non puo' dichiarare __slots__ in modo
+    utile; le azioni (insieme fisso noto a priori) vivono quindi in
+    questo holder: niente __dict__ per istanza e letture via descriptor
+    di slot nel percorso di dispatch del menu.
+    """
+
+    __slots__ = (
+        "split", "remove", "duplicate", "properties",
+        "apply_trim", "apply_title", "apply_lut", "set_transition",
+        "zoom_in", "zoom_out", "fit",
+    )
+
+    def __init__(self, view: "VisualTimeline"):
+        self.split = QAction("Split at Playhead", view)
+        self.remove = QAction("Remove Selected Clip", view)
+        self.duplicate = QAction("Duplicate Clip", view)
+        self.properties = QAction("Clip Properties", view)
+        self.apply_trim = QAction("Apply Trim (to tools)", view)
+        self.apply_title = QAction("Apply Title (to tools)", view)
+        self.apply_lut = QAction("Apply LUT (to tools)", view)
+        self.set_transition = QAction("Set Transition (to tools)", view)
+        self.zoom_in = QAction("Zoom In", view)
+        self.zoom_out = QAction("Zoom Out", view)
+        self.fit = QAction("Fit Timeline", view)
+
+        self.zoom_in.triggered.connect(view.zoom_in)
+        self.zoom_out.triggered.connect(view.zoom_out)
+        self.fit.triggered.connect(view.fit_timeline)
+
+        # Ogni azione e' collegata direttamente al dispatcher: la scelta
+        # arriva via signal/slot Qt e non serve piu' confrontare il
+        # valore di ritorno di menu.exec() con ogni azione
+        for action, name in (
+            (self.split, "split_at_playhead"),
+            (self.remove, "remove_selected_clip"),
+            (self.duplicate, "duplicate_selected_clip"),
+            (self.properties, "show_clip_properties"),
+            (self.apply_trim, "apply_trim_to_clip"),
+            (self.apply_title, "apply_title_to_clip"),
+            (self.apply_lut, "apply_lut_to_clip"),
+            (self.set_transition, "set_transition_for_selected"),
+        ):
+            action.triggered.connect(
+                lambda checked=False, n=name: view._dispatch(n)
+            )
 
 
 class VisualTimeline(QGraphicsView):
@@ -324,8 +728,8 @@ class VisualTimeline(QGraphicsView):
     scrubbed = Signal(float)
     
     # Altezza del ruler - MOLTO PIÙ COMPATTA
-    RULER_HEIGHT = 40
-    TRACK_OFFSET_Y = 48  # Uguale al ruler height
+    RULER_HEIGHT = 40
+    TRACK_OFFSET_Y = 48  # Uguale al ruler height
     
     def __init__(self, parent=None):
         """Inizializza la timeline visuale."""
@@ -341,27 +745,68 @@ class VisualTimeline(QGraphicsView):
             QPainter.SmoothPixmapTransform | 
             QPainter.TextAntialiasing
         )
-        self.setBackgroundBrush(UIConfig.BG_COLOR)
+        self.setBackgroundBrush(UIConfig.BG_BRUSH)
         self.setFrameShape(QFrame.NoFrame)
+
+        # Cache pixmap condivisa (thumbnail/waveform), limite 128 MB
+        QPixmapCache.setCacheLimit(128 * 1024)
         
-        # OpenGL viewport se disponibile
-        try:
-            from PySide6.QtOpenGLWidgets import QOpenGLWidget
-            self.setViewport(QOpenGLWidget())
-        except Exception:
-            pass
+        # OpenGL viewport solo su richiesta (UIConfig.USE_OPENGL / env
+        # PYEDITOR_OPENGL=1); se l'import fallisce si resta sul raster
+        if UIConfig.USE_OPENGL:
+            try:
+                from PySide6.QtOpenGLWidgets import QOpenGLWidget
+                self.setViewport(QOpenGLWidget())
+            except Exception:
+                pass
         
         # Data
         self.items_list: List[ClipGraphicsItem] = []
         self.clips: List[TimelineClip] = []
+
+        # Mappa id(clip) -> item, ricostruita pigramente in item_for_clip
+        # quando items_list cambia (lunghezza o generazione diversa)
+        self._item_by_clip_id = {}
+        self._item_map_len = -1
+        self._item_map_gen = -1
+        self._items_generation = 0
+
+        # Estensioni x dei clip per hit-test binario (la scena e' NoIndex,
+        # scene().items() scansionerebbe tutti gli item)
+        self._extent_starts: List[float] = []
+        self._extents: List[tuple] = []
+
+        # Larghezze in struttura parallela (SoA): somme e layout diventano
+        # operazioni vettoriali invece di N accessi ad attributi
+        self._widths = []
         
-        # Zoom
+        # Zoom; pps cache-ato e ricalcolato solo quando _zoom cambia
         self._zoom = 1.0
+        self._pps_cache = max(10.0, UIConfig.BASE_PX_PER_SEC * self._zoom)
         
         # Playhead
         self.playhead_sec = 0.0
         self._scrubbing = False
+        # Ultima x (coordinate viewport) del playhead, per invalidare solo
+        # l'unione delle due strisce vecchia/nuova invece dell'intera viewport
+        self._last_playhead_px = 0
         
+        # Pen e font del righello costruiti una volta sola: drawForeground
+        # gira a ogni repaint della viewport
+        self._ruler_dot_pen = QPen(QColor(90, 95, 105), 1, Qt.DotLine)
+        self._ruler_dot_pen.setCosmetic(True)
+        self._ruler_major_pen = QPen(QColor(180, 190, 200), 1)
+        self._ruler_grid_pen = QPen(QColor(50, 55, 65), 1)
+        self._ruler_grid_pen.setCosmetic(True)
+        self._ruler_font = QFont("Segoe UI", 9)
+
+        # Etichette dei secondi gia' shapate (QStaticText), chiave = secondo
+        self._tick_label_cache = {}
+
+        # Pattern delle corsie alternate (due lane da 40px) tile-ato dal
+        # backend con un solo fillRect invece di un fillRect per corsia
+        self._lane_brush = QBrush(self._build_lane_pattern())
+
         # Throttling per scrubbing
         self._throttle_timer = QTimer(self)
         self._throttle_timer.setInterval(AppConfig.THROTTLE_INTERVAL_MS)
@@ -369,61 +814,65 @@ class VisualTimeline(QGraphicsView):
         self._pending_scrub_sec = None
         
         # UI Settings - Altezza minima più compatta
-        self.setMinimumHeight(160)
-        self.setMaximumHeight(260)
+        self.setMinimumHeight(160)
+        self.setMaximumHeight(260)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setAcceptDrops(True)
         
+        # Cache degli antenati risolti per nome di metodo: la prima
+        # invocazione dal context menu risale la catena dei parent, le
+        # successive sono un lookup su dict + un getattr
+        self._ancestor_cache = {}
+        # id() degli antenati gia' agganciati al segnale destroyed, per
+        # non connettere lo stesso oggetto piu' volte
+        self._ancestor_hooked = set()
+
         # Context menu actions
         self._setup_context_menu()
     
     def _setup_context_menu(self):
         """Configura le azioni del context menu."""
-        self.act_split = QAction("Split at Playhead", self)
-        self.act_remove = QAction("Remove Selected Clip", self)
-        self.act_duplicate = QAction("Duplicate Clip", self)
-        self.act_properties = QAction("Clip Properties", self)
-        self.act_apply_trim = QAction("Apply Trim (to tools)", self)
-        self.act_apply_title = QAction("Apply Title (to tools)", self)
-        self.act_apply_lut = QAction("Apply LUT (to tools)", self)
-        self.act_set_transition = QAction("Set Transition (to tools)", self)
-        self.act_zoom_in = QAction("Zoom In", self)
-        self.act_zoom_out = QAction("Zoom Out", self)
-        self.act_fit = QAction("Fit Timeline", self)
-        
-        self.act_zoom_in.triggered.connect(self.zoom_in)
-        self.act_zoom_out.triggered.connect(self.zoom_out)
-        self.act_fit.triggered.connect(self.fit_timeline)
+        self._menu_actions = _ContextMenuActions(self)
     
     def px_per_sec(self) -> float:
-        """Ritorna i pixel per secondo correnti."""
-        return max(10.0, UIConfig.BASE_PX_PER_SEC * self._zoom)
-    
+        """Ritorna i pixel per secondo correnti (valore cache-ato)."""
+        return self._pps_cache
+
+    def _recompute_pps(self):
+        """Ricalcola il pps dopo un cambio di zoom e lo propaga agli item."""
+        self._pps_cache = max(10.0, UIConfig.BASE_PX_PER_SEC * self._zoom)
+        for item in self.items_list:
+            if hasattr(item, 'set_pps'):
+                item.set_pps(self._pps_cache)
+
     # --- Zoom Methods ---
-    
+
     def zoom_in(self):
         """Aumenta lo zoom."""
         self._zoom = min(8.0, self._zoom * 1.25)
+        self._recompute_pps()
         self.repack_by_order()
-    
+
     def zoom_out(self):
         """Diminuisce lo zoom."""
         self._zoom = max(0.2, self._zoom / 1.25)
+        self._recompute_pps()
         self.repack_by_order()
-    
+
     def fit_timeline(self):
         """Adatta la timeline alla larghezza della viewport."""
-        width_sum = sum(it.width for it in self.items_list)
+        width_sum = self._total_width()
         width_sum += UIConfig.GAP * (len(self.items_list) - 1 if self.items_list else 0)
-        
+
         viewport_width = max(self.viewport().width(), 1)
-        
+
         if width_sum <= 0:
             return
-        
+
         target_zoom = ((viewport_width - 80) / max(width_sum, 1)) * self._zoom
         self._zoom = max(0.2, min(8.0, target_zoom))
+        self._recompute_pps()
         self.repack_by_order()
     
     def wheelEvent(self, event: QWheelEvent):
@@ -440,11 +889,34 @@ class VisualTimeline(QGraphicsView):
     
     # --- Timeline Management ---
     
+    def item_for_clip(self, clip: TimelineClip):
+        """
+        Ritorna il ClipGraphicsItem del clip in O(1).
+
+        La mappa viene ricostruita solo quando items_list risulta
+        cambiata; i chiamanti evitano cosi' la scansione lineare per
+        ogni selezione/preview pronta.
+        """
+        if (self._item_map_len == len(self.items_list)
+                and self._item_map_gen == self._items_generation):
+            item = self._item_by_clip_id.get(id(clip))
+            if item is not None and item.clip is clip:
+                return item
+        self._item_by_clip_id = {id(it.clip): it for it in self.items_list}
+        self._item_map_len = len(self.items_list)
+        self._item_map_gen = self._items_generation
+        return self._item_by_clip_id.get(id(clip))
+
     def clear_all(self):
         """Pulisce la timeline."""
         self.scene().clear()
         self.items_list.clear()
+        # Gli item appena distrutti non devono sopravvivere nella mappa
+        self._items_generation += 1
         self.clips.clear()
+        self._extent_starts.clear()
+        self._extents.clear()
+        self._widths = []
         self.playhead_sec = 0.0
     
     def rebuild(self, clips: List[TimelineClip]):
@@ -473,7 +945,7 @@ class VisualTimeline(QGraphicsView):
             else:
                 item = ClipGraphicsItem(
                     clip,
-                    lambda: px_per_sec,
+                    px_per_sec,
                     self._emit_trim_changed
                 )
             item.setPos(QPointF(x, self.TRACK_OFFSET_Y))
@@ -481,16 +953,33 @@ class VisualTimeline(QGraphicsView):
             self.items_list.append(item)
             x += getattr(item, "width", 120) + UIConfig.GAP
 
+        self._rebuild_extents()
+        self._update_index_method()
         self._update_scene_rect()
         self.viewport().update()
-    
+
+    def _update_index_method(self):
+        """
+        Sceglie l'indice spaziale in base al numero di item.
+
+        Sotto i 64 item la scansione lineare (NoIndex) batte il costo di
+        mantenimento del BSP; oltre, l'indice rende hit-test e culling
+        O(log N).
+        """
+        method = (
+            QGraphicsScene.BspTreeIndex
+            if len(self.items_list) > 64 else QGraphicsScene.NoIndex
+        )
+        if self.scene().itemIndexMethod() != method:
+            self.scene().setItemIndexMethod(method)
+
     def append_clip(self, clip: TimelineClip):
         """Aggiunge un clip alla fine della timeline."""
         self.clips.append(clip)
         
         item = ClipGraphicsItem(
             clip,
-            self.px_per_sec,
+            self.px_per_sec(),
             self._emit_trim_changed
         )
         
@@ -504,13 +993,15 @@ class VisualTimeline(QGraphicsView):
         item.setPos(QPointF(x, self.TRACK_OFFSET_Y))
         self.scene().addItem(item)
         self.items_list.append(item)
-        
+        self._rebuild_extents()
+        self._update_index_method()
+
         self._update_scene_rect()
         self.update()
     
     def _update_scene_rect(self):
         """Aggiorna le dimensioni della scena."""
-        width_sum = sum(it.width for it in self.items_list)
+        width_sum = self._total_width()
         width_sum += UIConfig.GAP * (len(self.items_list) - 1 if self.items_list else 0)
         
         viewport_w = max(self.viewport().width(), 1)
@@ -524,18 +1015,97 @@ class VisualTimeline(QGraphicsView):
     
     def repack_by_order(self):
         """Riposiziona i clip mantenendo l'ordine."""
-        ordered = sorted(self.items_list, key=lambda it: it.x())
-        
-        x = 0.0
-        for item in ordered:
-            item.setPos(QPointF(x, self.TRACK_OFFSET_Y))
-            x += item.width + UIConfig.GAP
-        
-        self.items_list = ordered
-        self.clips = [it.clip for it in ordered]
+        self.items_list = sorted(self.items_list, key=lambda it: it.x())
+        self._relayout_items()
+
+    def _repack_after_move(self, moved_item):
+        """
+        Reinserisce il solo item spostato nella posizione giusta.
+
+        Un drag cambia la posizione di un unico item: basta un inserimento
+        binario tra gli altri (gia' ordinati), senza il sort completo di
+        repack_by_order.
+        """
+        others = [it for it in self.items_list if it is not moved_item]
+        xs = [it.x() for it in others]
+        idx = bisect.bisect_right(xs, moved_item.x())
+        others.insert(idx, moved_item)
+        self.items_list = others
+        self._relayout_items()
+
+    def _repack_after_trim(self):
+        """Re-layout dopo un trim: le larghezze cambiano, l'ordine no."""
+        self._relayout_items()
+
+    def _relayout_items(self):
+        """Riposiziona gli item nell'ordine corrente di items_list."""
+        scene = self.scene()
+        scene.blockSignals(True)
+        n = len(self.items_list)
+        if np is not None and n > 1:
+            # Posizioni come cumsum vettoriale delle larghezze
+            widths = np.fromiter(
+                (it.width for it in self.items_list),
+                dtype=np.float64, count=n
+            )
+            xs = np.empty(n, dtype=np.float64)
+            xs[0] = 0.0
+            np.cumsum(widths[:-1] + UIConfig.GAP, out=xs[1:])
+            for item, x in zip(self.items_list, xs):
+                item.setPos(QPointF(float(x), self.TRACK_OFFSET_Y))
+        else:
+            x = 0.0
+            for item in self.items_list:
+                item.setPos(QPointF(x, self.TRACK_OFFSET_Y))
+                x += item.width + UIConfig.GAP
+        scene.blockSignals(False)
+
+        self.clips = [it.clip for it in self.items_list]
+        self._rebuild_extents()
         self.orderChanged.emit(self.clips)
         self._update_scene_rect()
         self.update()
+
+    def _rebuild_extents(self):
+        """Ricostruisce estensioni x e array delle larghezze."""
+        self._extent_starts = []
+        self._extents = []
+        widths = []
+        for it in self.items_list:
+            x0 = it.x()
+            w = it.width
+            self._extent_starts.append(x0)
+            self._extents.append((x0, x0 + w, it))
+            widths.append(w)
+        if np is not None:
+            self._widths = np.asarray(widths, dtype=np.float64)
+        else:
+            self._widths = widths
+
+    def _total_width(self) -> float:
+        """Somma delle larghezze dei clip (vettoriale se numpy presente)."""
+        if np is not None and len(self.items_list) == len(self._widths):
+            return float(self._widths.sum()) if len(self._widths) else 0.0
+        return sum(it.width for it in self.items_list)
+
+    def _clip_item_at(self, scene_pos) -> Optional[ClipGraphicsItem]:
+        """
+        Trova il clip sotto un punto scena in O(log N).
+
+        Returns:
+            Il ClipGraphicsItem colpito, oppure None
+        """
+        y = scene_pos.y()
+        if not (self.TRACK_OFFSET_Y <= y <= self.TRACK_OFFSET_Y + 60):
+            return None
+
+        x = scene_pos.x()
+        idx = bisect.bisect_right(self._extent_starts, x) - 1
+        if 0 <= idx < len(self._extents):
+            x0, x1, item = self._extents[idx]
+            if x0 <= x <= x1:
+                return item
+        return None
     
     def ripple_delete(self, clip: TimelineClip):
         """Remove a clip and ripple the following clips."""
@@ -550,9 +1120,12 @@ class VisualTimeline(QGraphicsView):
         self.items_list = [it for it in self.items_list if it.clip is not clip]
         self.repack_by_order()
     
-    def notify_item_moved(self):
+    def notify_item_moved(self, item=None):
         """Callback quando un item è stato spostato."""
-        self.repack_by_order()
+        if item is not None:
+            self._repack_after_move(item)
+        else:
+            self.repack_by_order()
     
     def _emit_trim_changed(self, clip: TimelineClip):
         """Emette il segnale di trim cambiato."""
@@ -568,6 +1141,9 @@ class VisualTimeline(QGraphicsView):
             self.set_playhead_x(scene_pos.x())
             self._scrubbing = True
             self.scrubbed.emit(self.playhead_sec)
+            # Timer di throttle acceso per tutta la durata dello scrub:
+            # i mouse move si limitano a depositare il valore pendente
+            self._throttle_timer.start()
         
         super().mousePressEvent(event)
         
@@ -582,37 +1158,44 @@ class VisualTimeline(QGraphicsView):
             scene_pos = self.mapToScene(event.pos())
             self.set_playhead_x(scene_pos.x())
             self._pending_scrub_sec = self.playhead_sec
-            
-            if not self._throttle_timer.isActive():
-                self._throttle_timer.start()
-        
+
         super().mouseMoveEvent(event)
-    
+
     def mouseReleaseEvent(self, event):
         """Termina lo scrubbing."""
+        if self._scrubbing:
+            self._throttle_timer.stop()
+            # Emette l'eventuale ultima posizione rimasta pendente
+            self._flush_throttled_events()
         self._scrubbing = False
         super().mouseReleaseEvent(event)
-    
+
     def _flush_throttled_events(self):
         """Flush degli eventi throttled."""
         if self._pending_scrub_sec is not None:
             self.scrubbed.emit(self._pending_scrub_sec)
             self._pending_scrub_sec = None
-        self._throttle_timer.stop()
     
     # --- Playhead ---
     
     def set_playhead_seconds(self, sec: float):
         """Imposta la posizione del playhead in secondi."""
         self.playhead_sec = max(0.0, sec)
-        pps = self.px_per_sec()
-        x = int(self.playhead_sec * pps - self.mapToScene(0, 0).x())
-        self.viewport().update(x - 10, 0, 20, self.viewport().height())
-    
+        x = int(self.playhead_sec * self.px_per_sec() - self.mapToScene(0, 0).x())
+        self._invalidate_playhead_strips(x)
+
     def set_playhead_x(self, scene_x: float):
         """Imposta la posizione del playhead da coordinata x della scena."""
         self.playhead_sec = max(0.0, scene_x / self.px_per_sec())
-        self.viewport().update()
+        x = int(scene_x - self.mapToScene(0, 0).x())
+        self._invalidate_playhead_strips(x)
+
+    def _invalidate_playhead_strips(self, new_x: int):
+        """Invalida solo le strisce verticali vecchia e nuova del playhead."""
+        vh = self.viewport().height()
+        self.viewport().update(self._last_playhead_px - 8, 0, 16, vh)
+        self.viewport().update(new_x - 8, 0, 16, vh)
+        self._last_playhead_px = new_x
     
     # --- Drag & Drop ---
     
@@ -639,13 +1222,10 @@ class VisualTimeline(QGraphicsView):
             path = mime.text()
         
         if path and os.path.exists(path):
-            parent = self.parent()
-            while parent and not hasattr(parent, "drop_media_on_timeline"):
-                parent = parent.parent()
-            
-            if parent and hasattr(parent, "drop_media_on_timeline"):
-                parent.drop_media_on_timeline(path)
-            
+            handler = _walk_ancestors(self.parent(), "drop_media_on_timeline")
+            if handler is not None:
+                handler(path)
+
             event.acceptProposedAction()
     
     # --- Drawing ---
@@ -669,64 +1249,123 @@ class VisualTimeline(QGraphicsView):
         painter.setPen(QPen(QColor(70, 70, 80), 1))
         painter.drawLine(0, self.RULER_HEIGHT, viewport_rect.width(), self.RULER_HEIGHT)
         
-        # Lanes + ticks
-        self._draw_lanes_background(painter, viewport_rect)
-        self._draw_ruler_ticks(painter, viewport_rect)
+        # Lanes + ticks (i tick sono limitati alla regione esposta)
+        self._draw_lanes_background(painter, viewport_rect)
+        self._draw_ruler_ticks(painter, viewport_rect, rect)
         
         # Playhead red line
         self._draw_playhead(painter, viewport_rect)
         
         painter.restore()
     
-    def _draw_ruler_ticks(self, painter: QPainter, viewport_rect):
-        """Disegna i tick del righello con stile puntinato e griglia secondi."""
-        view_left = self.mapToScene(0, 0).x()
-        view_right = self.mapToScene(viewport_rect.width(), 0).x()
-        pps = self.px_per_sec()
-        
-        sec_start = max(0, int(view_left / pps) - 1)
-        sec_end = int(view_right / pps) + 2
-        
-        # Minor dotted marks (5 subdivisions per second)
-        dot_pen = QPen(QColor(90, 95, 105), 1, Qt.DotLine)
-        dot_pen.setCosmetic(True)
-        painter.setPen(dot_pen)
-        sub_steps = 5
-        for s in range(sec_start, sec_end + 1):
-            for i in range(1, sub_steps):
-                x = s * pps + (i * pps / sub_steps) - view_left
-                if 0 <= x <= viewport_rect.width():
-                    painter.drawLine(int(x), self.RULER_HEIGHT - 8, int(x), self.RULER_HEIGHT)
-        
-        # Major ticks + labels each second and grid lines
-        painter.setPen(QPen(QColor(180, 190, 200), 1))
-        painter.setFont(QFont("Segoe UI", 9))
-        grid_pen = QPen(QColor(50, 55, 65), 1)
-        grid_pen.setCosmetic(True)
-        for s in range(sec_start, sec_end + 1):
-            x = s * pps - view_left
-            if 0 <= x <= viewport_rect.width():
-                painter.drawLine(int(x), self.RULER_HEIGHT - 16, int(x), self.RULER_HEIGHT)
-                painter.drawText(int(x) + 3, 16, format_time(s))
-                painter.save()
-                painter.setPen(grid_pen)
-                painter.drawLine(int(x), self.RULER_HEIGHT + 1, int(x), viewport_rect.height())
-                painter.restore()
-
-    def _draw_lanes_background(self, painter: QPainter, viewport_rect):
-        top = self.RULER_HEIGHT + 1
-        h_total = viewport_rect.height() - top
-        if h_total <= 0:
-            return
-        lane_h = 40
-        y = top
-        alt1 = QColor(28, 32, 38)
-        alt2 = QColor(26, 30, 36)
-        i = 0
-        while y < viewport_rect.height():
-            painter.fillRect(0, int(y), viewport_rect.width(), lane_h, alt1 if i % 2 == 0 else alt2)
-            y += lane_h
-            i += 1
+    def _draw_ruler_ticks(self, painter: QPainter, viewport_rect, exposed=None):
+        """Disegna i tick del righello con stile puntinato e griglia secondi."""
+        view_left = self.mapToScene(0, 0).x()
+        view_right = self.mapToScene(viewport_rect.width(), 0).x()
+        pps = self.px_per_sec()
+
+        sec_start = max(0, int(view_left / pps) - 1)
+        sec_end = int(view_right / pps) + 2
+
+        # Con un invalidamento parziale (es. strisce del playhead) il loop
+        # gira solo sui secondi che intersecano la regione esposta
+        if exposed is not None:
+            sec_start = max(sec_start, int(exposed.left() / pps) - 1)
+            sec_end = min(sec_end, int(exposed.right() / pps) + 2)
+
+        ruler_h = self.RULER_HEIGHT
+        viewport_w = viewport_rect.width()
+        viewport_h = viewport_rect.height()
+
+        # Accumula le linee e le disegna in tre batch drawLines: un solo
+        # cambio di pen per gruppo invece di uno stato per tick
+        minor = []
+        major = []
+        grid = []
+        visible_labels = []
+
+        sub_steps = 5
+        if np is not None:
+            # Posizioni calcolate in blocco: broadcast secondi x sotto-step
+            # e maschera sul viewport, al posto del doppio loop Python
+            base = np.arange(sec_start, sec_end + 1, dtype=np.float64) * pps - view_left
+            sub = np.arange(1, sub_steps, dtype=np.float64) * (pps / sub_steps)
+            xs_minor = (base[:, None] + sub[None, :]).ravel()
+            xs_minor = xs_minor[(xs_minor >= 0) & (xs_minor <= viewport_w)]
+            for x in xs_minor:
+                xi = int(x)
+                minor.append(QLine(xi, ruler_h - 8, xi, ruler_h))
+
+            visible = (base >= 0) & (base <= viewport_w)
+            for s, x in zip(
+                np.nonzero(visible)[0] + sec_start, base[visible]
+            ):
+                xi = int(x)
+                major.append(QLine(xi, ruler_h - 16, xi, ruler_h))
+                grid.append(QLine(xi, ruler_h + 1, xi, viewport_h))
+                visible_labels.append((int(s), xi))
+        else:
+            for s in range(sec_start, sec_end + 1):
+                for i in range(1, sub_steps):
+                    x = s * pps + (i * pps / sub_steps) - view_left
+                    if 0 <= x <= viewport_w:
+                        minor.append(QLine(int(x), ruler_h - 8, int(x), ruler_h))
+
+                x = s * pps - view_left
+                if 0 <= x <= viewport_w:
+                    xi = int(x)
+                    major.append(QLine(xi, ruler_h - 16, xi, ruler_h))
+                    grid.append(QLine(xi, ruler_h + 1, xi, viewport_h))
+                    visible_labels.append((s, xi))
+
+        # Minor dotted marks (5 subdivisions per second)
+        painter.setPen(self._ruler_dot_pen)
+        painter.drawLines(minor)
+
+        # Griglia verticale sotto il righello
+        painter.setPen(self._ruler_grid_pen)
+        painter.drawLines(grid)
+
+        # Major ticks + labels each second
+        painter.setPen(self._ruler_major_pen)
+        painter.setFont(self._ruler_font)
+        painter.drawLines(major)
+
+        label_cache = self._tick_label_cache
+        for s, xi in visible_labels:
+            label = label_cache.get(s)
+            if label is None:
+                label = QStaticText(format_time(s))
+                label.setTextFormat(Qt.PlainText)
+                label.setPerformanceHint(QStaticText.AggressiveCaching)
+                label.prepare(QTransform(), self._ruler_font)
+                label_cache[s] = label
+            painter.drawStaticText(QPointF(xi + 3, 4), label)
+
+    @staticmethod
+    def _build_lane_pattern() -> QPixmap:
+        """Costruisce il pixmap 1x80 con le due corsie alternate."""
+        lane_h = 40
+        pattern = QPixmap(1, lane_h * 2)
+        p = QPainter(pattern)
+        p.fillRect(0, 0, 1, lane_h, QColor(28, 32, 38))
+        p.fillRect(0, lane_h, 1, lane_h, QColor(26, 30, 36))
+        p.end()
+        return pattern
+
+    def _draw_lanes_background(self, painter: QPainter, viewport_rect):
+        top = self.RULER_HEIGHT + 1
+        h_total = viewport_rect.height() - top
+        if h_total <= 0:
+            return
+        painter.save()
+        # Origine del brush allineata alla prima corsia sotto il righello
+        painter.setBrushOrigin(0, top)
+        painter.fillRect(
+            QRect(0, top, viewport_rect.width(), h_total),
+            self._lane_brush
+        )
+        painter.restore()
     
     def _draw_playhead(self, painter: QPainter, viewport_rect):
         """Disegna il playhead rosso."""
@@ -739,7 +1378,7 @@ class VisualTimeline(QGraphicsView):
         painter.drawLine(int(px), 0, int(px), viewport_rect.height())
         
         # Triangolo sul righello
-        painter.setBrush(UIConfig.PLAYHEAD_COLOR)
+        painter.setBrush(UIConfig.PLAYHEAD_BRUSH)
         painter.setPen(Qt.NoPen)
         
         triangle = QPolygonF([
@@ -754,12 +1393,13 @@ class VisualTimeline(QGraphicsView):
     def contextMenuEvent(self, event):
         """Mostra il context menu."""
         scene_pos = self.mapToScene(event.pos())
-        clicked_items = self.scene().items(scene_pos)
-        clicked_clip_item = None
-        for it in clicked_items:
-            if isinstance(it, ClipGraphicsItem):
-                clicked_clip_item = it
-                break
+        clicked_clip_item = self._clip_item_at(scene_pos)
+        if clicked_clip_item is None:
+            # Fallback: scansione completa della scena
+            for it in self.scene().items(scene_pos):
+                if isinstance(it, ClipGraphicsItem):
+                    clicked_clip_item = it
+                    break
 
         if clicked_clip_item:
             for it in self.items_list:
@@ -772,67 +1412,65 @@ class VisualTimeline(QGraphicsView):
             QMenu::item:selected { background-color: #2b2b2b; }
         """)
 
-        menu.addAction(self.act_split)
-        menu.addAction(self.act_remove)
-        menu.addAction(self.act_duplicate)
-        menu.addAction(self.act_properties)
+        acts = self._menu_actions
+        menu.addAction(acts.split)
+        menu.addAction(acts.remove)
+        menu.addAction(acts.duplicate)
+        menu.addAction(acts.properties)
         menu.addSeparator()
-        menu.addAction(self.act_apply_trim)
-        menu.addAction(self.act_apply_title)
-        menu.addAction(self.act_apply_lut)
-        menu.addAction(self.act_set_transition)
+        menu.addAction(acts.apply_trim)
+        menu.addAction(acts.apply_title)
+        menu.addAction(acts.apply_lut)
+        menu.addAction(acts.set_transition)
         menu.addSeparator()
-        menu.addAction(self.act_zoom_in)
-        menu.addAction(self.act_zoom_out)
-        menu.addAction(self.act_fit)
-
-        chosen = menu.exec(event.globalPos())
-
-        if chosen is self.act_split:
-            p = self.parent()
-            while p and not hasattr(p, "split_at_playhead"):
-                p = p.parent()
-            if p and hasattr(p, "split_at_playhead"):
-                p.split_at_playhead()
-        elif chosen is self.act_remove:
-            p = self.parent()
-            while p and not hasattr(p, "remove_selected_clip"):
-                p = p.parent()
-            if p and hasattr(p, "remove_selected_clip"):
-                p.remove_selected_clip()
-        elif chosen is self.act_duplicate:
-            p = self.parent()
-            while p and not hasattr(p, "duplicate_selected_clip"):
-                p = p.parent()
-            if p and hasattr(p, "duplicate_selected_clip"):
-                p.duplicate_selected_clip()
-        elif chosen is self.act_properties:
-            p = self.parent()
-            while p and not hasattr(p, "show_clip_properties"):
-                p = p.parent()
-            if p and hasattr(p, "show_clip_properties"):
-                p.show_clip_properties()
-        elif chosen is self.act_apply_trim:
-            p = self.parent()
-            while p and not hasattr(p, "apply_trim_to_clip"):
-                p = p.parent()
-            if p and hasattr(p, "apply_trim_to_clip"):
-                p.apply_trim_to_clip()
-        elif chosen is self.act_apply_title:
-            p = self.parent()
-            while p and not hasattr(p, "apply_title_to_clip"):
-                p = p.parent()
-            if p and hasattr(p, "apply_title_to_clip"):
-                p.apply_title_to_clip()
-        elif chosen is self.act_apply_lut:
-            p = self.parent()
-            while p and not hasattr(p, "apply_lut_to_clip"):
-                p = p.parent()
-            if p and hasattr(p, "apply_lut_to_clip"):
-                p.apply_lut_to_clip()
-        elif chosen is self.act_set_transition:
-            p = self.parent()
-            while p and not hasattr(p, "set_transition_for_selected"):
-                p = p.parent()
-            if p and hasattr(p, "set_transition_for_selected"):
-                p.set_transition_for_selected()
+        menu.addAction(acts.zoom_in)
+        menu.addAction(acts.zoom_out)
+        menu.addAction(acts.fit)
+
+        # Le azioni sono collegate via triggered -> _dispatch: l'exec
+        # blocca solo per la durata del menu, il routing lo fa Qt
+        menu.exec(event.globalPos())
+
+    def _dispatch(self, name: str):
+        """
+        Invoca il metodo `name` sul primo antenato che lo espone.
+
+        L'antenato risolto viene memoizzato (weakref, cosi' la cache non
+        tiene in vita widget distrutti): dopo la prima invocazione il
+        dispatch e' un lookup su dict piu' un getattr, senza riscansione
+        della catena dei parent con hasattr per ogni nome.
+        """
+        ref = self._ancestor_cache.get(name)
+        p = ref() if ref is not None else None
+        method = getattr(p, name, None) if p is not None else None
+
+        if method is None:
+            # Fast path: i gestori vivono sulla MainWindow e window() la
+            # raggiunge con una sola chiamata C++, invece di un
+            # attraversamento Python<->C++ per ogni livello di parent
+            top = self.window()
+            method = getattr(top, name, None) if top is not None else None
+            if method is None:
+                # self.parent() catturato una sola volta per trigger: il
+                # resto della risalita passa per _walk_ancestors
+                start = self.parent()
+                method = _walk_ancestors(start, name)
+            owner = getattr(method, "__self__", None)
+            if owner is not None:
+                self._ancestor_cache[name] = weakref.ref(owner)
+                # La distruzione dell'antenato svuota la cache: nessun
+                # rischio di dispatch su un wrapper C++ gia' deallocato
+                if id(owner) not in self._ancestor_hooked:
+                    self._ancestor_hooked.add(id(owner))
+                    try:
+                        owner.destroyed.connect(self._on_ancestor_destroyed)
+                    except Exception:
+                        pass
+
+        if method is not None:
+            method()
+
+    def _on_ancestor_destroyed(self, obj=None):
+        """Svuota la cache quando un antenato memoizzato viene distrutto."""
+        self._ancestor_cache.clear()
+        self._ancestor_hooked.clear()
@@ -1,29 +1,59 @@
-#!/usr/bin/env python3
-"""
-main.py
-
-Entry point dell'applicazione PyEditor - Video Editor Interattivo.
-"""
-
-import sys
-from PySide6.QtWidgets import QApplication
-from main_window import MainWindow
-
-
-def main():
-    """Funzione principale dell'applicazione."""
-    # Crea l'applicazione Qt
-    app = QApplication(sys.argv)
-    app.setApplicationName("PyEditor")
-    app.setOrganizationName("PyEditor")
-    
-    # Crea e mostra la finestra principale
-    window = MainWindow()
-    window.show()
-    
-    # Avvia l'event loop
-    sys.exit(app.exec())
-
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+main.py
+
+Entry point dell'applicazione PyEditor - Video Editor Interattivo.
+"""
+
+import sys
+from PySide6.QtCore import Qt, QCoreApplication
+from PySide6.QtGui import QColor, QPainter, QPixmap
+from PySide6.QtWidgets import QApplication, QSplashScreen
+from main_window import MainWindow
+
+
+def _build_splash_pixmap() -> QPixmap:
+    """Costruisce il pixmap dello splash screen (nessun file su disco)."""
+    pix = QPixmap(420, 240)
+    pix.fill(QColor(15, 20, 25))
+    p = QPainter(pix)
+    p.setPen(QColor(0, 180, 220))
+    font = p.font()
+    font.setPointSize(22)
+    font.setBold(True)
+    p.setFont(font)
+    p.drawText(pix.rect(), Qt.AlignCenter, "PyEditor")
+    p.end()
+    return pix
+
+
+def main():
+    """Funzione principale dell'applicazione."""
+    # Nome applicazione/organizzazione impostati via metodi statici prima
+    # di costruire la QApplication: niente lookup di slot sull'istanza
+    # nel percorso di avvio a freddo
+    QCoreApplication.setApplicationName("PyEditor")
+    QCoreApplication.setOrganizationName("PyEditor")
+
+    # Crea l'applicazione Qt
+    app = QApplication(sys.argv)
+
+    # Splash mostrato subito: il processEvents lascia Qt scaldare le sue
+    # cache (font, icone) mentre MainWindow si costruisce, migliorando
+    # lo startup percepito
+    splash = QSplashScreen(_build_splash_pixmap())
+    splash.show()
+    app.processEvents()
+
+    # Crea e mostra la finestra principale
+    window = MainWindow()
+    window.show()
+    splash.finish(window)
+
+    # Avvia l'event loop; SystemExit sollevato direttamente col codice di
+    # ritorno (stessa semantica di sys.exit, una chiamata in meno)
+    raise SystemExit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
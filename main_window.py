@@ -1,455 +1,845 @@
-#!/usr/bin/env python3
-"""
-main_window.py
-
-Finestra principale con pannello tools e chat AI switchabili.
-"""
-
-import os
-import json
-import tempfile
-import uuid
-from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
-
-from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QFileDialog, QPushButton, QLabel,
-    QVBoxLayout, QHBoxLayout, QSplitter, QFrame, QListWidgetItem,
-    QLineEdit, QSpinBox, QComboBox, QMessageBox, QScrollArea,
-    QStackedWidget, QTextEdit, QListWidget
-)
-from PySide6.QtCore import Qt, QUrl, QThreadPool, QTimer, Slot, QSettings
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtMultimediaWidgets import QVideoWidget
-from PySide6.QtGui import QKeyEvent
-
-from config import AppConfig, DARK_THEME_QSS
-from models import MediaItem, TimelineClip
-from widgets import MediaListWidget
-from graphics import VisualTimeline, ClipGraphicsItem
+#!/usr/bin/env python3
+"""
+main_window.py
+
+Finestra principale con pannello tools e chat AI switchabili.
+"""
+
+import bisect
+import html
+import os
+import json
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QFileDialog, QPushButton, QLabel,
+    QVBoxLayout, QHBoxLayout, QSplitter, QFrame, QListWidgetItem,
+    QLineEdit, QSpinBox, QComboBox, QMessageBox, QScrollArea,
+    QTextEdit, QListWidget, QListView, QApplication
+)
+from PySide6.QtCore import (
+    Qt, QObject, QUrl, QThreadPool, QTimer, QRunnable, Signal, Slot,
+    QSettings, QAbstractListModel, QModelIndex
+)
+from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+from PySide6.QtMultimediaWidgets import QVideoWidget
+from PySide6.QtGui import QKeyEvent
+
+from config import AppConfig, load_dark_theme
+from models import MediaItem, TimelineClip, flush_probe_cache
+from widgets import MediaListWidget
+from graphics import VisualTimeline, ClipGraphicsItem
 from preview_worker import PreviewWorker
 from effect_preview_worker import EffectPreviewWorker
-from utils import ensure_dir
-from export import ProjectExporter
-
-
-class ChatMessage(QWidget):
-    """Widget per un singolo messaggio nella chat."""
-    
-    def __init__(self, text: str, is_user: bool = True, parent=None):
-        super().__init__(parent)
-        
-        layout = QHBoxLayout(self)
-        layout.setContentsMargins(8, 4, 8, 4)
-        
-        # Bubble del messaggio
-        bubble = QFrame()
-        bubble.setObjectName("chatBubble")
-        bubble_layout = QVBoxLayout(bubble)
-        bubble_layout.setContentsMargins(12, 8, 12, 8)
-        
-        # Testo del messaggio
-        msg_label = QLabel(text)
-        msg_label.setWordWrap(True)
-        msg_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
-        
-        # Timestamp
-        time_label = QLabel(datetime.now().strftime("%H:%M"))
-        time_label.setObjectName("timestamp")
-        
-        bubble_layout.addWidget(msg_label)
-        bubble_layout.addWidget(time_label, alignment=Qt.AlignRight)
-        
-        # Stile diverso per user e bot
-        if is_user:
-            bubble.setProperty("userMessage", True)
-            layout.addStretch()
-            layout.addWidget(bubble)
-        else:
-            bubble.setProperty("botMessage", True)
-            layout.addWidget(bubble)
-            layout.addStretch()
-
-
-class MainWindow(QMainWindow):
-    """Finestra principale dell'applicazione."""
-    
-    def __init__(self):
-        super().__init__()
-        
-        self.setWindowTitle(AppConfig.WINDOW_TITLE)
-        self.resize(AppConfig.WINDOW_WIDTH, AppConfig.WINDOW_HEIGHT)
-        
-        # Data
-        self.media_items: List[MediaItem] = []
-        self.timeline: List[TimelineClip] = []
-        self.project_bg_music: Optional[str] = None
-        
-        # Chat history
-        self.chat_history: List[dict] = []
-        
-        # Directories
-        self.lut_dir = os.path.join(os.path.dirname(__file__), "luts")
-        os.makedirs(self.lut_dir, exist_ok=True)
-        
-        self._temp_preview_root = ensure_dir(
-            os.path.join(
-                tempfile.gettempdir(), 
-                f"pyeditor_previews_{uuid.uuid4().hex}"
-            )
-        )
-        
-        # Threading
-        self.pool = QThreadPool.globalInstance()
-        self.pool.setMaxThreadCount(AppConfig.MAX_PREVIEW_THREADS)
-        
-        # Cache
-        self._wave_cache = {}
-        self._thumbs_cache = {}
-        self._proxy_cache = {}
-        
-        # Seek throttling
-        self._seek_timer = QTimer(self)
-        self._seek_timer.setSingleShot(True)
-        self._seek_timer.setInterval(AppConfig.SEEK_THROTTLE_MS)
-        self._seek_timer.timeout.connect(self._do_seek_pending)
-        self._pending_seek_ms = 0
-        
-        # Build UI
-        self._build_ui()
-        self.setStyleSheet(DARK_THEME_QSS)
-        self._connect_signals()
-    
-    def _build_ui(self):
-        """Costruisce l'interfaccia utente."""
-        # Toolbar
-        toolbar = self._create_toolbar()
-        
-        # Left panel: Media Library
-        left_panel = self._create_media_library_panel()
-        
-        # Center panel: Preview + Timeline
-        center_panel = self._create_center_panel()
-        
-        # Right panel: Switchable (Tools / Chat)
-        right_panel = self._create_right_panel()
-        
-        # Assembly
-        left_widget = QWidget()
-        left_widget.setLayout(left_panel)
-        
-        center_widget = QWidget()
-        center_widget.setLayout(center_panel)
-        
-        splitter = QSplitter()
-        splitter.addWidget(left_widget)
-        splitter.addWidget(center_widget)
-        splitter.addWidget(right_panel)
-        splitter.setStretchFactor(1, 2)
-        
-        main_layout = QVBoxLayout()
-        main_layout.addWidget(toolbar)
-        main_layout.addWidget(splitter)
-        
-        container = QWidget()
-        container.setLayout(main_layout)
-        self.setCentralWidget(container)
-    
-    def _create_toolbar(self) -> QFrame:
-        """Crea la toolbar."""
-        toolbar = QFrame(self)
-        toolbar.setObjectName("toolbar")
-        toolbar.setFixedHeight(60)
-        
-        layout = QHBoxLayout(toolbar)
-        layout.setContentsMargins(10, 8, 10, 8)
-
-        # Left group
-        left = QHBoxLayout()
-        self.btn_import = QPushButton("Import")
-        self.btn_import.setProperty("primary", True)
-        self.btn_import.clicked.connect(self.import_media)
-
-        self.btn_add_to_tl = QPushButton("Add")
-        self.btn_add_to_tl.setProperty("secondary", True)
-        self.btn_add_to_tl.clicked.connect(self.add_selected_to_timeline)
-
-        self.track_selector = QComboBox()
-        self.track_selector.addItems(["Track 1", "Track 2"])
-        self.track_selector.setFixedWidth(100)
-
-        left.addWidget(self.btn_import)
-        left.addWidget(self.btn_add_to_tl)
-        left.addWidget(self.track_selector)
-
-        # Center group
-        center = QHBoxLayout()
-        center.addStretch()
-        center.addWidget(QLabel("Timeline"))
-        self.btn_zoom_out = QPushButton("−")
-        self.btn_zoom_out.clicked.connect(self.zoom_out)
-        self.btn_zoom_in = QPushButton("+")
-        self.btn_zoom_in.clicked.connect(self.zoom_in)
-        self.btn_fit = QPushButton("Fit")
-        self.btn_fit.clicked.connect(self.fit_timeline)
-
-        center.addSpacing(8)
-        center.addWidget(self.btn_zoom_out)
-        center.addWidget(self.btn_zoom_in)
-        center.addWidget(self.btn_fit)
-        center.addStretch()
-
-        # Right group
-        right = QHBoxLayout()
-        btn_save = QPushButton("Save")
-        btn_save.clicked.connect(self.save_project)
-        btn_load = QPushButton("Load")
-        btn_load.clicked.connect(self.load_project)
-        right.addStretch()
-        right.addWidget(btn_save)
-        right.addWidget(btn_load)
-
-        layout.addLayout(left)
-        layout.addLayout(center)
-        layout.addLayout(right)
-        
-        return toolbar
-    
-    def _create_media_library_panel(self) -> QVBoxLayout:
-        """Crea il pannello della libreria media."""
-        self.lib_list = MediaListWidget()
-        self.lib_list.setFixedWidth(270)
-        self.lib_list.setDragEnabled(True)
-        self.lib_list.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.lib_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.lib_list.itemDoubleClicked.connect(self.on_media_double)
-        
-        layout = QVBoxLayout()
-        layout.addWidget(QLabel("Media Library"))
-        layout.addWidget(self.lib_list)
-        
-        return layout
-    
-    def _create_center_panel(self) -> QVBoxLayout:
-        """Crea il pannello centrale."""
-        # Video widget
-        self.video_widget = QVideoWidget()
-        self.player = QMediaPlayer(self)
-        self.audio_out = QAudioOutput(self)
-        self.player.setAudioOutput(self.audio_out)
-        self.player.setVideoOutput(self.video_widget)
-
-        # Controls
-        play_btn = QPushButton("Play")
-        play_btn.clicked.connect(self.toggle_play)
-
-        pause_btn = QPushButton("Pause")
-        pause_btn.clicked.connect(self.player.pause)
-
-        stop_btn = QPushButton("Stop")
-        stop_btn.clicked.connect(self.player.stop)
-
-        jump_start_btn = QPushButton("<<")
-        jump_start_btn.clicked.connect(self.seek_to_start_of_selected_clip)
-
-        ctrls = QHBoxLayout()
-        ctrls.addWidget(play_btn)
-        ctrls.addWidget(pause_btn)
-        ctrls.addWidget(stop_btn)
-        ctrls.addWidget(jump_start_btn)
-
-        # Visual timeline
-        self.visual_timeline = VisualTimeline()
-        self.visual_timeline.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.visual_timeline.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        # Textual timeline list
-        self.tl_list = MediaListWidget()
-        self.tl_list.setFixedHeight(110)
-        self.tl_list.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.tl_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.tl_list.itemClicked.connect(self.on_tl_selected)
-
-        # Bottom widget
-        bottom_widget = QWidget()
-        bottom_layout = QVBoxLayout()
-        bottom_layout.setContentsMargins(0, 0, 0, 0)
-        bottom_layout.addLayout(ctrls)
-        bottom_layout.addWidget(QLabel("Timeline (visual)"))
-        bottom_layout.addWidget(self.visual_timeline)
-        bottom_layout.addWidget(QLabel("Timeline (list)"))
-        bottom_layout.addWidget(self.tl_list)
-        bottom_widget.setLayout(bottom_layout)
-
-        # Splitter verticale
-        splitter = QSplitter(Qt.Vertical)
-        self.video_widget.setMinimumHeight(120)
-        self.video_widget.setMaximumHeight(320)
-        splitter.addWidget(self.video_widget)
-        splitter.addWidget(bottom_widget)
-        splitter.setStretchFactor(0, 2)
-        splitter.setStretchFactor(1, 3)
-        splitter.setSizes([180, 340])
-        
-        self.center_splitter = splitter
-        
-        try:
-            self._restore_center_splitter()
-        except Exception:
-            pass
-
-        layout = QVBoxLayout()
-        layout.addWidget(splitter)
-
-        return layout
-
-    def _restore_center_splitter(self):
-        """Restore center splitter sizes."""
-        try:
-            settings = QSettings("PyEditor", "PyEditorApp")
-            val = settings.value("centerSplitterSizes", None)
-            if val:
-                if isinstance(val, (list, tuple)):
-                    sizes = [int(x) for x in val]
-                else:
-                    try:
-                        sizes = [int(x) for x in str(val).split(',')]
-                    except Exception:
-                        sizes = None
-
-                if sizes and hasattr(self, 'center_splitter'):
-                    self.center_splitter.setSizes(sizes)
-        except Exception:
-            pass
-
-    def _save_center_splitter(self):
-        """Save center splitter sizes."""
-        try:
-            if hasattr(self, 'center_splitter'):
-                sizes = self.center_splitter.sizes()
-                settings = QSettings("PyEditor", "PyEditorApp")
-                settings.setValue("centerSplitterSizes", sizes)
-        except Exception:
-            pass
-
-    def closeEvent(self, event):
-        """Persist UI state."""
-        try:
-            self._save_center_splitter()
-        except Exception:
-            pass
-        super().closeEvent(event)
-    
-    def _create_right_panel(self) -> QWidget:
-        """Crea il pannello destro switchabile (Tools / Chat)."""
-        container = QWidget()
-        container.setObjectName("rightPanel")
-        main_layout = QVBoxLayout(container)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        main_layout.setSpacing(0)
-        
-        # Header con switch buttons
-        header = QFrame()
-        header.setObjectName("rightPanelHeader")
-        header.setFixedHeight(50)
-        header_layout = QHBoxLayout(header)
-        header_layout.setContentsMargins(8, 8, 8, 8)
-        
-        self.btn_tools = QPushButton("🛠 Tools")
-        self.btn_tools.setCheckable(True)
-        self.btn_tools.setChecked(True)
-        self.btn_tools.setProperty("panelSwitch", True)
-        self.btn_tools.clicked.connect(lambda: self._switch_right_panel(0))
-        
-        self.btn_chat = QPushButton("💬 AI Chat")
-        self.btn_chat.setCheckable(True)
-        self.btn_chat.setProperty("panelSwitch", True)
-        self.btn_chat.clicked.connect(lambda: self._switch_right_panel(1))
-        
-        header_layout.addWidget(self.btn_tools)
-        header_layout.addWidget(self.btn_chat)
-        
-        # Stacked widget per i due pannelli
-        self.right_stack = QStackedWidget()
-        
-        # Pannello 1: Tools (scroll area)
-        tools_scroll = QScrollArea()
-        tools_scroll.setWidgetResizable(True)
-        tools_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        tools_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
-        tools_widget = QWidget()
-        tools_widget.setObjectName("toolsPanel")
-        tools_layout = self._create_tools_panel()
-        tools_widget.setLayout(tools_layout)
-        
-        tools_scroll.setWidget(tools_widget)
-        
-        # Pannello 2: Chat (scroll area)
-        chat_scroll = QScrollArea()
-        chat_scroll.setWidgetResizable(True)
-        chat_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        chat_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
-        chat_widget = QWidget()
-        chat_widget.setObjectName("chatPanel")
-        chat_layout = self._create_chat_panel()
-        chat_widget.setLayout(chat_layout)
-        
-        chat_scroll.setWidget(chat_widget)
-        
-        # Aggiungi i pannelli allo stack
-        self.right_stack.addWidget(tools_scroll)
-        self.right_stack.addWidget(chat_scroll)
-        
-        # Assembly
-        main_layout.addWidget(header)
-        main_layout.addWidget(self.right_stack)
-        
-        return container
-    
-    def _switch_right_panel(self, index: int):
-        """Switch tra Tools e Chat panel."""
-        self.right_stack.setCurrentIndex(index)
-        
-        # Aggiorna bottoni
-        self.btn_tools.setChecked(index == 0)
-        self.btn_chat.setChecked(index == 1)
-    
-    def _create_tools_panel(self) -> QVBoxLayout:
-        """Crea il pannello tools."""
-        layout = QVBoxLayout()
-        layout.setContentsMargins(12, 12, 12, 12)
-        layout.setSpacing(8)
-        
-        layout.addWidget(QLabel("Clip Tools"))
-        
-        # Trim controls
-        layout.addWidget(QLabel("Start (sec)"))
-        self.start_edit = QLineEdit("0.0")
-        layout.addWidget(self.start_edit)
-        
-        layout.addWidget(QLabel("End (sec)"))
-        self.end_edit = QLineEdit("")
-        layout.addWidget(self.end_edit)
-        
-        apply_trim_btn = QPushButton("Apply Trim")
-        apply_trim_btn.clicked.connect(self.apply_trim_to_clip)
-        layout.addWidget(apply_trim_btn)
-        layout.addSpacing(12)
-        
-        # Title controls
-        layout.addWidget(QLabel("Title Text"))
-        self.title_edit = QLineEdit("")
-        layout.addWidget(self.title_edit)
-        
-        layout.addWidget(QLabel("Title Size"))
-        self.title_size = QSpinBox()
-        self.title_size.setRange(8, 200)
-        self.title_size.setValue(36)
-        layout.addWidget(self.title_size)
-        
+from utils import ensure_dir
+from export import ProjectExporter
+
+# orjson (opzionale): serializzatore JSON in C, nettamente piu' veloce
+# dello stdlib su progetti grandi; se assente si usa json con fallback
+# trasparente
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# numpy opzionale (come in graphics.py): searchsorted C sull'indice
+# temporale per timeline grandi, altrimenti bisect dello stdlib
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+# Costanti di AppConfig congelate in binding di modulo: i punti caldi le
+# leggono con un LOAD_GLOBAL invece del doppio lookup classe+attributo
+# (per override dinamici resta disponibile AppConfig stesso)
+_WIN_TITLE = AppConfig.WINDOW_TITLE
+_WIN_W, _WIN_H = AppConfig.WINDOW_WIDTH, AppConfig.WINDOW_HEIGHT
+_CHAT_HISTORY_MAX = AppConfig.CHAT_HISTORY_MAX
+_MAX_PREVIEW_THREADS = AppConfig.MAX_PREVIEW_THREADS
+_SEEK_THROTTLE_MS = AppConfig.SEEK_THROTTLE_MS
+
+
+# Risposte predefinite del bot (sostituisci con vera AI): dict e regex
+# delle keyword compilati una volta al load del modulo, non per messaggio
+_BOT_RESPONSES = {
+    "help": "I can help you with:\n• Trim and split clips\n• Apply effects and LUTs\n• Add titles and transitions\n• Export your project\n\nWhat would you like to do?",
+    "trim": "To trim a clip:\n1. Select the clip in timeline\n2. Go to Tools panel\n3. Set Start and End times\n4. Click 'Apply Trim'",
+    "export": "To export your project:\n1. Make sure all clips are in timeline\n2. Optional: Add background music\n3. Click 'Export Project' in Tools\n4. Choose output location",
+    "lut": "LUTs (Look-Up Tables) apply color grading:\n1. Select a clip\n2. Choose a LUT from dropdown\n3. Click 'Apply LUT to Clip'\n\nPlace .cube files in the 'luts' folder!",
+    "transition": "To add transitions:\n1. Select a clip\n2. Choose transition type (none/crossfade)\n3. Click 'Set Transition'\n\nThis will transition into the next clip!",
+}
+
+_BOT_KEYWORD_RE = re.compile(
+    "|".join(map(re.escape, _BOT_RESPONSES)), re.IGNORECASE
+)
+
+@lru_cache(maxsize=256)
+def _local_url(path: str) -> QUrl:
+    """
+    QUrl.fromLocalFile con cache: durante scrubbing e selezione il player
+    riceve ripetutamente gli stessi path, inutile ricostruire l'URL.
+    """
+    return QUrl.fromLocalFile(path)
+
+
+_BOT_DEFAULT_RESPONSE = (
+    "I'm here to help! Try asking about: trim, export, LUT, transition, "
+    "or type 'help' for more options."
+)
+
+
+class _StalePreviewPurge(QRunnable):
+    """
+    Rimuove in background le directory di preview di sessioni precedenti.
+
+    Ogni avvio crea una pyeditor_previews_<uuid> nuova e quelle vecchie
+    non venivano mai ripulite: qui si eliminano quelle piu' vecchie di
+    24 ore, fuori dal thread GUI.
+    """
+
+    MAX_AGE_SEC = 24 * 3600
+
+    @Slot()
+    def run(self):
+        cutoff = time.time() - self.MAX_AGE_SEC
+        try:
+            entries = os.scandir(tempfile.gettempdir())
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                if not entry.name.startswith("pyeditor_previews_"):
+                    continue
+                try:
+                    if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except OSError:
+                    continue
+
+
+class _MediaProbeSignals(QObject):
+    """Segnali del worker di probe dei media importati."""
+    done = Signal(object)  # MediaItem pronto, o None su errore
+
+
+class _MediaProbeWorker(QRunnable):
+    """
+    Costruisce un MediaItem fuori dal thread GUI.
+
+    Il costruttore di MediaItem esegue un ffprobe sincrono per la durata:
+    durante un import multiplo quei probe girano nel thread pool, non
+    sull'event loop.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.signals = _MediaProbeSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            media = MediaItem(self.path)
+        except Exception:
+            media = None
+        self.signals.done.emit(media)
+
+
+class TimelineListModel(QAbstractListModel):
+    """
+    Modello della timeline testuale.
+
+    Legge direttamente dalla lista di TimelineClip condivisa con la
+    MainWindow: nessun QListWidgetItem duplicato per riga e inserimenti
+    O(1) via beginInsertRows/endInsertRows.
+    """
+
+    def __init__(self, timeline: List[TimelineClip], parent=None):
+        super().__init__(parent)
+        self._timeline = timeline
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._timeline)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._timeline)):
+            return None
+        clip = self._timeline[index.row()]
+        if role == Qt.DisplayRole:
+            return clip.label()
+        if role == Qt.UserRole:
+            return clip
+        return None
+
+    def append_clip(self, clip: TimelineClip):
+        """Aggiunge un clip in coda alla lista condivisa."""
+        row = len(self._timeline)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._timeline.append(clip)
+        self.endInsertRows()
+
+    def insert_clip(self, row: int, clip: TimelineClip):
+        """Inserisce un clip alla riga data (una sola riga notificata)."""
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._timeline.insert(row, clip)
+        self.endInsertRows()
+
+    def remove_clip(self, clip: TimelineClip, row: int = -1):
+        """
+        Rimuove il clip dalla lista condivisa (una sola riga).
+
+        Args:
+            clip: Clip da rimuovere
+            row: Riga gia' nota al chiamante; se negativa viene cercata
+        """
+        if not (0 <= row < len(self._timeline) and self._timeline[row] is clip):
+            row = self.row_of(clip)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._timeline[row]
+        self.endRemoveRows()
+
+    def set_timeline(self, timeline: List[TimelineClip]):
+        """Ripunta il modello alla lista corrente (reset completo)."""
+        self.beginResetModel()
+        self._timeline = timeline
+        self.endResetModel()
+
+    def row_of(self, clip: TimelineClip) -> int:
+        """Ritorna la riga del clip, o -1 se assente."""
+        for i, c in enumerate(self._timeline):
+            if c is clip:
+                return i
+        return -1
+
+
+class ChatMessage(QLabel):
+    """
+    Widget per un singolo messaggio nella chat.
+
+    Una sola QLabel rich-text per messaggio (testo + timestamp) al posto
+    del vecchio composito frame+layout+due label: un QObject invece di
+    cinque, meno passate di style polish e di paint con centinaia di
+    messaggi in lista.
+    """
+
+    def __init__(self, text: str, is_user: bool = True, ts: Optional[str] = None, parent=None):
+        # time.strftime e' C-level: niente oggetto datetime per messaggio
+        ts = ts or time.strftime("%H:%M")
+        body = html.escape(text).replace("\n", "<br>")
+        super().__init__(
+            f'{body}<br>'
+            f'<span style="color: rgba(230,238,246,0.45); font-size: 7pt;">'
+            f'{ts}</span>',
+            parent
+        )
+        self.setObjectName("chatBubble")
+        self.setProperty("userMessage", is_user)
+        self.setTextFormat(Qt.RichText)
+        self.setWordWrap(True)
+        self.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.setAlignment(Qt.AlignRight if is_user else Qt.AlignLeft)
+
+
+class MainWindow(QMainWindow):
+    """Finestra principale dell'applicazione."""
+    
+    def __init__(self):
+        super().__init__()
+        
+        self.setWindowTitle(_WIN_TITLE)
+        self.resize(_WIN_W, _WIN_H)
+        
+        # Data
+        self.media_items: List[MediaItem] = []
+        # Indice path -> MediaItem: le lookup per percorso (drop, append in
+        # timeline) diventano O(1) invece di scansioni lineari della libreria
+        self._media_by_path: dict = {}
+        self.timeline: List[TimelineClip] = []
+        self.project_bg_music: Optional[str] = None
+        
+        # Chat history in forma colonnare (SoA): due ring buffer paralleli
+        # al posto di un dict per messaggio — meno oggetti Python per voce
+        # e serializzazione diretta delle due liste. 0 = user, 1 = assistant
+        self._chat_roles = deque(maxlen=_CHAT_HISTORY_MAX)
+        self._chat_contents = deque(maxlen=_CHAT_HISTORY_MAX)
+        self._chat_stretch = None
+        
+        # Directories
+        self.lut_dir = os.path.join(os.path.dirname(__file__), "luts")
+        os.makedirs(self.lut_dir, exist_ok=True)
+        
+        # Root delle preview creata pigramente al primo uso (proprieta'
+        # _temp_preview_root): zero I/O in avvio se non si generano preview
+        self._temp_preview_root_path: Optional[str] = None
+
+        # Threading
+        self.pool = QThreadPool.globalInstance()
+        self.pool.setMaxThreadCount(_MAX_PREVIEW_THREADS)
+
+        # Pulizia in background delle preview di sessioni precedenti
+        self.pool.start(_StalePreviewPurge())
+        
+        # Scritture QSettings coalescenti (vedi _queue_setting)
+        self._pending_settings = {}
+        self._settings_flush_timer = QTimer(self)
+        self._settings_flush_timer.setSingleShot(True)
+        self._settings_flush_timer.setInterval(500)
+        self._settings_flush_timer.timeout.connect(self._flush_settings)
+
+        # Import in corso: contatore e riferimenti ai worker di probe
+        # (tenuti vivi finche' i loro segnali non sono stati consegnati)
+        self._pending_imports = 0
+        self._probe_workers: List[_MediaProbeWorker] = []
+
+        # Dialog di import creato pigramente al primo uso e poi riusato
+        self._import_dialog: Optional[QFileDialog] = None
+
+        # Cache
+        self._wave_cache = {}
+        self._thumbs_cache = {}
+        # Mappa sorgente -> (mtime_ns, proxy): persistita su disco, cosi'
+        # al riavvio i proxy ancora validi non vengono ri-transcodificati
+        self._proxy_cache = self._load_proxy_cache()
+
+        # Cache TTL dei test di esistenza (proxy/preview): i gestori di
+        # scrub e selezione farebbero uno stat per evento, fino a 30/sec
+        self._path_exists_cache = {}
+
+        # Scan della directory LUT cache-ato sull'mtime della directory
+        self._lut_scan_mtime = -1
+        self._lut_cached: tuple = ()
+        # Ultima tupla applicata alla combo: se lo scan non cambia, il
+        # refresh evita clear + re-add (e la perdita della selezione)
+        self._lut_combo_items: Optional[tuple] = None
+        
+        # Seek throttling
+        self._seek_timer = QTimer(self)
+        self._seek_timer.setSingleShot(True)
+        self._seek_timer.setInterval(_SEEK_THROTTLE_MS)
+        self._seek_timer.timeout.connect(self._do_seek_pending)
+        self._pending_seek_ms = 0
+        # Path del sorgente attualmente caricato nel player: il confronto
+        # avviene su questa stringa, senza interrogare source().toLocalFile()
+        self._current_source_path: Optional[str] = None
+
+        # Un solo seek in volo: finche' il player non riporta la nuova
+        # posizione, gli scrub successivi aggiornano solo il pendente
+        self._pending_source: Optional[str] = None
+        self._pending_rate = 1.0
+        self._applied_seek_ms = -1
+        self._is_seeking = False
+        # Watchdog sul seek in volo: se positionChanged non arriva mai
+        # (il backend sopprime il segnale quando la posizione riportata
+        # non cambia), il flag viene liberato comunque dopo poco
+        self._seek_watchdog = QTimer(self)
+        self._seek_watchdog.setSingleShot(True)
+        self._seek_watchdog.setInterval(500)
+        self._seek_watchdog.timeout.connect(self._on_seek_watchdog)
+
+        # Indice temporale della timeline: prefix-sum degli inizi
+        # cumulativi dei clip, ricostruito pigramente alla prima lettura
+        # dopo una mutazione e interrogato con bisect — O(log N) per
+        # evento di scrub invece della scansione O(N)
+        self._cum_starts: List[float] = [0.0]
+        self._cum_np = None  # copia ndarray dell'indice (se numpy presente)
+        self._clip_index = {}
+        self._time_index_dirty = True
+
+        # Throttle degli aggiornamenti di posizione del player (~30 FPS)
+        self._pos_throttle_timer = QTimer(self)
+        self._pos_throttle_timer.setSingleShot(True)
+        self._pos_throttle_timer.setInterval(33)
+        self._pos_throttle_timer.timeout.connect(self._apply_pending_position)
+        self._pending_pos_ms = None
+        self._last_pos_ms = -(10 ** 9)
+        # Ultimo pixel su cui e' stato disegnato il playhead: posizioni
+        # che ricadono sullo stesso pixel non causano repaint della scena
+        self._last_playhead_px = -1
+
+        # Progress delle preview coalescato: la barra applica l'ultimo
+        # valore ricevuto al massimo una volta ogni 100 ms
+        self._preview_progress_timer = QTimer(self)
+        self._preview_progress_timer.setSingleShot(True)
+        self._preview_progress_timer.setInterval(100)
+        self._preview_progress_timer.timeout.connect(self._apply_preview_progress)
+        self._pending_progress = None
+
+        # Rebuild degli effect preview coalescati: una raffica di edit
+        # (trim+LUT+speed sullo stesso clip) produce un solo render ffmpeg
+        # per clip, 250 ms dopo l'ultima modifica
+        self._pending_effect_clips: dict = {}
+        self._effect_preview_timer = QTimer(self)
+        self._effect_preview_timer.setSingleShot(True)
+        self._effect_preview_timer.setInterval(250)
+        self._effect_preview_timer.timeout.connect(self._flush_effect_previews)
+        self._effect_workers_by_clip: dict = {}
+
+        # Completamenti preview raccolti e applicati una volta per frame
+        # (~16 ms): durante i caricamenti di progetto decine di done()
+        # ravvicinati diventano un solo giro di aggiornamenti GUI
+        self._ready_clips: list = []
+        self._ready_flush_timer = QTimer(self)
+        self._ready_flush_timer.setSingleShot(True)
+        self._ready_flush_timer.setInterval(16)
+        self._ready_flush_timer.timeout.connect(self._flush_ready_previews)
+
+        # Build UI
+        self._build_ui()
+        self.setStyleSheet(load_dark_theme())
+        self._connect_signals()
+    
+    def _build_ui(self):
+        """Costruisce l'interfaccia utente."""
+        # Toolbar
+        toolbar = self._create_toolbar()
+        
+        # Left panel: Media Library
+        left_panel = self._create_media_library_panel()
+        
+        # Center panel: Preview + Timeline
+        center_panel = self._create_center_panel()
+        
+        # Right panel: Switchable (Tools / Chat)
+        right_panel = self._create_right_panel()
+        
+        # Assembly
+        left_widget = QWidget()
+        left_widget.setLayout(left_panel)
+        
+        center_widget = QWidget()
+        center_widget.setLayout(center_panel)
+        
+        splitter = QSplitter()
+        splitter.addWidget(left_widget)
+        splitter.addWidget(center_widget)
+        splitter.addWidget(right_panel)
+        splitter.setStretchFactor(1, 2)
+        
+        main_layout = QVBoxLayout()
+        main_layout.addWidget(toolbar)
+        main_layout.addWidget(splitter)
+        
+        container = QWidget()
+        container.setLayout(main_layout)
+        self.setCentralWidget(container)
+    
+    def _create_toolbar(self) -> QFrame:
+        """Crea la toolbar."""
+        toolbar = QFrame(self)
+        toolbar.setObjectName("toolbar")
+        toolbar.setFixedHeight(60)
+        
+        layout = QHBoxLayout(toolbar)
+        layout.setContentsMargins(10, 8, 10, 8)
+
+        # Left group
+        left = QHBoxLayout()
+        self.btn_import = QPushButton("Import")
+        self.btn_import.setProperty("primary", True)
+        self.btn_import.clicked.connect(self.import_media)
+
+        self.btn_add_to_tl = QPushButton("Add")
+        self.btn_add_to_tl.setProperty("secondary", True)
+        self.btn_add_to_tl.clicked.connect(self.add_selected_to_timeline)
+
+        self.track_selector = QComboBox()
+        self.track_selector.addItems(["Track 1", "Track 2"])
+        self.track_selector.setFixedWidth(100)
+
+        left.addWidget(self.btn_import)
+        left.addWidget(self.btn_add_to_tl)
+        left.addWidget(self.track_selector)
+
+        # Center group
+        center = QHBoxLayout()
+        center.addStretch()
+        center.addWidget(QLabel("Timeline"))
+        self.btn_zoom_out = QPushButton("−")
+        self.btn_zoom_out.clicked.connect(self.zoom_out)
+        self.btn_zoom_in = QPushButton("+")
+        self.btn_zoom_in.clicked.connect(self.zoom_in)
+        self.btn_fit = QPushButton("Fit")
+        self.btn_fit.clicked.connect(self.fit_timeline)
+
+        center.addSpacing(8)
+        center.addWidget(self.btn_zoom_out)
+        center.addWidget(self.btn_zoom_in)
+        center.addWidget(self.btn_fit)
+        center.addStretch()
+
+        # Right group
+        right = QHBoxLayout()
+        btn_save = QPushButton("Save")
+        btn_save.clicked.connect(self.save_project)
+        btn_load = QPushButton("Load")
+        btn_load.clicked.connect(self.load_project)
+        right.addStretch()
+        right.addWidget(btn_save)
+        right.addWidget(btn_load)
+
+        layout.addLayout(left)
+        layout.addLayout(center)
+        layout.addLayout(right)
+        
+        return toolbar
+    
+    def _create_media_library_panel(self) -> QVBoxLayout:
+        """Crea il pannello della libreria media."""
+        self.lib_list = MediaListWidget()
+        self.lib_list.setFixedWidth(270)
+        self.lib_list.setDragEnabled(True)
+        self.lib_list.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.lib_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.lib_list.itemDoubleClicked.connect(self.on_media_double)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Media Library"))
+        layout.addWidget(self.lib_list)
+        
+        return layout
+    
+    def _create_center_panel(self) -> QVBoxLayout:
+        """Crea il pannello centrale."""
+        # Video widget
+        self.video_widget = QVideoWidget()
+        self.player = QMediaPlayer(self)
+        self.audio_out = QAudioOutput(self)
+        self.player.setAudioOutput(self.audio_out)
+        self.player.setVideoOutput(self.video_widget)
+
+        # Controls
+        play_btn = QPushButton("Play")
+        play_btn.clicked.connect(self.toggle_play)
+
+        pause_btn = QPushButton("Pause")
+        pause_btn.clicked.connect(self.player.pause)
+
+        stop_btn = QPushButton("Stop")
+        stop_btn.clicked.connect(self.player.stop)
+
+        jump_start_btn = QPushButton("<<")
+        jump_start_btn.clicked.connect(self.seek_to_start_of_selected_clip)
+
+        ctrls = QHBoxLayout()
+        ctrls.addWidget(play_btn)
+        ctrls.addWidget(pause_btn)
+        ctrls.addWidget(stop_btn)
+        ctrls.addWidget(jump_start_btn)
+
+        # Visual timeline
+        self.visual_timeline = VisualTimeline()
+        self.visual_timeline.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.visual_timeline.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+
+        # Textual timeline list: QListView su modello che legge
+        # direttamente self.timeline, niente item duplicati per riga
+        self.tl_list = QListView()
+        self.tl_list.setFixedHeight(110)
+        self.tl_list.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.tl_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.tl_model = TimelineListModel(self.timeline, self)
+        self.tl_list.setModel(self.tl_model)
+        self.tl_list.clicked.connect(self.on_tl_selected)
+
+        # Bottom widget
+        bottom_widget = QWidget()
+        bottom_layout = QVBoxLayout()
+        bottom_layout.setContentsMargins(0, 0, 0, 0)
+        bottom_layout.addLayout(ctrls)
+        bottom_layout.addWidget(QLabel("Timeline (visual)"))
+        bottom_layout.addWidget(self.visual_timeline)
+        bottom_layout.addWidget(QLabel("Timeline (list)"))
+        bottom_layout.addWidget(self.tl_list)
+        bottom_widget.setLayout(bottom_layout)
+
+        # Splitter verticale
+        splitter = QSplitter(Qt.Vertical)
+        self.video_widget.setMinimumHeight(120)
+        self.video_widget.setMaximumHeight(320)
+        splitter.addWidget(self.video_widget)
+        splitter.addWidget(bottom_widget)
+        splitter.setStretchFactor(0, 2)
+        splitter.setStretchFactor(1, 3)
+        splitter.setSizes([180, 340])
+        
+        self.center_splitter = splitter
+        
+        try:
+            self._restore_center_splitter()
+        except Exception:
+            pass
+
+        layout = QVBoxLayout()
+        layout.addWidget(splitter)
+
+        return layout
+
+    def _restore_center_splitter(self):
+        """Restore center splitter sizes."""
+        splitter = getattr(self, 'center_splitter', None)
+        if splitter is None:
+            return
+
+        settings = QSettings("PyEditor", "PyEditorApp")
+        val = settings.value("centerSplitterSizes", None)
+        if not val:
+            return
+
+        # Validazione esplicita dei valori, senza try/except di controllo
+        # di flusso: le voci non numeriche vengono semplicemente scartate
+        if isinstance(val, (list, tuple)):
+            raw = val
+        else:
+            raw = str(val).split(',')
+        sizes = [int(x) for x in raw if str(x).strip().isdigit()]
+
+        if sizes:
+            splitter.setSizes(sizes)
+
+    def _save_center_splitter(self):
+        """Save center splitter sizes."""
+        splitter = getattr(self, 'center_splitter', None)
+        if splitter is None:
+            return
+        self._queue_setting("centerSplitterSizes", splitter.sizes())
+
+    def _queue_setting(self, key: str, value):
+        """
+        Accoda una scrittura QSettings coalescendola con le successive.
+
+        Scritture ravvicinate della stessa chiave si sovrascrivono nel
+        dict pendente e il flush (timer da 500ms, o sincrono in chiusura)
+        apre QSettings una volta sola per l'intero batch.
+        """
+        self._pending_settings[key] = value
+        self._settings_flush_timer.start()
+
+    def _flush_settings(self):
+        """Scrive su disco tutte le impostazioni pendenti."""
+        if not self._pending_settings:
+            return
+        try:
+            settings = QSettings("PyEditor", "PyEditorApp")
+            for key, value in self._pending_settings.items():
+                settings.setValue(key, value)
+            settings.sync()
+        except Exception:
+            pass
+        self._pending_settings.clear()
+
+    @staticmethod
+    def _proxy_cache_file() -> str:
+        return os.path.join(str(Path.home()), ".cache", "pyeditor", "proxies.json")
+
+    def _load_proxy_cache(self) -> dict:
+        """
+        Carica la mappa dei proxy persistita dall'avvio precedente.
+
+        Le voci vengono validate qui: sorgente ancora esistente con lo
+        stesso mtime e file proxy ancora su disco; il resto viene scartato.
+        """
+        try:
+            with open(self._proxy_cache_file(), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except Exception:
+            return {}
+
+        cache = {}
+        for src, entry in raw.items():
+            try:
+                mtime_ns, proxy = int(entry[0]), entry[1]
+            except Exception:
+                continue
+            try:
+                if os.path.exists(proxy) and os.stat(src).st_mtime_ns == mtime_ns:
+                    cache[src] = (mtime_ns, proxy)
+            except OSError:
+                continue
+        return cache
+
+    def _save_proxy_cache(self):
+        """Persiste la mappa dei proxy (chiamato alla chiusura)."""
+        path = self._proxy_cache_file()
+        try:
+            ensure_dir(os.path.dirname(path))
+            data = {src: [mtime_ns, proxy]
+                    for src, (mtime_ns, proxy) in self._proxy_cache.items()}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except Exception:
+            pass
+
+    def _remember_proxy(self, media_path: str, proxy_path: str):
+        """Registra un proxy generato, legandolo all'mtime del sorgente."""
+        try:
+            self._proxy_cache[media_path] = (
+                os.stat(media_path).st_mtime_ns, proxy_path
+            )
+        except OSError:
+            pass
+
+    def _cached_proxy_for(self, media_path: str) -> Optional[str]:
+        """Ritorna il proxy in cache per il sorgente, se ancora su disco."""
+        entry = self._proxy_cache.get(media_path)
+        if entry and os.path.exists(entry[1]):
+            return entry[1]
+        return None
+
+    _PATH_EXISTS_TTL = 2.0
+
+    def _path_exists(self, path: str) -> bool:
+        """os.path.exists con cache TTL di 2 secondi."""
+        now = time.monotonic()
+        entry = self._path_exists_cache.get(path)
+        if entry is not None and now - entry[0] < self._PATH_EXISTS_TTL:
+            return entry[1]
+        ok = os.path.exists(path)
+        self._path_exists_cache[path] = (now, ok)
+        return ok
+
+    def _forget_path_exists(self, path: Optional[str]):
+        """Invalida la voce di cache dopo creazioni/rimozioni note."""
+        if path:
+            self._path_exists_cache.pop(path, None)
+
+    def closeEvent(self, event):
+        """Persist UI state."""
+        try:
+            self._save_center_splitter()
+            # Serializzazione diretta dei due array colonnari della chat
+            self._queue_setting("chatHistory", json.dumps({
+                "roles": list(self._chat_roles),
+                "contents": list(self._chat_contents),
+            }))
+            self._flush_settings()
+            self._save_proxy_cache()
+            flush_probe_cache()
+        except Exception:
+            pass
+        super().closeEvent(event)
+    
+    def _create_right_panel(self) -> QWidget:
+        """Crea il pannello destro switchabile (Tools / Chat)."""
+        container = QWidget()
+        container.setObjectName("rightPanel")
+        main_layout = QVBoxLayout(container)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+        
+        # Header con switch buttons
+        header = QFrame()
+        header.setObjectName("rightPanelHeader")
+        header.setFixedHeight(50)
+        header_layout = QHBoxLayout(header)
+        header_layout.setContentsMargins(8, 8, 8, 8)
+        
+        self.btn_tools = QPushButton("🛠 Tools")
+        self.btn_tools.setCheckable(True)
+        self.btn_tools.setChecked(True)
+        self.btn_tools.setProperty("panelSwitch", True)
+        self.btn_tools.clicked.connect(lambda: self._switch_right_panel(0))
+        
+        self.btn_chat = QPushButton("💬 AI Chat")
+        self.btn_chat.setCheckable(True)
+        self.btn_chat.setProperty("panelSwitch", True)
+        self.btn_chat.clicked.connect(lambda: self._switch_right_panel(1))
+        
+        header_layout.addWidget(self.btn_tools)
+        header_layout.addWidget(self.btn_chat)
+        
+        # Una sola QScrollArea condivisa tra Tools e Chat: essendo
+        # visibile un pannello per volta, due scroll area in uno stack
+        # raddoppierebbero viewport, scrollbar e pass di polish; lo switch
+        # riassegna il widget interno
+        self._shared_scroll = QScrollArea()
+        self._shared_scroll.setWidgetResizable(True)
+        self._shared_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self._shared_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+
+        # Pannello 1: Tools
+        self._tools_inner = QWidget()
+        self._tools_inner.setObjectName("toolsPanel")
+        self._tools_inner.setLayout(self._create_tools_panel())
+        self._shared_scroll.setWidget(self._tools_inner)
+
+        # Pannello 2: Chat — costruito pigramente alla prima apertura:
+        # widget e messaggio di benvenuto non pesano sull'avvio se
+        # l'utente non apre mai la chat
+        self._chat_built = False
+        self._chat_inner: Optional[QWidget] = None
+
+        # Assembly
+        main_layout.addWidget(header)
+        main_layout.addWidget(self._shared_scroll)
+
+        return container
+
+    def _build_chat_panel_now(self):
+        """Costruisce il widget del pannello chat."""
+        self._chat_inner = QWidget()
+        self._chat_inner.setObjectName("chatPanel")
+        self._chat_inner.setLayout(self._create_chat_panel())
+        self._chat_built = True
+
+    def _switch_right_panel(self, index: int):
+        """Switch tra Tools e Chat panel."""
+        if index == 1 and not self._chat_built:
+            self._build_chat_panel_now()
+
+        target = self._tools_inner if index == 0 else self._chat_inner
+        if self._shared_scroll.widget() is not target:
+            # takeWidget evita che setWidget distrugga il pannello uscente
+            self._shared_scroll.takeWidget()
+            self._shared_scroll.setWidget(target)
+
+        # Aggiorna bottoni
+        self.btn_tools.setChecked(index == 0)
+        self.btn_chat.setChecked(index == 1)
+    
+    def _create_tools_panel(self) -> QVBoxLayout:
+        """Crea il pannello tools."""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(8)
+        
+        layout.addWidget(QLabel("Clip Tools"))
+        
+        # Trim controls
+        layout.addWidget(QLabel("Start (sec)"))
+        self.start_edit = QLineEdit("0.0")
+        layout.addWidget(self.start_edit)
+        
+        layout.addWidget(QLabel("End (sec)"))
+        self.end_edit = QLineEdit("")
+        layout.addWidget(self.end_edit)
+        
+        apply_trim_btn = QPushButton("Apply Trim")
+        apply_trim_btn.clicked.connect(self.apply_trim_to_clip)
+        layout.addWidget(apply_trim_btn)
+        layout.addSpacing(12)
+        
+        # Title controls
+        layout.addWidget(QLabel("Title Text"))
+        self.title_edit = QLineEdit("")
+        layout.addWidget(self.title_edit)
+        
+        layout.addWidget(QLabel("Title Size"))
+        self.title_size = QSpinBox()
+        self.title_size.setRange(8, 200)
+        self.title_size.setValue(36)
+        layout.addWidget(self.title_size)
+        
         apply_title_btn = QPushButton("Apply Title")
         apply_title_btn.clicked.connect(self.apply_title_to_clip)
         layout.addWidget(apply_title_btn)
@@ -469,43 +859,43 @@ class MainWindow(QMainWindow):
         apply_speed_btn.clicked.connect(self.apply_speed_to_clip)
         layout.addWidget(apply_speed_btn)
         layout.addSpacing(12)
-        
-        # LUT controls
-        layout.addWidget(QLabel("Color/LUT"))
-        self.lut_combo = QComboBox()
-        self._refresh_lut_list()
-        layout.addWidget(self.lut_combo)
-        
-        apply_lut_btn = QPushButton("Apply LUT to Clip")
-        apply_lut_btn.clicked.connect(self.apply_lut_to_clip)
-        layout.addWidget(apply_lut_btn)
-        layout.addSpacing(12)
-
-        # Preview settings
-        layout.addWidget(QLabel("Preview Resolution"))
-        self.preview_res_combo = QComboBox()
-        self.preview_res_combo.addItems(["360p", "480p", "640p (default)", "720p"])
-        self.preview_res_combo.setCurrentIndex(2)
-        layout.addWidget(self.preview_res_combo)
-
-        self.proxy_checkbox = QPushButton("Use Proxies")
-        self.proxy_checkbox.setCheckable(True)
-        self.proxy_checkbox.setChecked(False)
-        layout.addWidget(self.proxy_checkbox)
-
-        # Proxy management
-        regen_proxy_btn = QPushButton("Regenerate Proxy")
-        regen_proxy_btn.clicked.connect(self._on_regenerate_proxy_clicked)
-        layout.addWidget(regen_proxy_btn)
-
-        clear_proxy_btn = QPushButton("Clear Proxy")
-        clear_proxy_btn.clicked.connect(self._on_clear_proxy_clicked)
-        layout.addWidget(clear_proxy_btn)
-        
-        layout.addSpacing(12)
-        
-        # Transition controls
-        layout.addWidget(QLabel("Transition to next clip"))
+        
+        # LUT controls
+        layout.addWidget(QLabel("Color/LUT"))
+        self.lut_combo = QComboBox()
+        self._refresh_lut_list()
+        layout.addWidget(self.lut_combo)
+        
+        apply_lut_btn = QPushButton("Apply LUT to Clip")
+        apply_lut_btn.clicked.connect(self.apply_lut_to_clip)
+        layout.addWidget(apply_lut_btn)
+        layout.addSpacing(12)
+
+        # Preview settings
+        layout.addWidget(QLabel("Preview Resolution"))
+        self.preview_res_combo = QComboBox()
+        self.preview_res_combo.addItems(["360p", "480p", "640p (default)", "720p"])
+        self.preview_res_combo.setCurrentIndex(2)
+        layout.addWidget(self.preview_res_combo)
+
+        self.proxy_checkbox = QPushButton("Use Proxies")
+        self.proxy_checkbox.setCheckable(True)
+        self.proxy_checkbox.setChecked(False)
+        layout.addWidget(self.proxy_checkbox)
+
+        # Proxy management
+        regen_proxy_btn = QPushButton("Regenerate Proxy")
+        regen_proxy_btn.clicked.connect(self._on_regenerate_proxy_clicked)
+        layout.addWidget(regen_proxy_btn)
+
+        clear_proxy_btn = QPushButton("Clear Proxy")
+        clear_proxy_btn.clicked.connect(self._on_clear_proxy_clicked)
+        layout.addWidget(clear_proxy_btn)
+        
+        layout.addSpacing(12)
+        
+        # Transition controls
+        layout.addWidget(QLabel("Transition to next clip"))
         self.transition_combo = QComboBox()
         # Supported xfade transitions
         self.transition_combo.addItems([
@@ -521,396 +911,479 @@ class MainWindow(QMainWindow):
             "circleopen",
             "circleclose"
         ])
-        layout.addWidget(self.transition_combo)
-        
-        apply_transition_btn = QPushButton("Set Transition")
-        apply_transition_btn.clicked.connect(self.set_transition_for_selected)
-        layout.addWidget(apply_transition_btn)
-        layout.addSpacing(12)
-        
-        # Clip operations
-        remove_btn = QPushButton("Remove Selected")
-        remove_btn.clicked.connect(self.remove_selected_clip)
-        layout.addWidget(remove_btn)
-        
-        split_btn = QPushButton("Split at Playhead")
-        split_btn.clicked.connect(self.split_at_playhead)
-        layout.addWidget(split_btn)
-        
-        duplicate_btn = QPushButton("Duplicate Clip")
-        duplicate_btn.clicked.connect(self.duplicate_selected_clip)
-        layout.addWidget(duplicate_btn)
-        
-        layout.addSpacing(12)
-        
-        # Background music
-        attach_music_btn = QPushButton("Choose Background Music")
-        attach_music_btn.clicked.connect(self.choose_bg_music)
-        layout.addWidget(attach_music_btn)
-        
-        self.bg_music_label = QLabel("No music")
-        self.bg_music_label.setWordWrap(True)
-        layout.addWidget(self.bg_music_label)
-        
-        layout.addSpacing(12)
-        
-        # Export
-        export_btn = QPushButton("Export Project")
-        export_btn.clicked.connect(self.export_project)
-        export_btn.setProperty("primary", True)
-        layout.addWidget(export_btn)
-        
-        # Progress indicator
-        from PySide6.QtWidgets import QProgressBar
-        self.preview_progress = QProgressBar()
-        self.preview_progress.setMinimum(0)
-        self.preview_progress.setMaximum(0)
-        self.preview_progress.setVisible(False)
-        layout.addWidget(self.preview_progress)
-
-        self.preview_status_label = QLabel("")
-        self.preview_status_label.setWordWrap(True)
-        self.preview_status_label.setVisible(False)
-        layout.addWidget(self.preview_status_label)
-        
-        layout.addStretch()
-
-        return layout
-    
-    def _create_chat_panel(self) -> QVBoxLayout:
-        """Crea il pannello chat AI."""
-        layout = QVBoxLayout()
-        layout.setContentsMargins(12, 12, 12, 12)
-        layout.setSpacing(8)
-        
-        # Header
-        header_label = QLabel("🤖 AI Assistant")
-        header_label.setStyleSheet("font-size: 14pt; font-weight: bold; color: #00b4d6;")
-        layout.addWidget(header_label)
-        
-        # Info label
-        info_label = QLabel("Ask me anything about video editing, effects, or timeline operations!")
-        info_label.setWordWrap(True)
-        info_label.setStyleSheet("color: rgba(230,238,246,0.7); font-size: 8pt;")
-        layout.addWidget(info_label)
-        
-        layout.addSpacing(8)
-        
-        # Chat messages area (scrollable)
-        self.chat_messages_widget = QWidget()
-        self.chat_messages_layout = QVBoxLayout(self.chat_messages_widget)
-        self.chat_messages_layout.setContentsMargins(0, 0, 0, 0)
-        self.chat_messages_layout.setSpacing(8)
-        self.chat_messages_layout.addStretch()
-        
-        # Scroll area for messages
-        chat_scroll = QScrollArea()
-        chat_scroll.setWidgetResizable(True)
-        chat_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        chat_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        chat_scroll.setWidget(self.chat_messages_widget)
-        chat_scroll.setMinimumHeight(300)
-        
-        layout.addWidget(chat_scroll, 1)
-        
-        # Input area
-        input_frame = QFrame()
-        input_frame.setObjectName("chatInputFrame")
-        input_layout = QVBoxLayout(input_frame)
-        input_layout.setContentsMargins(8, 8, 8, 8)
-        
-        self.chat_input = QTextEdit()
-        self.chat_input.setPlaceholderText("Type your message here...")
-        self.chat_input.setMaximumHeight(80)
-        self.chat_input.setMinimumHeight(60)
-        
-        # Bottoni azione
-        buttons_layout = QHBoxLayout()
-        
-        clear_btn = QPushButton("Clear Chat")
-        clear_btn.clicked.connect(self._clear_chat)
-        
-        send_btn = QPushButton("Send")
-        send_btn.setProperty("primary", True)
-        send_btn.clicked.connect(self._send_chat_message)
-        
-        buttons_layout.addWidget(clear_btn)
-        buttons_layout.addStretch()
-        buttons_layout.addWidget(send_btn)
-        
-        input_layout.addWidget(self.chat_input)
-        input_layout.addLayout(buttons_layout)
-        
-        layout.addWidget(input_frame)
-        
-        # Messaggio di benvenuto
-        self._add_chat_message("Hello! I'm your AI video editing assistant. How can I help you today?", is_user=False)
-        
-        return layout
-    
-    def _send_chat_message(self):
-        """Invia un messaggio nella chat."""
-        text = self.chat_input.toPlainText().strip()
-        
-        if not text:
-            return
-        
-        # Aggiungi messaggio utente
-        self._add_chat_message(text, is_user=True)
-        
-        # Salva nella history
-        self.chat_history.append({"role": "user", "content": text})
-        
-        # Pulisci input
-        self.chat_input.clear()
-        
-        # Simula risposta bot (qui puoi integrare una vera AI)
-        QTimer.singleShot(500, lambda: self._bot_response(text))
-    
-    def _bot_response(self, user_message: str):
-        """Genera una risposta del bot."""
-        # Risposte predefinite (sostituisci con vera AI)
-        responses = {
-            "help": "I can help you with:\n• Trim and split clips\n• Apply effects and LUTs\n• Add titles and transitions\n• Export your project\n\nWhat would you like to do?",
-            "trim": "To trim a clip:\n1. Select the clip in timeline\n2. Go to Tools panel\n3. Set Start and End times\n4. Click 'Apply Trim'",
-            "export": "To export your project:\n1. Make sure all clips are in timeline\n2. Optional: Add background music\n3. Click 'Export Project' in Tools\n4. Choose output location",
-            "lut": "LUTs (Look-Up Tables) apply color grading:\n1. Select a clip\n2. Choose a LUT from dropdown\n3. Click 'Apply LUT to Clip'\n\nPlace .cube files in the 'luts' folder!",
-            "transition": "To add transitions:\n1. Select a clip\n2. Choose transition type (none/crossfade)\n3. Click 'Set Transition'\n\nThis will transition into the next clip!",
-        }
-        
-        # Cerca keyword nella domanda
-        response = "I'm here to help! Try asking about: trim, export, LUT, transition, or type 'help' for more options."
-        
-        for keyword, answer in responses.items():
-            if keyword in user_message.lower():
-                response = answer
-                break
-        
-        # Aggiungi risposta bot
-        self._add_chat_message(response, is_user=False)
-        
-        # Salva nella history
-        self.chat_history.append({"role": "assistant", "content": response})
-    
-    def _add_chat_message(self, text: str, is_user: bool = True):
-        """Aggiunge un messaggio alla chat."""
-        # Rimuovi stretch temporaneamente
-        if self.chat_messages_layout.count() > 0:
-            item = self.chat_messages_layout.takeAt(self.chat_messages_layout.count() - 1)
-            if item.spacerItem():
-                del item
-        
-        # Aggiungi nuovo messaggio
-        message = ChatMessage(text, is_user)
-        self.chat_messages_layout.addWidget(message)
-        
-        # Ri-aggiungi stretch
-        self.chat_messages_layout.addStretch()
-        
-        # Scroll to bottom
-        QTimer.singleShot(100, self._scroll_chat_to_bottom)
-    
-    def _scroll_chat_to_bottom(self):
-        """Scrolla la chat fino in fondo."""
-        scroll_area = self.chat_messages_widget.parent()
-        if isinstance(scroll_area, QScrollArea):
-            scrollbar = scroll_area.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
-    
-    def _clear_chat(self):
-        """Pulisce la chat."""
-        # Rimuovi tutti i messaggi
-        while self.chat_messages_layout.count() > 1:  # Lascia lo stretch
-            item = self.chat_messages_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        # Reset history
-        self.chat_history.clear()
-        
-        # Messaggio di benvenuto
-        self._add_chat_message("Chat cleared! How can I assist you?", is_user=False)
-    
-    def _connect_signals(self):
-        """Connette i segnali."""
-        self.visual_timeline.orderChanged.connect(self._on_visual_order_changed)
-        self.visual_timeline.clipSelected.connect(self._on_visual_clip_selected)
-        self.visual_timeline.trimChanged.connect(self._on_visual_trim_changed)
-        self.visual_timeline.scrubbed.connect(self._on_scrubbed)
-        self.player.positionChanged.connect(self._on_player_position_changed)
-    
-    # --- Keyboard Shortcuts ---
-    
-    def keyPressEvent(self, event: QKeyEvent):
-        """Gestisce gli shortcut da tastiera."""
-        key = event.key()
-        
-        # Se siamo nella chat e premiamo Enter, invia messaggio
-        if self.chat_input.hasFocus():
-            if key == Qt.Key_Return and not (event.modifiers() & Qt.ShiftModifier):
-                self._send_chat_message()
-                event.accept()
-                return
-        
-        if key == Qt.Key_T:
-            self.split_at_playhead()
-        elif key in (Qt.Key_Delete, Qt.Key_Backspace):
-            self.remove_selected_clip()
-        elif key in (Qt.Key_Plus, Qt.Key_Equal):
-            self.zoom_in()
-        elif key == Qt.Key_Minus:
-            self.zoom_out()
-        elif key == Qt.Key_F:
-            self.fit_timeline()
-        elif key == Qt.Key_Space:
-            self.toggle_play()
-        else:
-            super().keyPressEvent(event)
-    
-    # --- Media Library Actions ---
-    
-    def import_media(self):
-        """Importa file media nella libreria."""
-        paths, _ = QFileDialog.getOpenFileNames(
-            self, 
-            "Import media", 
-            str(Path.home()),
-            "Media files (*.mp4 *.mov *.mkv *.avi *.mp3 *.wav *.png *.jpg *.jpeg)"
-        )
-        
-        for path in paths:
-            self._add_media_to_library(path)
-    
-    def _add_media_to_library(self, path: str):
-        """Aggiunge un media alla libreria."""
-        media_item = MediaItem(path)
-        self.media_items.append(media_item)
-        
-        duration_str = f" ({media_item.duration:.2f}s)" if media_item.duration else ""
-        item_text = f"{media_item.name} [{media_item.type}]{duration_str}"
-        
-        list_item = QListWidgetItem(item_text)
-        list_item.setData(Qt.UserRole, media_item)
-        self.lib_list.addItem(list_item)
-    
-    def on_media_double(self, item: QListWidgetItem):
-        """Gestisce il doppio click su un media nella libreria."""
-        media_item = item.data(Qt.UserRole)
-        
-        if media_item.type in ("video", "audio"):
-            self.player.setSource(QUrl.fromLocalFile(media_item.path))
-            self.player.play()
-    
-    # --- Timeline Actions ---
-    
-    def add_selected_to_timeline(self):
-        """Aggiunge il media selezionato alla timeline."""
-        sel = self.lib_list.currentItem()
-        
-        if not sel:
-            QMessageBox.information(
-                self, 
-                "Select media", 
-                "Select an item in the Media Library first."
-            )
-            return
-        
-        media_item = sel.data(Qt.UserRole)
-        self._append_media_path_to_timeline(media_item.path)
-    
-    def drop_media_on_timeline(self, path: str):
-        """Gestisce il drop di un media sulla timeline."""
-        if not any(m.path == path for m in self.media_items):
-            self._add_media_to_library(path)
-        
-        self._append_media_path_to_timeline(path)
-    
-    def _append_media_path_to_timeline(self, path: str):
-        """Aggiunge un media alla timeline dato il percorso."""
-        media_item = next((m for m in self.media_items if m.path == path), None)
-        
-        if not media_item:
-            media_item = MediaItem(path)
-            self.media_items.append(media_item)
-        
-        clip = TimelineClip(media_item)
-        self._prepare_clip_previews(clip)
-        
-        try:
-            clip.track = int(self.track_selector.currentIndex())
-        except Exception:
-            clip.track = 0
-
-        self.timeline.append(clip)
-        
-        list_item = QListWidgetItem(f"{media_item.name}  [{media_item.type}]")
-        list_item.setData(Qt.UserRole, clip)
-        self.tl_list.addItem(list_item)
-        
-        self.visual_timeline.append_clip(clip)
-    
-    def _on_visual_order_changed(self, new_order_clips: List[TimelineClip]):
-        """Gestisce il cambio d'ordine dei clip."""
-        self.timeline = list(new_order_clips)
-        
-        self.tl_list.clear()
-        for clip in self.timeline:
-            list_item = QListWidgetItem(f"{clip.media.name}  [{clip.media.type}]")
-            list_item.setData(Qt.UserRole, clip)
-            self.tl_list.addItem(list_item)
-    
-    def _on_visual_clip_selected(self, clip: TimelineClip):
-        """Gestisce la selezione di un clip."""
-        self._load_clip_into_tools(clip)
-        
+        layout.addWidget(self.transition_combo)
+        
+        apply_transition_btn = QPushButton("Set Transition")
+        apply_transition_btn.clicked.connect(self.set_transition_for_selected)
+        layout.addWidget(apply_transition_btn)
+        layout.addSpacing(12)
+        
+        # Clip operations
+        remove_btn = QPushButton("Remove Selected")
+        remove_btn.clicked.connect(self.remove_selected_clip)
+        layout.addWidget(remove_btn)
+        
+        split_btn = QPushButton("Split at Playhead")
+        split_btn.clicked.connect(self.split_at_playhead)
+        layout.addWidget(split_btn)
+        
+        duplicate_btn = QPushButton("Duplicate Clip")
+        duplicate_btn.clicked.connect(self.duplicate_selected_clip)
+        layout.addWidget(duplicate_btn)
+        
+        layout.addSpacing(12)
+        
+        # Background music
+        attach_music_btn = QPushButton("Choose Background Music")
+        attach_music_btn.clicked.connect(self.choose_bg_music)
+        layout.addWidget(attach_music_btn)
+        
+        self.bg_music_label = QLabel("No music")
+        self.bg_music_label.setWordWrap(True)
+        layout.addWidget(self.bg_music_label)
+        
+        layout.addSpacing(12)
+        
+        # Export
+        export_btn = QPushButton("Export Project")
+        export_btn.clicked.connect(self.export_project)
+        export_btn.setProperty("primary", True)
+        layout.addWidget(export_btn)
+        
+        # Progress indicator: barra determinata pilotata dal segnale
+        # progress del worker — quella indeterminata (max=0) forza Qt a
+        # ridisegnare in continuazione anche senza nulla da riportare
+        from PySide6.QtWidgets import QProgressBar
+        self.preview_progress = QProgressBar()
+        self.preview_progress.setMinimum(0)
+        self.preview_progress.setMaximum(100)
+        self.preview_progress.setVisible(False)
+        layout.addWidget(self.preview_progress)
+
+        self.preview_status_label = QLabel("")
+        self.preview_status_label.setWordWrap(True)
+        self.preview_status_label.setVisible(False)
+        layout.addWidget(self.preview_status_label)
+        
+        layout.addStretch()
+
+        return layout
+    
+    def _create_chat_panel(self) -> QVBoxLayout:
+        """Crea il pannello chat AI."""
+        layout = QVBoxLayout()
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(8)
+        
+        # Header e info: stile nel QSS globale (selettori #chatHeaderLabel
+        # e #chatInfoLabel) — un setStyleSheet per-widget dopo il tema
+        # forzerebbe un nuovo giro di unpolish/polish
+        header_label = QLabel("🤖 AI Assistant")
+        header_label.setObjectName("chatHeaderLabel")
+        layout.addWidget(header_label)
+
+        # Info label
+        info_label = QLabel("Ask me anything about video editing, effects, or timeline operations!")
+        info_label.setObjectName("chatInfoLabel")
+        info_label.setWordWrap(True)
+        layout.addWidget(info_label)
+        
+        layout.addSpacing(8)
+        
+        # Chat messages area (scrollable)
+        self.chat_messages_widget = QWidget()
+        self.chat_messages_layout = QVBoxLayout(self.chat_messages_widget)
+        self.chat_messages_layout.setContentsMargins(0, 0, 0, 0)
+        self.chat_messages_layout.setSpacing(8)
+        self.chat_messages_layout.addStretch()
+        # Riferimento allo stretch finale: _add_chat_message lo sgancia e
+        # riaggancia in O(1) invece di cercarlo con takeAt(count-1)
+        self._chat_stretch = self.chat_messages_layout.itemAt(
+            self.chat_messages_layout.count() - 1
+        )
+        
+        # Scroll area for messages
+        chat_scroll = QScrollArea()
+        chat_scroll.setWidgetResizable(True)
+        chat_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        chat_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        chat_scroll.setWidget(self.chat_messages_widget)
+        chat_scroll.setMinimumHeight(300)
+        # Riferimento diretto alla scroll area: .parent() sul widget dei
+        # messaggi ritorna il viewport, non la QScrollArea
+        self._chat_scroll_area = chat_scroll
+
+        layout.addWidget(chat_scroll, 1)
+        
+        # Input area
+        input_frame = QFrame()
+        input_frame.setObjectName("chatInputFrame")
+        input_layout = QVBoxLayout(input_frame)
+        input_layout.setContentsMargins(8, 8, 8, 8)
+        
+        self.chat_input = QTextEdit()
+        self.chat_input.setPlaceholderText("Type your message here...")
+        self.chat_input.setMaximumHeight(80)
+        self.chat_input.setMinimumHeight(60)
+        
+        # Bottoni azione
+        buttons_layout = QHBoxLayout()
+        
+        clear_btn = QPushButton("Clear Chat")
+        clear_btn.clicked.connect(self._clear_chat)
+        
+        send_btn = QPushButton("Send")
+        send_btn.setProperty("primary", True)
+        send_btn.clicked.connect(self._send_chat_message)
+        
+        buttons_layout.addWidget(clear_btn)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(send_btn)
+        
+        input_layout.addWidget(self.chat_input)
+        input_layout.addLayout(buttons_layout)
+        
+        layout.addWidget(input_frame)
+        
+        # Messaggio di benvenuto
+        self._add_chat_message("Hello! I'm your AI video editing assistant. How can I help you today?", is_user=False)
+        
+        return layout
+    
+    @property
+    def chat_history(self) -> List[dict]:
+        """
+        Materializza la history in forma {role, content} solo quando
+        richiesta (es. per inviarla a un vero backend AI); internamente
+        restano i due array colonnari.
+        """
+        roles = ("user", "assistant")
+        return [
+            {"role": roles[r], "content": c}
+            for r, c in zip(self._chat_roles, self._chat_contents)
+        ]
+
+    def _send_chat_message(self):
+        """Invia un messaggio nella chat."""
+        text = self.chat_input.toPlainText().strip()
+        
+        if not text:
+            return
+        
+        # Aggiungi messaggio utente
+        self._add_chat_message(text, is_user=True)
+        
+        # Salva nella history
+        self._chat_roles.append(0)
+        self._chat_contents.append(text)
+        
+        # Pulisci input
+        self.chat_input.clear()
+        
+        # Simula risposta bot (qui puoi integrare una vera AI)
+        QTimer.singleShot(500, lambda: self._bot_response(text))
+    
+    def _bot_response(self, user_message: str):
+        """Genera una risposta del bot."""
+        # Un solo match della regex precompilata al posto di N ricerche
+        # di sottostringa per messaggio
+        m = _BOT_KEYWORD_RE.search(user_message)
+        if m:
+            response = _BOT_RESPONSES[m.group(0).lower()]
+        else:
+            response = _BOT_DEFAULT_RESPONSE
+
+        # Aggiungi risposta bot
+        self._add_chat_message(response, is_user=False)
+        
+        # Salva nella history
+        self._chat_roles.append(1)
+        self._chat_contents.append(response)
+    
+    def _add_chat_message(self, text: str, is_user: bool = True):
+        """Aggiunge un messaggio alla chat."""
+        layout = self.chat_messages_layout
+
+        # Sgancia lo stretch finale (riferimento fisso, niente ricerca)
+        if self._chat_stretch is not None:
+            layout.removeItem(self._chat_stretch)
+
+        # Aggiungi nuovo messaggio
+        message = ChatMessage(text, is_user, ts=time.strftime("%H:%M"))
+        layout.addWidget(message)
+
+        # Evizione del piu' vecchio oltre il limite: la chat resta un
+        # working set limitato anche in sessioni lunghe
+        while layout.count() > _CHAT_HISTORY_MAX:
+            old = layout.takeAt(0)
+            w = old.widget()
+            if w is not None:
+                w.deleteLater()
+
+        # Ri-aggancia lo stretch
+        if self._chat_stretch is not None:
+            layout.addItem(self._chat_stretch)
+
+        # Scroll sincrono: consegna gli eventi di layout in sospeso e
+        # porta subito in vista il nuovo messaggio, senza il timer
+        # differito da 100 ms (niente round trip extra nell'event loop)
+        QApplication.sendPostedEvents(self._chat_scroll_area, 0)
+        self._chat_scroll_area.ensureWidgetVisible(message)
+
+    def _scroll_chat_to_bottom(self):
+        """Scrolla la chat fino in fondo."""
+        scrollbar = self._chat_scroll_area.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+    
+    def _clear_chat(self):
+        """Pulisce la chat."""
+        # Rimozione all'indietro: takeAt(0) farebbe scorrere il vettore
+        # interno del layout a ogni pop (O(n^2) sul totale); updates
+        # disabilitati per un solo invalidate a fine svuotamento
+        self.chat_messages_widget.setUpdatesEnabled(False)
+        layout = self.chat_messages_layout
+        for i in range(layout.count() - 2, -1, -1):  # Lascia lo stretch
+            item = layout.takeAt(i)
+            if item.widget():
+                item.widget().deleteLater()
+        self.chat_messages_widget.setUpdatesEnabled(True)
+        
+        # Reset history
+        self._chat_roles.clear()
+        self._chat_contents.clear()
+        
+        # Messaggio di benvenuto
+        self._add_chat_message("Chat cleared! How can I assist you?", is_user=False)
+    
+    def _connect_signals(self):
+        """Connette i segnali."""
+        self.visual_timeline.orderChanged.connect(self._on_visual_order_changed)
+        self.visual_timeline.clipSelected.connect(self._on_visual_clip_selected)
+        self.visual_timeline.trimChanged.connect(self._on_visual_trim_changed)
+        self.visual_timeline.scrubbed.connect(self._on_scrubbed)
+        self.player.positionChanged.connect(self._on_player_position_changed)
+    
+    # --- Keyboard Shortcuts ---
+
+    # Tabella di dispatch degli shortcut: lookup O(1) sul codice tasto al
+    # posto della catena di if/elif; i tasti che condividono un'azione
+    # (Delete/Backspace, Plus/Equal) puntano allo stesso metodo
+    _KEY_HANDLERS = {
+        Qt.Key_T: "split_at_playhead",
+        Qt.Key_Delete: "remove_selected_clip",
+        Qt.Key_Backspace: "remove_selected_clip",
+        Qt.Key_Plus: "zoom_in",
+        Qt.Key_Equal: "zoom_in",
+        Qt.Key_Minus: "zoom_out",
+        Qt.Key_F: "fit_timeline",
+        Qt.Key_Space: "toggle_play",
+    }
+
+    def keyPressEvent(self, event: QKeyEvent):
+        """Gestisce gli shortcut da tastiera."""
+        key = event.key()
+
+        # Se siamo nella chat e premiamo Enter, invia messaggio
+        # (chat_input esiste solo se il pannello chat e' stato costruito)
+        chat_input = getattr(self, 'chat_input', None)
+        if chat_input is not None and chat_input.hasFocus():
+            if key == Qt.Key_Return and not (event.modifiers() & Qt.ShiftModifier):
+                self._send_chat_message()
+                event.accept()
+                return
+
+        name = self._KEY_HANDLERS.get(key)
+        if name is not None:
+            getattr(self, name)()
+        else:
+            super().keyPressEvent(event)
+    
+    # --- Media Library Actions ---
+    
+    def import_media(self):
+        """Importa file media nella libreria."""
+        # Dialog riusato tra un import e l'altro: getOpenFileNames ne
+        # costruisce uno nuovo a ogni chiamata (sidebar, enumerazione
+        # directory, su alcune piattaforme anteprime); qui la seconda
+        # apertura riparte dal dialog gia' inizializzato, che ricorda
+        # anche l'ultima directory visitata
+        if self._import_dialog is None:
+            dlg = QFileDialog(self, "Import media")
+            dlg.setFileMode(QFileDialog.ExistingFiles)
+            dlg.setNameFilter(
+                "Media files (*.mp4 *.mov *.mkv *.avi *.mp3 *.wav *.png *.jpg *.jpeg)"
+            )
+            dlg.setDirectory(str(Path.home()))
+            self._import_dialog = dlg
+
+        if not self._import_dialog.exec():
+            return
+        paths = self._import_dialog.selectedFiles()
+
+        if not paths:
+            return
+
+        # Import in batch: i probe ffprobe girano nel thread pool e la
+        # lista non ridisegna a ogni riga; le righe vengono inserite man
+        # mano che i worker completano
+        self.lib_list.setUpdatesEnabled(False)
+        self._pending_imports += len(paths)
+        for path in paths:
+            worker = _MediaProbeWorker(path)
+            worker.signals.done.connect(self._on_media_probed)
+            self._probe_workers.append(worker)
+            self.pool.start(worker)
+
+    @Slot(object)
+    def _on_media_probed(self, media_item):
+        """Inserisce in libreria un media il cui probe e' completato."""
+        self._pending_imports = max(0, self._pending_imports - 1)
+
+        if media_item is not None:
+            self.media_items.append(media_item)
+            self._media_by_path[media_item.path] = media_item
+            self._add_media_item_to_library(media_item)
+
+        if self._pending_imports == 0:
+            self._probe_workers.clear()
+            self.lib_list.setUpdatesEnabled(True)
+
+    def _add_media_to_library(self, path: str):
+        """Aggiunge un media alla libreria (percorso sincrono)."""
+        media_item = MediaItem(path)
+        self.media_items.append(media_item)
+        self._media_by_path[path] = media_item
+        self._add_media_item_to_library(media_item)
+
+    def _add_media_item_to_library(self, media_item: MediaItem):
+        """Crea la riga di libreria per un MediaItem gia' costruito."""
+        list_item = QListWidgetItem(media_item._cached_label)
+        list_item.setData(Qt.UserRole, media_item)
+        self.lib_list.addItem(list_item)
+    
+    def on_media_double(self, item: QListWidgetItem):
+        """Gestisce il doppio click su un media nella libreria."""
+        media_item = item.data(Qt.UserRole)
+        
+        if media_item.type in ("video", "audio"):
+            self._set_player_source(media_item.path)
+            self.player.play()
+    
+    # --- Timeline Actions ---
+    
+    def add_selected_to_timeline(self):
+        """Aggiunge il media selezionato alla timeline."""
+        sel = self.lib_list.currentItem()
+        
+        if not sel:
+            QMessageBox.information(
+                self, 
+                "Select media", 
+                "Select an item in the Media Library first."
+            )
+            return
+        
+        media_item = sel.data(Qt.UserRole)
+        self._append_media_path_to_timeline(media_item.path)
+    
+    def drop_media_on_timeline(self, path: str):
+        """Gestisce il drop di un media sulla timeline."""
+        if path not in self._media_by_path:
+            self._add_media_to_library(path)
+        
+        self._append_media_path_to_timeline(path)
+    
+    def _append_media_path_to_timeline(self, path: str):
+        """Aggiunge un media alla timeline dato il percorso."""
+        media_item = self._media_by_path.get(path)
+
+        if not media_item:
+            media_item = MediaItem(path)
+            self.media_items.append(media_item)
+            self._media_by_path[path] = media_item
+        
+        clip = TimelineClip(media_item)
+        self._prepare_clip_previews(clip)
+        
+        try:
+            clip.track = int(self.track_selector.currentIndex())
+        except Exception:
+            clip.track = 0
+
+        self.tl_model.append_clip(clip)
+        self._time_index_dirty = True
+
+        self.visual_timeline.append_clip(clip)
+    
+    def _on_visual_order_changed(self, new_order_clips: List[TimelineClip]):
+        """Gestisce il cambio d'ordine dei clip."""
+        # Segnale d'ordine a ordine invariato (drag annullato, repack
+        # stabile): nessun reset del modello ne' invalidazione indici
+        if len(new_order_clips) == len(self.timeline) and all(
+            a is b for a, b in zip(new_order_clips, self.timeline)
+        ):
+            return
+        self.timeline = list(new_order_clips)
+        self.tl_model.set_timeline(self.timeline)
+        self._time_index_dirty = True
+    
+    def _on_visual_clip_selected(self, clip: TimelineClip):
+        """Gestisce la selezione di un clip."""
+        self._load_clip_into_tools(clip)
+        
         if clip.media.type in ("video", "audio"):
             # Prefer an effect preview if available, otherwise proxy or original
-            src_path = getattr(clip, 'effect_preview_path', None)
+            src_path = clip.effect_preview_path
             if not src_path:
                 src_path = clip.media.path
                 if getattr(self, 'proxy_checkbox', None) and self.proxy_checkbox.isChecked():
-                    if getattr(clip, 'proxy_path', None) and clip.proxy_path and os.path.exists(clip.proxy_path):
+                    if clip.proxy_path and self._path_exists(clip.proxy_path):
                         src_path = clip.proxy_path
 
-            self.player.setSource(QUrl.fromLocalFile(src_path))
+            self._set_player_source(src_path)
             try:
                 # If using baked preview, keep playback at 1x; otherwise reflect speed
-                spd = float(getattr(clip, 'speed', 1.0) or 1.0)
-                self.player.setPlaybackRate(1.0 if getattr(clip, 'effect_preview_path', None) else (spd if spd > 0 else 1.0))
+                self.player.setPlaybackRate(1.0 if clip.effect_preview_path else clip.speed)
             except Exception:
                 pass
             self.player.play()
-        
-        for i in range(self.tl_list.count()):
-            item = self.tl_list.item(i)
-            if item.data(Qt.UserRole) is clip:
-                self.tl_list.setCurrentRow(i)
-                break
-    
-    def _on_visual_trim_changed(self, clip: TimelineClip):
-        """Aggiorna i campi di trim."""
-        self.start_edit.setText(str(round(clip.start, 3)))
-        self.end_edit.setText("" if clip.end is None else str(round(clip.end, 3)))
-    
-    def on_tl_selected(self, item: QListWidgetItem):
-        """Gestisce la selezione nella lista testuale."""
-        clip = item.data(Qt.UserRole)
-        self._load_clip_into_tools(clip)
-        
-        if clip.media.type in ("video", "audio"):
-            src_path = clip.media.path
-            if getattr(self, 'proxy_checkbox', None) and self.proxy_checkbox.isChecked():
-                if getattr(clip, 'proxy_path', None) and clip.proxy_path and os.path.exists(clip.proxy_path):
-                    src_path = clip.proxy_path
-
-            self.player.setSource(QUrl.fromLocalFile(src_path))
-            self.player.play()
-        
-        for visual_item in self.visual_timeline.items_list:
-            visual_item.setSelected(visual_item.clip is clip)
-            if visual_item.clip is clip:
-                self.visual_timeline.centerOn(visual_item)
-    
+        
+        # Riga del clip via indice memoizzato (stesso ordine del modello)
+        if self._time_index_dirty:
+            self._rebuild_time_index()
+        row = self._clip_index.get(id(clip), -1)
+        if row >= 0:
+            self.tl_list.setCurrentIndex(self.tl_model.index(row, 0))
+    
+    def _on_visual_trim_changed(self, clip: TimelineClip):
+        """Aggiorna i campi di trim."""
+        self.start_edit.setText(str(round(clip.start, 3)))
+        self.end_edit.setText("" if clip.end is None else str(round(clip.end, 3)))
+        # Il trim cambia la durata effettiva: prefix-sum da ricostruire
+        self._time_index_dirty = True
+    
+    def on_tl_selected(self, index: QModelIndex):
+        """Gestisce la selezione nella lista testuale."""
+        clip = index.data(Qt.UserRole)
+        if clip is None:
+            return
+        self._load_clip_into_tools(clip)
+        
+        if clip.media.type in ("video", "audio"):
+            src_path = clip.media.path
+            if getattr(self, 'proxy_checkbox', None) and self.proxy_checkbox.isChecked():
+                if clip.proxy_path and self._path_exists(clip.proxy_path):
+                    src_path = clip.proxy_path
+
+            self._set_player_source(src_path)
+            self.player.play()
+        
+        for visual_item in self.visual_timeline.items_list:
+            visual_item.setSelected(visual_item.clip is clip)
+        target_item = self.visual_timeline.item_for_clip(clip)
+        if target_item is not None:
+            self.visual_timeline.centerOn(target_item)
+    
     def _load_clip_into_tools(self, clip: TimelineClip):
         """Carica i parametri di un clip nei tool."""
         self.start_edit.setText(str(clip.start))
@@ -920,159 +1393,234 @@ class MainWindow(QMainWindow):
         # Speed
         if hasattr(self, 'speed_spin'):
             try:
-                self.speed_spin.setValue(float(getattr(clip, 'speed', 1.0) or 1.0))
+                self.speed_spin.setValue(clip.speed)
             except Exception:
                 self.speed_spin.setValue(1.0)
-    
-    # --- Playback & Scrubbing ---
-    
-    def toggle_play(self):
-        """Toggle play/pause."""
-        if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            self.player.pause()
-        else:
-            self.player.play()
-    
-    def seek_to_start_of_selected_clip(self):
-        """Salta all'inizio del clip selezionato."""
-        sel = self.tl_list.currentItem()
-        
-        if sel:
-            clip = sel.data(Qt.UserRole)
-        else:
-            sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
-            if not sel_items:
-                return
-            clip = sel_items[0].clip
-        
-        self.player.setPosition(int(float(clip.start) * 1000))
-        self.visual_timeline.set_playhead_seconds(self._cumulative_start_of(clip))
-    
-    def _on_scrubbed(self, seconds: float):
-        """Gestisce lo scrubbing del playhead."""
-        target = self._clip_at_global_time(seconds)
-        if not target:
-            return
-        
+    
+    # --- Playback & Scrubbing ---
+    
+    def toggle_play(self):
+        """Toggle play/pause."""
+        if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            self.player.pause()
+        else:
+            self.player.play()
+    
+    def seek_to_start_of_selected_clip(self):
+        """Salta all'inizio del clip selezionato."""
+        idx = self.tl_list.currentIndex()
+
+        if idx.isValid():
+            clip = idx.data(Qt.UserRole)
+        else:
+            sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
+            if not sel_items:
+                return
+            clip = sel_items[0].clip
+        
+        self.player.setPosition(int(float(clip.start) * 1000))
+        self.visual_timeline.set_playhead_seconds(self._cumulative_start_of(clip))
+    
+    def _on_scrubbed(self, seconds: float):
+        """Gestisce lo scrubbing del playhead."""
+        target = self._clip_at_global_time(seconds)
+        if not target:
+            return
+        
         clip, local_sec = target
         # Account for speed: local timeline seconds map to media seconds * speed
-        spd = float(getattr(clip, 'speed', 1.0) or 1.0)
-        media_local = local_sec * (spd if spd > 0 else 1.0)
-        
-        for item in self.visual_timeline.items_list:
-            item.setSelected(item.clip is clip)
-        
+        media_local = local_sec * clip.speed
+
+        for item in self.visual_timeline.items_list:
+            item.setSelected(item.clip is clip)
+
         if clip.media.type in ("video", "audio"):
             # Prefer effect preview if exists; otherwise proxy/original
-            desired = getattr(clip, 'effect_preview_path', None) or clip.media.path
-            if not getattr(clip, 'effect_preview_path', None):
+            desired = clip.effect_preview_path or clip.media.path
+            if not clip.effect_preview_path:
                 if getattr(self, 'proxy_checkbox', None) and self.proxy_checkbox.isChecked():
-                    if getattr(clip, 'proxy_path', None) and clip.proxy_path and os.path.exists(clip.proxy_path):
+                    if clip.proxy_path and self._path_exists(clip.proxy_path):
                         desired = clip.proxy_path
 
-            if self.player.source().toLocalFile() != desired:
-                self.player.setSource(QUrl.fromLocalFile(desired))
-            
+            # Solo stato pendente: sorgente, rate e posizione vengono
+            # applicati in _do_seek_pending, al massimo ~6 volte/sec e
+            # mai con un seek ancora in volo — un setSource o setPosition
+            # per evento farebbe cancellare al decoder i frame in decode
+            self._pending_source = desired
+            self._pending_rate = 1.0 if clip.effect_preview_path else clip.speed
             self._pending_seek_ms = max(0, int((clip.start + media_local) * 1000))
-            self._seek_timer.start()
-            # Adjust playback rate if we're not using baked preview
-            try:
-                if getattr(clip, 'effect_preview_path', None):
-                    self.player.setPlaybackRate(1.0)
-                else:
-                    self.player.setPlaybackRate(spd if spd > 0 else 1.0)
-            except Exception:
-                pass
-    
-    def _do_seek_pending(self):
-        """Esegue il seek pendente."""
-        self.player.setPosition(self._pending_seek_ms)
-    
-    def _on_player_position_changed(self, ms: int):
-        """Sincronizza il playhead con il player."""
-        sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
-        if not sel_items:
-            return
-        
-        clip = sel_items[0].clip
-        spd = float(getattr(clip, 'speed', 1.0) or 1.0)
+            if not self._is_seeking and not self._seek_timer.isActive():
+                self._seek_timer.start()
+
+    def _set_player_source(self, path: str):
+        """
+        Cambia sorgente del player solo se diverso da quello corrente.
+
+        Il confronto usa il path cache-ato: niente source().toLocalFile()
+        per evento, e nessun setSource ridondante che farebbe abortire la
+        pipeline di decodifica.
+        """
+        if path != self._current_source_path:
+            self._current_source_path = path
+            self.player.setSource(_local_url(path))
+
+    def _do_seek_pending(self):
+        """Esegue il seek pendente (ultimo valore ricevuto)."""
+        desired = self._pending_source
+        if desired:
+            self._set_player_source(desired)
+        try:
+            self.player.setPlaybackRate(self._pending_rate)
+        except Exception:
+            pass
+        self._applied_seek_ms = self._pending_seek_ms
+        # Seek alla posizione gia' corrente: il backend non emetterebbe
+        # positionChanged (scarta i duplicati) e il flag resterebbe alzato
+        # per sempre, bloccando ogni scrub successivo. Niente flag e
+        # niente setPosition, non c'e' nulla da fare
+        if self._applied_seek_ms == self.player.position():
+            return
+        self._is_seeking = True
+        self._seek_watchdog.start()
+        self.player.setPosition(self._applied_seek_ms)
+
+    def _on_seek_watchdog(self):
+        """Libera un seek in volo il cui positionChanged non e' mai arrivato."""
+        if self._is_seeking:
+            self._is_seeking = False
+            if (self._pending_seek_ms != self._applied_seek_ms
+                    and not self._seek_timer.isActive()):
+                self._seek_timer.start()
+
+    def _on_player_position_changed(self, ms: int):
+        """Riceve la posizione del player e la applica throttled."""
+        # Il seek in volo e' arrivato: se nel frattempo lo scrub ha
+        # spostato il pendente, emetti l'ultimo seek mancante
+        if self._is_seeking:
+            self._is_seeking = False
+            self._seek_watchdog.stop()
+            if (self._pending_seek_ms != self._applied_seek_ms
+                    and not self._seek_timer.isActive()):
+                self._seek_timer.start()
+
+        # positionChanged arriva a 30+ Hz: spostamenti sotto soglia sono
+        # scartati e il redraw del playhead gira al piu' ogni 33ms
+        if abs(ms - self._last_pos_ms) < 15:
+            return
+        self._pending_pos_ms = ms
+        if not self._pos_throttle_timer.isActive():
+            self._pos_throttle_timer.start()
+
+    def _apply_pending_position(self):
+        """Sincronizza il playhead con l'ultima posizione pendente."""
+        ms = self._pending_pos_ms
+        if ms is None:
+            return
+        self._pending_pos_ms = None
+        self._last_pos_ms = ms
+
+        sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
+        if not sel_items:
+            return
+        
+        clip = sel_items[0].clip
         media_sec = (ms / 1000.0) - (clip.start or 0.0)
-        local_sec = max(0.0, media_sec / (spd if spd > 0 else 1.0))
-        
-        global_sec = self._cumulative_start_of(clip) + local_sec
-        self.visual_timeline.set_playhead_seconds(global_sec)
-    
-    def _clip_at_global_time(self, sec: float):
-        """Trova il clip alla posizione temporale globale."""
-        t = 0.0
-        for item in self.visual_timeline.items_list:
-            clip = item.clip
-            duration = clip.duration_effective()
-            
-            if sec < t + duration:
-                return clip, sec - t
-            
-            t += duration
-        
-        return None
-    
-    def _cumulative_start_of(self, clip: TimelineClip) -> float:
-        """Calcola il tempo di inizio cumulativo."""
-        t = 0.0
-        for item in self.visual_timeline.items_list:
-            if item.clip is clip:
-                return t
-            t += item.clip.duration_effective()
-        return 0.0
-    
-    # --- Clip Operations ---
-    
-    def remove_selected_clip(self):
-        """Rimuove il clip selezionato."""
-        target_clip = None
-        
-        sel = self.tl_list.currentItem()
-        if sel:
-            target_clip = sel.data(Qt.UserRole)
-        else:
-            sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
-            if sel_items:
-                target_clip = sel_items[0].clip
-        
-        if not target_clip:
-            return
-        
-        self.timeline = [c for c in self.timeline if c is not target_clip]
-
-        try:
-            self.visual_timeline.ripple_delete(target_clip)
-        except Exception:
-            to_remove = [it for it in self.visual_timeline.items_list if it.clip is target_clip]
-            for it in to_remove:
-                try:
-                    if it.scene() is not None:
-                        self.visual_timeline.scene().removeItem(it)
-                except Exception:
-                    pass
-
-            self.visual_timeline.items_list = [
-                it for it in self.visual_timeline.items_list
-                if it.clip is not target_clip
-            ]
-            self.visual_timeline.repack_by_order()
-
-        self.tl_list.clear()
-        for clip in self.timeline:
-            list_item = QListWidgetItem(f"{clip.media.name}  [{clip.media.type}]")
-            list_item.setData(Qt.UserRole, clip)
-            self.tl_list.addItem(list_item)
-
-    def duplicate_selected_clip(self):
-        """Duplica il clip selezionato."""
-        clip = self._current_clip()
-        if not clip:
-            return
-
+        local_sec = max(0.0, media_sec / clip.speed)
+        
+        global_sec = self._cumulative_start_of(clip) + local_sec
+
+        # Gate sul pixel: se il playhead non si sposta di almeno un pixel
+        # alla risoluzione di zoom corrente il repaint sarebbe identico
+        px = int(global_sec * self.visual_timeline.px_per_sec())
+        if px == self._last_playhead_px:
+            return
+        self._last_playhead_px = px
+        self.visual_timeline.set_playhead_seconds(global_sec)
+    
+    def _rebuild_time_index(self):
+        """Ricostruisce prefix-sum e indice di riga dei clip."""
+        starts = []
+        index = {}
+        t = 0.0
+        for i, clip in enumerate(self.timeline):
+            starts.append(t)
+            index[id(clip)] = i
+            t += clip.duration_effective()
+        starts.append(t)  # Fine dell'ultimo clip
+        self._cum_starts = starts
+        # Copia ndarray per np.searchsorted: la ricerca gira in C invece
+        # di confrontare float boxed a ogni passo del bisect
+        self._cum_np = np.asarray(starts, dtype=np.float64) if np is not None else None
+        self._clip_index = index
+        self._time_index_dirty = False
+
+    def _clip_at_global_time(self, sec: float):
+        """Trova il clip alla posizione temporale globale (O(log N))."""
+        if self._time_index_dirty:
+            self._rebuild_time_index()
+        if self._cum_np is not None:
+            i = int(np.searchsorted(self._cum_np, sec, side='right')) - 1
+        else:
+            i = bisect.bisect_right(self._cum_starts, sec) - 1
+        if 0 <= i < len(self.timeline):
+            return self.timeline[i], sec - self._cum_starts[i]
+        return None
+
+    def _cumulative_start_of(self, clip: TimelineClip) -> float:
+        """Tempo di inizio cumulativo del clip (lookup O(1))."""
+        if self._time_index_dirty:
+            self._rebuild_time_index()
+        i = self._clip_index.get(id(clip))
+        return self._cum_starts[i] if i is not None else 0.0
+    
+    # --- Clip Operations ---
+    
+    def remove_selected_clip(self):
+        """Rimuove il clip selezionato."""
+        target_clip = None
+        
+        idx = self.tl_list.currentIndex()
+        if idx.isValid():
+            target_clip = idx.data(Qt.UserRole)
+        else:
+            sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
+            if sel_items:
+                target_clip = sel_items[0].clip
+        
+        if not target_clip:
+            return
+
+        # Rimozione puntuale: una sola riga del modello, non un reset;
+        # la riga arriva dall'indice id->riga, niente scansione lineare
+        if self._time_index_dirty:
+            self._rebuild_time_index()
+        self.tl_model.remove_clip(target_clip, self._clip_index.get(id(target_clip), -1))
+
+        try:
+            self.visual_timeline.ripple_delete(target_clip)
+        except Exception:
+            to_remove = [it for it in self.visual_timeline.items_list if it.clip is target_clip]
+            for it in to_remove:
+                try:
+                    if it.scene() is not None:
+                        self.visual_timeline.scene().removeItem(it)
+                except Exception:
+                    pass
+
+            self.visual_timeline.items_list = [
+                it for it in self.visual_timeline.items_list
+                if it.clip is not target_clip
+            ]
+            self.visual_timeline.repack_by_order()
+
+        self._time_index_dirty = True
+
+    def duplicate_selected_clip(self):
+        """Duplica il clip selezionato."""
+        clip = self._current_clip()
+        if not clip:
+            return
+
         new_clip = TimelineClip(clip.media)
         new_clip.start = clip.start
         new_clip.end = clip.end
@@ -1080,208 +1628,210 @@ class MainWindow(QMainWindow):
         new_clip.title_size = clip.title_size
         new_clip.lut = clip.lut
         new_clip.transition = clip.transition
+        new_clip.speed = clip.speed
+
+        self._prepare_clip_previews(new_clip)
+
+        # Inserimento puntuale: una sola riga del modello, non un reset
+        idx = self.timeline.index(clip)
+        self.tl_model.insert_clip(idx + 1, new_clip)
+
+        item = ClipGraphicsItem(new_clip, self.visual_timeline.px_per_sec(), self._on_visual_trim_changed)
+        self.visual_timeline.items_list.insert(idx + 1, item)
+        self.visual_timeline.scene().addItem(item)
+        self.visual_timeline.repack_by_order()
+
+        self._time_index_dirty = True
+
+    def show_clip_properties(self):
+        """Mostra proprietà del clip."""
+        clip = self._current_clip()
+        if not clip:
+            QMessageBox.information(self, "Select clip", "Select a clip first.")
+            return
+
+        info = (
+            f"Media: {clip.media.name}\n"
+            f"Type: {clip.media.type}\n"
+            f"Start: {clip.start}\n"
+            f"End: {clip.end if clip.end is not None else 'None'}\n"
+            f"Title: {clip.title}\n"
+            f"LUT: {clip.lut}\n"
+            f"Transition: {clip.transition}\n"
+        )
+
+        QMessageBox.information(self, "Clip Properties", info)
+    
+    def split_at_playhead(self):
+        """Divide il clip al playhead."""
+        gsec = self.visual_timeline.playhead_sec
+        target = self._clip_at_global_time(gsec)
+        
+        if not target:
+            return
+        
+        clip, local_sec = target
+        
+        if local_sec <= 0.05 or local_sec >= clip.duration_effective() - 0.05:
+            return
+        
+        split_abs = clip.start + local_sec
+        
+        left = TimelineClip(clip.media)
+        left.start = clip.start
+        left.end = split_abs
+        left.title = clip.title
+        left.title_size = clip.title_size
+        left.lut = clip.lut
+        left.transition = "none"
+        
+        right = TimelineClip(clip.media)
+        right.start = split_abs
+        right.end = clip.end
+        right.title = clip.title
+        right.title_size = clip.title_size
+        right.lut = clip.lut
+        right.transition = clip.transition
+        
+        self._prepare_clip_previews(left)
+        self._prepare_clip_previews(right)
+        
+        # Tre operazioni di riga sul modello al posto del reset completo
+        idx = self.timeline.index(clip)
+        self.tl_model.remove_clip(clip)
+        self.tl_model.insert_clip(idx, left)
+        self.tl_model.insert_clip(idx + 1, right)
+
+        # Repaint della vista sospeso durante la chirurgia sulla scena:
+        # remove + add + repack producono un solo paint finale
+        self.visual_timeline.setUpdatesEnabled(False)
         try:
-            new_clip.speed = float(getattr(clip, 'speed', 1.0) or 1.0)
-        except Exception:
-            new_clip.speed = 1.0
-
-        self._prepare_clip_previews(new_clip)
-
-        idx = self.timeline.index(clip)
-        self.timeline.insert(idx + 1, new_clip)
-
-        item = ClipGraphicsItem(new_clip, self.visual_timeline.px_per_sec, self._on_visual_trim_changed)
-        self.visual_timeline.items_list.insert(idx + 1, item)
-        self.visual_timeline.scene().addItem(item)
-        self.visual_timeline.repack_by_order()
-
-        self.tl_list.clear()
-        for c in self.timeline:
-            li = QListWidgetItem(f"{c.media.name}  [{c.media.type}]")
-            li.setData(Qt.UserRole, c)
-            self.tl_list.addItem(li)
-
-    def show_clip_properties(self):
-        """Mostra proprietà del clip."""
-        clip = self._current_clip()
-        if not clip:
-            QMessageBox.information(self, "Select clip", "Select a clip first.")
-            return
-
-        info = (
-            f"Media: {clip.media.name}\n"
-            f"Type: {clip.media.type}\n"
-            f"Start: {clip.start}\n"
-            f"End: {clip.end if clip.end is not None else 'None'}\n"
-            f"Title: {clip.title}\n"
-            f"LUT: {clip.lut}\n"
-            f"Transition: {clip.transition}\n"
-        )
-
-        QMessageBox.information(self, "Clip Properties", info)
-    
-    def split_at_playhead(self):
-        """Divide il clip al playhead."""
-        gsec = self.visual_timeline.playhead_sec
-        target = self._clip_at_global_time(gsec)
-        
-        if not target:
-            return
-        
-        clip, local_sec = target
-        
-        if local_sec <= 0.05 or local_sec >= clip.duration_effective() - 0.05:
-            return
-        
-        split_abs = clip.start + local_sec
-        
-        left = TimelineClip(clip.media)
-        left.start = clip.start
-        left.end = split_abs
-        left.title = clip.title
-        left.title_size = clip.title_size
-        left.lut = clip.lut
-        left.transition = "none"
-        
-        right = TimelineClip(clip.media)
-        right.start = split_abs
-        right.end = clip.end
-        right.title = clip.title
-        right.title_size = clip.title_size
-        right.lut = clip.lut
-        right.transition = clip.transition
-        
-        self._prepare_clip_previews(left)
-        self._prepare_clip_previews(right)
-        
-        idx = self.timeline.index(clip)
-        self.timeline.pop(idx)
-        self.timeline[idx:idx] = [left, right]
-        
-        new_items = []
-        for item in self.visual_timeline.items_list:
-            if item.clip is clip:
-                self.visual_timeline.scene().removeItem(item)
-                
-                item_left = ClipGraphicsItem(
-                    left, 
-                    self.visual_timeline.px_per_sec,
-                    self._on_visual_trim_changed
-                )
-                item_right = ClipGraphicsItem(
-                    right,
-                    self.visual_timeline.px_per_sec,
-                    self._on_visual_trim_changed
-                )
-                
-                new_items.extend([item_left, item_right])
-            else:
-                new_items.append(item)
-        
-        self.visual_timeline.items_list = new_items
-        
-        for item in self.visual_timeline.items_list:
-            if item.scene() is None:
-                self.visual_timeline.scene().addItem(item)
-        
-        self.visual_timeline.repack_by_order()
-        
-        self.tl_list.clear()
-        for c in self.timeline:
-            list_item = QListWidgetItem(f"{c.media.name}  [{c.media.type}]")
-            list_item.setData(Qt.UserRole, c)
-            self.tl_list.addItem(list_item)
-    
-    # --- Clip Tools ---
-    
-    def apply_trim_to_clip(self):
-        """Applica il trim al clip."""
-        clip = self._current_clip()
-        if not clip:
-            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
-            return
-        
-        try:
-            start = float(self.start_edit.text())
-            end_text = self.end_edit.text().strip()
-            end = None if end_text == "" else float(end_text)
-            
-            clip.start = max(0.0, start)
-            
-            if end is None and clip.media.duration is not None:
-                end = clip.media.duration
-            
-            if end is not None:
-                clip.end = max(
-                    clip.start + 0.2,
-                    min(end, clip.media.duration or end)
-                )
-            else:
-                clip.end = None
-            
-            QMessageBox.information(
-                self,
-                "Trim applied",
-                f"Clip trimmed: start={clip.start:.2f}, "
-                f"end={clip.end if clip.end is not None else 'None'}"
-            )
-            
+            new_items = []
+            for item in self.visual_timeline.items_list:
+                if item.clip is clip:
+                    self.visual_timeline.scene().removeItem(item)
+
+                    item_left = ClipGraphicsItem(
+                        left,
+                        self.visual_timeline.px_per_sec(),
+                        self._on_visual_trim_changed
+                    )
+                    item_right = ClipGraphicsItem(
+                        right,
+                        self.visual_timeline.px_per_sec(),
+                        self._on_visual_trim_changed
+                    )
+
+                    new_items.extend([item_left, item_right])
+                else:
+                    new_items.append(item)
+
+            self.visual_timeline.items_list = new_items
+
+            for item in self.visual_timeline.items_list:
+                if item.scene() is None:
+                    self.visual_timeline.scene().addItem(item)
+
+            self.visual_timeline.repack_by_order()
+        finally:
+            self.visual_timeline.setUpdatesEnabled(True)
+
+        self._time_index_dirty = True
+
+    # --- Clip Tools ---
+    
+    def apply_trim_to_clip(self):
+        """Applica il trim al clip."""
+        clip = self._current_clip()
+        if not clip:
+            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
+            return
+        
+        try:
+            start = float(self.start_edit.text())
+            end_text = self.end_edit.text().strip()
+            end = None if end_text == "" else float(end_text)
+            
+            clip.start = max(0.0, start)
+            
+            if end is None and clip.media.duration is not None:
+                end = clip.media.duration
+            
+            if end is not None:
+                clip.end = max(
+                    clip.start + 0.2,
+                    min(end, clip.media.duration or end)
+                )
+            else:
+                clip.end = None
+
+            clip.invalidate_duration()
+
+            QMessageBox.information(
+                self,
+                "Trim applied",
+                f"Clip trimmed: start={clip.start:.2f}, "
+                f"end={clip.end if clip.end is not None else 'None'}"
+            )
+            
             self._refresh_visual_width_for(clip)
             # Rebuild effect preview so changes reflect in preview
             self._rebuild_effect_preview_for(clip)
-            
-        except Exception as ex:
-            QMessageBox.warning(self, "Invalid values", str(ex))
-    
-    def apply_title_to_clip(self):
-        """Applica il titolo al clip."""
-        clip = self._current_clip()
-        if not clip:
-            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
-            return
-        
-        clip.title = self.title_edit.text().strip()
-        clip.title_size = int(self.title_size.value())
-        
+            
+        except Exception as ex:
+            QMessageBox.warning(self, "Invalid values", str(ex))
+    
+    def apply_title_to_clip(self):
+        """Applica il titolo al clip."""
+        clip = self._current_clip()
+        if not clip:
+            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
+            return
+        
+        clip.title = self.title_edit.text().strip()
+        clip.title_size = int(self.title_size.value())
+        clip.invalidate_filter()
+
         QMessageBox.information(self, "Title set", f"Title set: {clip.title}")
         self._rebuild_effect_preview_for(clip)
-    
-    def apply_lut_to_clip(self):
-        """Applica il LUT al clip."""
-        clip = self._current_clip()
-        if not clip:
-            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
-            return
-        
-        lut = self.lut_combo.currentText()
-        
-        if not lut or lut.lower() == "none":
-            clip.lut = "none"
-        else:
-            lut_path = os.path.join(self.lut_dir, lut)
-            if os.path.exists(lut_path):
-                clip.lut = lut
-            else:
-                QMessageBox.warning(
-                    self,
-                    "LUT not found",
-                    f"Cannot find LUT file:\n{lut_path}\nSetting to 'none'."
-                )
-                clip.lut = "none"
-        
+    
+    def apply_lut_to_clip(self):
+        """Applica il LUT al clip."""
+        clip = self._current_clip()
+        if not clip:
+            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
+            return
+        
+        lut = self.lut_combo.currentText()
+        
+        if not lut or lut.lower() == "none":
+            clip.lut = "none"
+        else:
+            lut_path = os.path.join(self.lut_dir, lut)
+            if os.path.exists(lut_path):
+                clip.lut = lut
+            else:
+                QMessageBox.warning(
+                    self,
+                    "LUT not found",
+                    f"Cannot find LUT file:\n{lut_path}\nSetting to 'none'."
+                )
+                clip.lut = "none"
+        
+        clip.invalidate_filter()
         QMessageBox.information(self, "LUT set", f"LUT: {clip.lut}")
         self._rebuild_effect_preview_for(clip)
-    
+    
     def set_transition_for_selected(self):
-        """Imposta la transizione."""
-        clip = self._current_clip()
-        if not clip:
-            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
-            return
-        
-        transition = self.transition_combo.currentText()
-        clip.transition = transition
-        
+        """Imposta la transizione."""
+        clip = self._current_clip()
+        if not clip:
+            QMessageBox.information(self, "Select clip", "Select a clip in the timeline.")
+            return
+        
+        transition = self.transition_combo.currentText()
+        clip.transition = transition
+        
         QMessageBox.information(self, "Transition set", f"Transition to next: {transition}")
         # No direct impact on single-clip preview
 
@@ -1296,110 +1846,199 @@ class MainWindow(QMainWindow):
             if val <= 0:
                 val = 1.0
             clip.speed = float(val)
+            clip.invalidate_duration()
+            clip.invalidate_filter()
             # Update UI/timeline width
             self._refresh_visual_width_for(clip)
             # If clip is active and no baked preview, adjust playback rate; also rebuild preview
             try:
                 sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
                 if sel_items and sel_items[0].clip is clip:
-                    if getattr(clip, 'effect_preview_path', None):
-                        self.player.setPlaybackRate(1.0)
-                    else:
-                        self.player.setPlaybackRate(clip.speed)
+                    self.player.setPlaybackRate(
+                        1.0 if clip.effect_preview_path else clip.speed
+                    )
             except Exception:
                 pass
             self._rebuild_effect_preview_for(clip)
             QMessageBox.information(self, "Speed set", f"Playback speed: x{clip.speed:.2f}")
         except Exception as ex:
             QMessageBox.warning(self, "Invalid speed", str(ex))
-    
-    def choose_bg_music(self):
-        """Sceglie la musica di sottofondo."""
-        path, _ = QFileDialog.getOpenFileName(
-            self,
-            "Select background music",
-            str(Path.home()),
-            "Audio files (*.mp3 *.wav *.m4a)"
-        )
-        
-        if path:
-            self.project_bg_music = path
-            self.bg_music_label.setText(os.path.basename(path))
-    
-    def _current_clip(self) -> Optional[TimelineClip]:
-        """Ritorna il clip correntemente selezionato."""
-        sel = self.tl_list.currentItem()
-        if sel:
-            return sel.data(Qt.UserRole)
-        
-        sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
-        if sel_items:
-            return sel_items[0].clip
-        
-        return None
-    
-    def _refresh_visual_width_for(self, clip: TimelineClip):
-        """Aggiorna la larghezza visuale di un clip."""
-        for item in self.visual_timeline.items_list:
-            if item.clip is clip:
-                item._update_rect_width()
-                break
-        
-        self.visual_timeline.repack_by_order()
-    
-    def _refresh_lut_list(self):
-        """Aggiorna la lista dei LUT."""
-        self.lut_combo.clear()
-        self.lut_combo.addItem("none")
-        
-        if os.path.isdir(self.lut_dir):
-            for filename in os.listdir(self.lut_dir):
-                if filename.lower().endswith(".cube"):
-                    self.lut_combo.addItem(filename)
-    
-    # --- Zoom ---
-    
-    def zoom_in(self):
-        """Aumenta lo zoom."""
-        self.visual_timeline.zoom_in()
-    
-    def zoom_out(self):
-        """Diminuisce lo zoom."""
-        self.visual_timeline.zoom_out()
-    
-    def fit_timeline(self):
-        """Adatta la timeline."""
-        self.visual_timeline.fit_timeline()
-    
-    # --- Preview Generation ---
-    
-    def _prepare_clip_previews(self, clip: TimelineClip):
-        """Prepara le preview per un clip."""
-        if clip.preview_dir and (clip.thumb_paths or clip.waveform_path):
-            return
-        
-        res_map = {0: 360, 1: 480, 2: 640, 3: 720}
-        idx = getattr(self, 'preview_res_combo', None)
-        if idx is not None and isinstance(idx, QComboBox):
-            sel = self.preview_res_combo.currentIndex()
-        else:
-            sel = 2
-
-        proxy_width = res_map.get(sel, 640)
-        use_proxies = getattr(self, 'proxy_checkbox', None) and getattr(self.proxy_checkbox, 'isChecked', lambda: False)()
-
-        worker = PreviewWorker(
-            clip, self._temp_preview_root, self._thumbs_cache, self._wave_cache,
-            proxy_width=proxy_width, proxy_enabled=bool(use_proxies)
-        )
+    
+    def choose_bg_music(self):
+        """Sceglie la musica di sottofondo."""
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select background music",
+            str(Path.home()),
+            "Audio files (*.mp3 *.wav *.m4a)"
+        )
+        
+        if path:
+            self.project_bg_music = path
+            self.bg_music_label.setText(os.path.basename(path))
+    
+    def _current_clip(self) -> Optional[TimelineClip]:
+        """Ritorna il clip correntemente selezionato."""
+        idx = self.tl_list.currentIndex()
+        if idx.isValid():
+            return idx.data(Qt.UserRole)
+
+        sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
+        if sel_items:
+            return sel_items[0].clip
+        
+        return None
+    
+    def _refresh_visual_width_for(self, clip: TimelineClip):
+        """Aggiorna la larghezza visuale di un clip."""
+        item = self.visual_timeline.item_for_clip(clip)
+        if item is not None:
+            item._update_rect_width()
+
+        self.visual_timeline.repack_by_order()
+        # Trim/speed cambiano la durata effettiva: prefix-sum da rifare
+        self._time_index_dirty = True
+    
+    def _refresh_lut_list(self):
+        """Aggiorna la lista dei LUT (no-op se lo scan non e' cambiato)."""
+        names = self._scan_lut_dir()
+        if names == self._lut_combo_items:
+            return
+        self._lut_combo_items = names
+        self.lut_combo.clear()
+        self.lut_combo.addItem("none")
+        self.lut_combo.addItems(list(names))
+
+    def _scan_lut_dir(self) -> tuple:
+        """
+        Ritorna i file .cube nella directory LUT, ordinati, come tupla.
+
+        La directory viene rienumerata solo se il suo mtime e' cambiato
+        dall'ultimo scan; i refresh ripetuti del pannello tools riusano
+        la tupla in cache. L'ordinamento rende il risultato stabile, cosi'
+        il confronto di uguaglianza nel refresh non da' falsi cambiamenti
+        per il solo ordine di enumerazione del filesystem.
+        """
+        try:
+            m = os.stat(self.lut_dir).st_mtime_ns
+        except OSError:
+            self._lut_scan_mtime = -1
+            self._lut_cached = ()
+            return self._lut_cached
+
+        if m == self._lut_scan_mtime:
+            return self._lut_cached
+
+        with os.scandir(self.lut_dir) as entries:
+            names = tuple(sorted(
+                entry.name for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(".cube")
+            ))
+
+        self._lut_scan_mtime = m
+        self._lut_cached = names
+        return names
+
+    def _invalidate_lut_cache(self):
+        """Forza il rescan della directory LUT al prossimo refresh."""
+        self._lut_scan_mtime = -1
+    
+    # --- Zoom ---
+    
+    def zoom_in(self):
+        """Aumenta lo zoom."""
+        self.visual_timeline.zoom_in()
+    
+    def zoom_out(self):
+        """Diminuisce lo zoom."""
+        self.visual_timeline.zoom_out()
+    
+    def fit_timeline(self):
+        """Adatta la timeline."""
+        self.visual_timeline.fit_timeline()
+    
+    # --- Preview Generation ---
+
+    @property
+    def _temp_preview_root(self) -> str:
+        """Directory temporanea delle preview, creata al primo accesso."""
+        if self._temp_preview_root_path is None:
+            self._temp_preview_root_path = ensure_dir(
+                os.path.join(
+                    tempfile.gettempdir(),
+                    f"pyeditor_previews_{uuid.uuid4().hex}"
+                )
+            )
+        return self._temp_preview_root_path
+
+    def _preview_params(self) -> tuple:
+        """Legge dal pannello tools i parametri proxy correnti."""
+        res_map = {0: 360, 1: 480, 2: 640, 3: 720}
+        combo = getattr(self, 'preview_res_combo', None)
+        sel = combo.currentIndex() if isinstance(combo, QComboBox) else 2
+        proxy_width = res_map.get(sel, 640)
+        use_proxies = bool(
+            getattr(self, 'proxy_checkbox', None)
+            and self.proxy_checkbox.isChecked()
+        )
+        return proxy_width, use_proxies
+
+    def _prepare_clip_previews(self, clip: TimelineClip,
+                               proxy_width: Optional[int] = None,
+                               use_proxies: Optional[bool] = None):
+        """Prepara le preview per un clip.
+
+        proxy_width/use_proxies possono essere passati dal chiamante per
+        evitare di rileggere combo e checkbox a ogni clip (load_project
+        li calcola una volta per l'intero batch).
+        """
+        if clip.preview_dir and (clip.thumb_paths or clip.waveform_path):
+            return
+
+        if proxy_width is None or use_proxies is None:
+            proxy_width, use_proxies = self._preview_params()
+
+        # Riusa un proxy di una sessione precedente se il sorgente non e'
+        # cambiato: evita una transcodifica intera al riavvio
+        if use_proxies and not clip.proxy_path:
+            cached = self._cached_proxy_for(clip.media.path)
+            if cached:
+                clip.proxy_path = cached
+
+        worker = PreviewWorker(
+            clip, self._temp_preview_root, self._thumbs_cache, self._wave_cache,
+            proxy_width=proxy_width, proxy_enabled=bool(use_proxies)
+        )
         worker.signals.started.connect(self._on_preview_started)
+        worker.signals.progress.connect(self._on_preview_progress)
         worker.signals.done.connect(self._on_preview_ready)
         self.pool.start(worker)
 
     def _rebuild_effect_preview_for(self, clip: TimelineClip):
+        """Accoda (coalescato) il rebuild dell'effect preview del clip."""
+        self._pending_effect_clips[id(clip)] = clip
+        # Restart a ogni edit: parte solo dopo 250 ms di quiete
+        self._effect_preview_timer.start()
+
+    def _flush_effect_previews(self):
+        """Avvia un worker per ogni clip con modifiche pendenti."""
+        pending = list(self._pending_effect_clips.values())
+        self._pending_effect_clips.clear()
+        for clip in pending:
+            self._start_effect_preview_worker(clip)
+
+    def _start_effect_preview_worker(self, clip: TimelineClip):
         """Queue building of an effect preview for the clip (LUT/title/speed/trim)."""
         try:
+            # Un worker precedente per lo stesso clip ancora in coda va
+            # annullato: altrimenti un render vecchio puo' finire dopo il
+            # nuovo e "vincere" con una preview stantia
+            prev = self._effect_workers_by_clip.get(id(clip))
+            if prev is not None:
+                prev.cancelled = True
+
             worker = EffectPreviewWorker(clip, self._temp_preview_root, self.lut_dir)
+            self._effect_workers_by_clip[id(clip)] = worker
             worker.signals.started.connect(self._on_preview_started)
             worker.signals.done.connect(self._on_preview_ready)
             try:
@@ -1419,203 +2058,290 @@ class MainWindow(QMainWindow):
                 self.preview_progress.setVisible(False)
         except Exception:
             pass
-
-    @Slot(object)
-    def _on_preview_started(self, clip: TimelineClip):
-        """Mostra UI di progress."""
-        try:
-            self.preview_status_label.setText(f"Processing: {clip.media.name}")
-            self.preview_status_label.setVisible(True)
-            self.preview_progress.setVisible(True)
-            if hasattr(self, 'btn_add_to_tl'):
-                self.btn_add_to_tl.setEnabled(False)
-            try:
-                clip._processing = True
-                for item in self.visual_timeline.items_list:
-                    if item.clip is clip:
-                        item.update()
-                        break
-            except Exception:
-                pass
-        except Exception:
-            pass
-
+
+    @Slot(int)
+    def _on_preview_progress(self, value: int):
+        """Accoda un aggiornamento della barra di progresso (coalescato)."""
+        self._pending_progress = value
+        if not self._preview_progress_timer.isActive():
+            self._preview_progress_timer.start()
+
+    def _apply_preview_progress(self):
+        """Applica l'ultimo valore di progresso ricevuto."""
+        value = self._pending_progress
+        if value is None:
+            return
+        self._pending_progress = None
+        try:
+            self.preview_progress.setValue(value)
+            if value >= 100:
+                QTimer.singleShot(300, self.preview_progress.hide)
+        except Exception:
+            pass
+
+    @Slot(object)
+    def _on_preview_started(self, clip: TimelineClip):
+        """Mostra UI di progress."""
+        try:
+            self.preview_status_label.setText(f"Processing: {clip.media.name}")
+            self.preview_status_label.setVisible(True)
+            self.preview_progress.setValue(0)
+            self.preview_progress.setVisible(True)
+            if hasattr(self, 'btn_add_to_tl'):
+                self.btn_add_to_tl.setEnabled(False)
+            try:
+                clip._processing = True
+                item = self.visual_timeline.item_for_clip(clip)
+                if item is not None:
+                    item.update()
+            except Exception:
+                pass
+        except Exception:
+            pass
+
     @Slot(object)
     def _on_preview_ready(self, clip: TimelineClip):
-        """Callback quando le preview sono pronte."""
-        for item in self.visual_timeline.items_list:
-            if item.clip is clip:
-                item._load_cached_pixmaps()
-                try:
-                    clip._processing = False
-                except Exception:
-                    pass
-                item._update_rect_width()
-                item.update()
-                break
-    
-        try:
-            self.preview_progress.setVisible(False)
-            self.preview_status_label.setVisible(False)
-            if hasattr(self, 'btn_add_to_tl'):
-                self.btn_add_to_tl.setEnabled(True)
-        except Exception:
-            pass
-
+        """Accoda il clip pronto; il lavoro GUI avviene in batch."""
+        self._ready_clips.append(clip)
+        if not self._ready_flush_timer.isActive():
+            self._ready_flush_timer.start()
+
+    def _flush_ready_previews(self):
+        """Applica in un colpo solo le preview completate nel frame."""
+        ready = self._ready_clips
+        self._ready_clips = []
+        for clip in ready:
+            self._apply_preview_ready(clip)
+
+    def _apply_preview_ready(self, clip: TimelineClip):
+        """Aggiorna item grafico e UI per un clip con preview pronte."""
+        item = self.visual_timeline.item_for_clip(clip)
+        if item is not None:
+            item._load_cached_pixmaps()
+            try:
+                clip._processing = False
+            except Exception:
+                pass
+            item._update_rect_width()
+            item.update()
+
+        try:
+            self.preview_progress.setVisible(False)
+            self.preview_status_label.setVisible(False)
+            if hasattr(self, 'btn_add_to_tl'):
+                self.btn_add_to_tl.setEnabled(True)
+        except Exception:
+            pass
+
         try:
             if getattr(clip, 'proxy_path', None):
-                self._proxy_cache[clip.media.path] = clip.proxy_path
+                self._remember_proxy(clip.media.path, clip.proxy_path)
+                self._forget_path_exists(clip.proxy_path)
         except Exception:
             pass
 
         # If an effect preview was just created and this clip is selected, use it
         try:
-            if getattr(clip, 'effect_preview_path', None):
+            if clip.effect_preview_path:
                 sel_items = [it for it in self.visual_timeline.items_list if it.isSelected()]
                 if sel_items and sel_items[0].clip is clip:
-                    self.player.setSource(QUrl.fromLocalFile(clip.effect_preview_path))
+                    self._set_player_source(clip.effect_preview_path)
                     self.player.setPlaybackRate(1.0)
         except Exception:
             pass
-
-    def _selected_clip(self) -> Optional[TimelineClip]:
-        """Return currently selected clip."""
-        sel = self.tl_list.currentItem()
-        if sel:
-            return sel.data(Qt.UserRole)
-
-        vis = [it for it in self.visual_timeline.items_list if it.isSelected()]
-        if vis:
-            return vis[0].clip
-
-        return None
-
-    def _on_clear_proxy_clicked(self):
-        """Clear proxy for selected clip."""
-        clip = self._selected_clip()
-        if not clip:
-            QMessageBox.information(self, "No selection", "Select a clip first")
-            return
-
-        try:
-            p = getattr(clip, 'proxy_path', None)
-            if p and os.path.exists(p):
-                os.remove(p)
-            clip.proxy_path = None
-            if clip.media.path in self._proxy_cache:
-                del self._proxy_cache[clip.media.path]
-            QMessageBox.information(self, "Cleared", "Proxy cleared for selected clip")
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not clear proxy: {e}")
-
-    def _on_regenerate_proxy_clicked(self):
-        """Force regeneration of proxy."""
-        clip = self._selected_clip()
-        if not clip:
-            QMessageBox.information(self, "No selection", "Select a clip first")
-            return
-
-        try:
-            p = getattr(clip, 'proxy_path', None)
-            if p and os.path.exists(p):
-                os.remove(p)
-        except Exception:
-            pass
-
-        clip.proxy_path = None
-        if clip.media.path in self._proxy_cache:
-            try:
-                del self._proxy_cache[clip.media.path]
-            except Exception:
-                pass
-
-        try:
-            prev = self.proxy_checkbox.isChecked()
-            self.proxy_checkbox.setChecked(True)
-            self._prepare_clip_previews(clip)
-            self.proxy_checkbox.setChecked(prev)
-            QMessageBox.information(self, "Queued", "Proxy regeneration queued in background")
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not queue proxy regeneration: {e}")
-    
-    # --- Save/Load/Export ---
-    
-    def save_project(self):
-        """Salva il progetto."""
-        path, _ = QFileDialog.getSaveFileName(self, "Save project", str(Path.home()), "JSON (*.json)")
-        
-        if not path:
-            return
-        
-        data = {
-            "media": [mi.path for mi in self.media_items],
-            "timeline": [clip.to_dict() for clip in self.timeline],
-            "bg_music": self.project_bg_music
-        }
-        
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        
-        QMessageBox.information(self, "Saved", f"Project saved to {path}")
-    
-    def load_project(self):
-        """Carica un progetto."""
-        path, _ = QFileDialog.getOpenFileName(self, "Load project", str(Path.home()), "JSON (*.json)")
-        
-        if not path:
-            return
-        
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        self.media_items = []
-        self.lib_list.clear()
-        
-        for media_path in data.get("media", []):
-            if os.path.exists(media_path):
-                self._add_media_to_library(media_path)
-        
-        self.timeline = []
-        self.tl_list.clear()
-        vis_clips = []
-        
-        for clip_data in data.get("timeline", []):
-            clip = TimelineClip.from_dict(clip_data, self.media_items)
-            if clip:
-                self._prepare_clip_previews(clip)
-                self.timeline.append(clip)
-                
-                list_item = QListWidgetItem(f"{clip.media.name} [{clip.media.type}]")
-                list_item.setData(Qt.UserRole, clip)
-                self.tl_list.addItem(list_item)
-                
-                vis_clips.append(clip)
-        
-        self.project_bg_music = data.get("bg_music")
-        if self.project_bg_music:
-            self.bg_music_label.setText(os.path.basename(self.project_bg_music))
-        
-        self.visual_timeline.rebuild(vis_clips)
-        
-        QMessageBox.information(self, "Loaded", f"Project loaded: {path}")
-    
-    def export_project(self):
-        """Esporta il progetto come video finale."""
-        if not self.timeline:
-            QMessageBox.information(self, "Empty", "Add clips to timeline before export.")
-            return
-        
-        out_path, _ = QFileDialog.getSaveFileName(
-            self, "Export final video", str(Path.home() / "final.mp4"), "MP4 (*.mp4)"
-        )
-        
-        if not out_path:
-            return
-        
-        exporter = ProjectExporter(self.timeline, self.project_bg_music, self.lut_dir)
-        
-        try:
-            exporter.export(out_path, self)
-            QMessageBox.information(self, "Export finished", f"Export complete: {out_path}")
-        except Exception as e:
+
+    def _selected_clip(self) -> Optional[TimelineClip]:
+        """Return currently selected clip."""
+        idx = self.tl_list.currentIndex()
+        if idx.isValid():
+            return idx.data(Qt.UserRole)
+
+        vis = [it for it in self.visual_timeline.items_list if it.isSelected()]
+        if vis:
+            return vis[0].clip
+
+        return None
+
+    def _on_clear_proxy_clicked(self):
+        """Clear proxy for selected clip."""
+        clip = self._selected_clip()
+        if not clip:
+            QMessageBox.information(self, "No selection", "Select a clip first")
+            return
+
+        try:
+            p = getattr(clip, 'proxy_path', None)
+            if p and os.path.exists(p):
+                os.remove(p)
+            self._forget_path_exists(p)
+            clip.proxy_path = None
+            if clip.media.path in self._proxy_cache:
+                del self._proxy_cache[clip.media.path]
+            QMessageBox.information(self, "Cleared", "Proxy cleared for selected clip")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not clear proxy: {e}")
+
+    def _on_regenerate_proxy_clicked(self):
+        """Force regeneration of proxy."""
+        clip = self._selected_clip()
+        if not clip:
+            QMessageBox.information(self, "No selection", "Select a clip first")
+            return
+
+        try:
+            p = getattr(clip, 'proxy_path', None)
+            if p and os.path.exists(p):
+                os.remove(p)
+            self._forget_path_exists(p)
+        except Exception:
+            pass
+
+        clip.proxy_path = None
+        if clip.media.path in self._proxy_cache:
+            try:
+                del self._proxy_cache[clip.media.path]
+            except Exception:
+                pass
+
+        try:
+            prev = self.proxy_checkbox.isChecked()
+            self.proxy_checkbox.setChecked(True)
+            self._prepare_clip_previews(clip)
+            self.proxy_checkbox.setChecked(prev)
+            QMessageBox.information(self, "Queued", "Proxy regeneration queued in background")
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not queue proxy regeneration: {e}")
+    
+    # --- Save/Load/Export ---
+    
+    def save_project(self):
+        """Salva il progetto."""
+        path, _ = QFileDialog.getSaveFileName(self, "Save project", str(Path.home()), "JSON (*.json)")
+        
+        if not path:
+            return
+        
+        data = {
+            "media": [mi.path for mi in self.media_items],
+            "timeline": [clip.to_dict() for clip in self.timeline],
+            "bg_music": self.project_bg_music
+        }
+        
+        if orjson is not None:
+            with open(path, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            # Separatori compatti e ensure_ascii=False: meno byte scritti
+            # e niente escape dei caratteri non-ASCII nei titoli; json.dump
+            # scrive gia' in streaming via iterencode, senza stringa unica
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+
+        QMessageBox.information(self, "Saved", f"Project saved to {path}")
+    
+    def load_project(self):
+        """Carica un progetto."""
+        path, _ = QFileDialog.getOpenFileName(self, "Load project", str(Path.home()), "JSON (*.json)")
+        
+        if not path:
+            return
+        
+        # Parse con orjson quando disponibile (~2x piu' veloce su progetti
+        # con centinaia di clip), altrimenti stdlib
+        if orjson is not None:
+            with open(path, "rb") as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        
+        self.media_items = []
+        self._media_by_path.clear()
+
+        # Durate sondate in parallelo a monte: le costruzioni di MediaItem
+        # sotto trovano la cache calda invece di uno spawn ffprobe a testa
+        media_paths = [p for p in data.get("media", []) if os.path.exists(p)]
+        MediaItem.probe_many(media_paths)
+
+        # Repaint della libreria sospeso per il clear + re-add in blocco:
+        # un solo paint a fine ricostruzione invece di uno per riga
+        self.lib_list.setUpdatesEnabled(False)
+        try:
+            self.lib_list.clear()
+            for media_path in media_paths:
+                self._add_media_to_library(media_path)
+        finally:
+            self.lib_list.setUpdatesEnabled(True)
+        
+        self.timeline = []
+        vis_clips = []
+
+        for clip_data in data.get("timeline", []):
+            clip = TimelineClip.from_dict(clip_data, self._media_by_path)
+            if clip:
+                self.timeline.append(clip)
+                vis_clips.append(clip)
+
+        self.tl_model.set_timeline(self.timeline)
+        self._time_index_dirty = True
+
+        self.project_bg_music = data.get("bg_music")
+        if self.project_bg_music:
+            self.bg_music_label.setText(os.path.basename(self.project_bg_music))
+
+        self.visual_timeline.rebuild(vis_clips)
+
+        # Accodamento preview fuori dal loop di costruzione: parametri
+        # proxy letti una volta sola e batch da 20 clip intervallati da
+        # un giro di event loop, cosi' il caricamento non blocca la UI
+        proxy_width, use_proxies = self._preview_params()
+
+        # I clip dentro il viewport vanno in coda per primi: la parte di
+        # timeline che l'utente vede diventa pronta in O(clip visibili),
+        # il resto segue negli stessi batch
+        ordered = vis_clips
+        try:
+            view_rect = self.visual_timeline.mapToScene(
+                self.visual_timeline.viewport().rect()
+            ).boundingRect()
+            visible, hidden = [], []
+            for c in vis_clips:
+                item = self.visual_timeline.item_for_clip(c)
+                if item is not None and view_rect.intersects(item.sceneBoundingRect()):
+                    visible.append(c)
+                else:
+                    hidden.append(c)
+            ordered = visible + hidden
+        except Exception:
+            pass
+
+        def _enqueue_previews(pos=0):
+            for clip in ordered[pos:pos + 20]:
+                self._prepare_clip_previews(clip, proxy_width, use_proxies)
+            if pos + 20 < len(ordered):
+                QTimer.singleShot(0, lambda: _enqueue_previews(pos + 20))
+
+        _enqueue_previews()
+
+        QMessageBox.information(self, "Loaded", f"Project loaded: {path}")
+    
+    def export_project(self):
+        """Esporta il progetto come video finale."""
+        if not self.timeline:
+            QMessageBox.information(self, "Empty", "Add clips to timeline before export.")
+            return
+        
+        out_path, _ = QFileDialog.getSaveFileName(
+            self, "Export final video", str(Path.home() / "final.mp4"), "MP4 (*.mp4)"
+        )
+        
+        if not out_path:
+            return
+        
+        exporter = ProjectExporter(self.timeline, self.project_bg_music, self.lut_dir)
+        
+        try:
+            exporter.export(out_path, self)
+            QMessageBox.information(self, "Export finished", f"Export complete: {out_path}")
+        except Exception as e:
             QMessageBox.critical(self, "Export error", f"Failed to export project:\n{str(e)}")
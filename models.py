@@ -8,68 +8,209 @@ Modelli dati per PyEditor: MediaItem e TimelineClip.
 import os
 import subprocess
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
 
+# PyAV opzionale: interroga libavformat in-process, senza lo spawn di un
+# ffprobe per file; in sua assenza resta il percorso subprocess
+try:
+    import av
+except Exception:
+    av = None
+
+# Durate gia' sondate, per percorso: riempita da probe_many e dai probe
+# singoli, cosi' ricostruire un MediaItem per un file noto non rilancia
+# ffprobe
+_duration_cache: Dict[str, Optional[float]] = {}
+
+# Cache persistente dei probe, chiave "path|mtime_ns|size": caricata da
+# disco al primo uso e riscritta da flush_probe_cache alla chiusura.
+# Rende "caldi" anche i cold start: ricaricare un progetto non spawna
+# nessun ffprobe per file gia' visti e non modificati.
+_probe_cache: Optional[Dict[str, Optional[float]]] = None
+_probe_cache_dirty = False
+
+
+def _persistent_probe_cache() -> Dict[str, Optional[float]]:
+    """Ritorna la cache persistente, caricandola al primo accesso."""
+    global _probe_cache
+    if _probe_cache is None:
+        from utils import load_probe_cache
+        _probe_cache = load_probe_cache()
+    return _probe_cache
+
+
+def _probe_key(path: str) -> Optional[str]:
+    """Chiave di cache per un file: percorso + mtime + dimensione."""
+    try:
+        st = os.stat(path)
+        return f"{path}|{st.st_mtime_ns}|{st.st_size}"
+    except OSError:
+        return None
+
+
+# Estensioni riconosciute per tipo: frozenset a livello di modulo, cosi'
+# detect_type fa lookup O(1) senza riallocare le liste a ogni chiamata
+_VIDEO_EXTS = frozenset({".mp4", ".mov", ".mkv", ".avi", ".webm"})
+_AUDIO_EXTS = frozenset({".mp3", ".wav", ".aac", ".m4a", ".ogg"})
+_IMAGE_EXTS = frozenset({".png", ".jpg", ".jpeg", ".bmp", ".gif"})
+
+
+def flush_probe_cache():
+    """Scrive la cache dei probe su disco, se modificata."""
+    global _probe_cache_dirty
+    if _probe_cache_dirty and _probe_cache is not None:
+        from utils import save_probe_cache
+        save_probe_cache(_probe_cache)
+        _probe_cache_dirty = False
+
 
 class MediaItem:
     """Rappresenta un file media nella libreria."""
-    
+
     def __init__(self, path: str):
         """
         Inizializza un MediaItem.
-        
+
         Args:
             path: Percorso del file media
         """
         self.path = path
         self.name = os.path.basename(path)
+        # Payload drag&drop precodificato: evita un encode per ogni drag
+        self._path_utf8 = path.encode("utf-8")
         self.type = self._detect_type()
-        self.duration = self._probe_duration() if self.type in ("video", "audio") else None
+        if self.type in ("video", "audio"):
+            if path in _duration_cache:
+                self.duration = _duration_cache[path]
+            else:
+                self.duration = MediaItem._duration_for(path)
+                _duration_cache[path] = self.duration
+        else:
+            self.duration = None
+        # Etichetta di libreria formattata una volta qui: le righe della
+        # lista la riusano senza rifare la f-string a ogni render
+        duration_str = f" ({self.duration:.2f}s)" if self.duration else ""
+        self._cached_label = f"{self.name} [{self.type}]{duration_str}"
     
     def _detect_type(self) -> str:
         """Rileva il tipo di media dall'estensione."""
-        ext = os.path.splitext(self.path)[1].lower()
-        
-        if ext in [".mp4", ".mov", ".mkv", ".avi", ".webm"]:
+        return MediaItem.detect_type(self.path)
+
+    @staticmethod
+    def detect_type(path: str) -> str:
+        """Rileva il tipo di media dall'estensione del percorso."""
+        ext = os.path.splitext(path)[1].lower()
+
+        if ext in _VIDEO_EXTS:
             return "video"
-        elif ext in [".mp3", ".wav", ".aac", ".m4a", ".ogg"]:
+        elif ext in _AUDIO_EXTS:
             return "audio"
-        elif ext in [".png", ".jpg", ".jpeg", ".bmp", ".gif"]:
+        elif ext in _IMAGE_EXTS:
             return "image"
         else:
             return "unknown"
-    
+
     def _probe_duration(self) -> Optional[float]:
         """Rileva la durata del media usando ffprobe."""
+        return MediaItem.probe_duration(self.path)
+
+    @staticmethod
+    def probe_duration(path: str) -> Optional[float]:
+        """Rileva la durata di un file (PyAV in-process, o ffprobe)."""
+        # Percorso veloce: apertura del container via libavformat, che
+        # legge solo l'header — niente processo figlio da creare
+        if av is not None:
+            try:
+                with av.open(path, metadata_errors="ignore") as container:
+                    if container.duration:
+                        return container.duration / av.time_base
+            except Exception:
+                pass
+
         try:
             cmd = [
                 "ffprobe",
                 "-v", "error",
+                # Probe ridotto: basta l'header per la durata di formato,
+                # inutile analizzare megabyte di stream
+                "-analyzeduration", "1M",
+                "-probesize", "1M",
                 "-show_entries", "format=duration",
                 "-of", "default=noprint_wrappers=1:nokey=1",
-                self.path
+                path
             ]
-            
+
             result = subprocess.run(
                 cmd,
                 capture_output=True,
                 text=True,
                 timeout=5
             )
-            
+
             if result.returncode == 0 and result.stdout.strip():
                 return float(result.stdout.strip())
-                
+
         except Exception:
             pass
-        
+
         return None
 
+    @staticmethod
+    def _duration_for(path: str) -> Optional[float]:
+        """Durata del file: consulta la cache persistente prima di ffprobe."""
+        global _probe_cache_dirty
+        key = _probe_key(path)
+        cache = _persistent_probe_cache()
+        if key is not None and key in cache:
+            return cache[key]
+        duration = MediaItem.probe_duration(path)
+        if key is not None:
+            cache[key] = duration
+            _probe_cache_dirty = True
+        return duration
+
+    @classmethod
+    def probe_many(cls, paths: List[str]):
+        """
+        Sonda in parallelo le durate di piu' file e scalda la cache.
+
+        Un progetto con M media pagherebbe M spawn seriali di ffprobe in
+        costruzione; qui gli spawn girano concorrenti (bloccano sul
+        subprocess, il GIL e' libero) e i MediaItem costruiti dopo
+        trovano la durata gia' in cache.
+
+        Args:
+            paths: Percorsi dei file da sondare
+        """
+        global _probe_cache_dirty
+        cache = _persistent_probe_cache()
+
+        todo = []
+        for p in dict.fromkeys(paths):
+            if p in _duration_cache or cls.detect_type(p) not in ("video", "audio"):
+                continue
+            key = _probe_key(p)
+            if key is not None and key in cache:
+                _duration_cache[p] = cache[key]
+            else:
+                todo.append(p)
+        if not todo:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(16, len(todo))) as executor:
+            for path, duration in zip(todo, executor.map(cls.probe_duration, todo)):
+                _duration_cache[path] = duration
+                key = _probe_key(path)
+                if key is not None:
+                    cache[key] = duration
+                    _probe_cache_dirty = True
+
 
-class TimelineClip:
+class TimelineClip:
     """Rappresenta un clip nella timeline."""
     
-    def __init__(self, media: MediaItem):
+    def __init__(self, media: MediaItem):
         """
         Inizializza un TimelineClip.
         
@@ -90,43 +231,135 @@ class TimelineClip:
         # Color grading
         self.lut: str = "none"
         
-        # Transition
-        self.transition: str = "none"
-        # Track index (which timeline track this clip belongs to)
-        self.track: int = 0
-
-        # Playback speed (velocity). 1.0 = normal speed
-        self.speed: float = 1.0
+        # Transition
+        self.transition: str = "none"
+        # Track index (which timeline track this clip belongs to)
+        self.track: int = 0
+
+        # Playback speed (velocity). 1.0 = normal speed
+        self.speed: float = 1.0
+
+        # Stato di generazione preview (letto dal paint della timeline:
+        # campo canonico, niente getattr con fallback)
+        self._processing: bool = False
+
+        # Versione delle preview: incrementata quando thumb/waveform
+        # cambiano, cosi' la timeline ricarica i pixmap solo in quel caso
+        self._thumbs_version: int = 0
 
         # Preview cache
         self.preview_dir: Optional[str] = None
         self.thumb_paths: List[str] = []
         self.waveform_path: Optional[str] = None
+        # Livelli mipmap della waveform (larghezza -> percorso), se
+        # generati dal percorso veloce numpy
+        self.waveform_levels: Dict[int, str] = {}
+        # PCM grezzo spillato accanto alla waveform: rende possibile il
+        # render a larghezze arbitrarie senza ridecodificare con ffmpeg
+        self.waveform_pcm: str = ""
         # Optional proxy file path for faster preview/playback
         self.proxy_path: Optional[str] = None
-    
-    def duration_effective(self) -> float:
-        """
-        Calcola la durata effettiva del clip considerando trim.
+        # Preview "baked" con effetti (LUT/titolo/speed), se generata
+        self.effect_preview_path: Optional[str] = None
+
+        # Etichetta di riga memoizzata: data() del modello la richiede a
+        # ogni repaint della lista, inutile riformattare la f-string
+        self._cached_label: Optional[str] = None
+
+        # Durata effettiva memoizzata: l'indice temporale la legge per
+        # ogni clip a ogni rebuild; invalidata quando trim o speed cambiano
+        self._cached_dur: Optional[float] = None
+
+        # Frammenti di filtro ffmpeg memoizzati (lut3d/drawtext/setpts):
+        # composti una volta per combinazione di parametri e riusati da
+        # export e preview; invalidati quando titolo, LUT o speed cambiano
+        self._filter_cache: Optional[tuple] = None
+        self._filter_cache_lut_dir: Optional[str] = None
+
+    def invalidate_duration(self):
+        """Invalida la durata memoizzata dopo modifiche a trim/speed."""
+        self._cached_dur = None
+
+    def invalidate_filter(self):
+        """Invalida i frammenti di filtro dopo modifiche a titolo/LUT/speed."""
+        self._filter_cache = None
+
+    def effect_filter_fragments(self, lut_dir: str) -> tuple:
+        """
+        Ritorna (filtri_video, filtri_audio) per LUT, titolo e velocita'.
+
+        Le stringhe di filtro vengono composte una sola volta e riusate
+        finche' i parametri effetto non cambiano; trim e scale restano a
+        carico del chiamante perche' variano tra preview ed export.
+
+        Args:
+            lut_dir: Directory dei file LUT, per risolvere self.lut
+
+        Returns:
+            Tupla (tuple di filtri video, tuple di filtri audio)
+        """
+        if (self._filter_cache is not None
+                and self._filter_cache_lut_dir == lut_dir):
+            return self._filter_cache
+
+        from utils import atempo_chain, ffmpeg_filter_escape, resolve_lut
+
+        vf = []
+        af = []
+
+        if self.lut and self.lut != "none":
+            lut_path = resolve_lut(lut_dir, self.lut)
+            if lut_path:
+                vf.append(f"lut3d=file='{ffmpeg_filter_escape(lut_path)}'")
+
+        if self.title:
+            text_esc = ffmpeg_filter_escape(self.title)
+            vf.append(
+                f"drawtext=text='{text_esc}':fontcolor=white:"
+                f"fontsize={int(self.title_size)}:x={self.title_pos}:"
+                f"y=(h-{int(self.title_size)}-40):"
+                f"shadowcolor=black:shadowx=2:shadowy=2"
+            )
+
+        if self.speed != 1.0:
+            vf.append(f"setpts=PTS/{self.speed}")
+            af.append(atempo_chain(self.speed))
+
+        self._filter_cache = (tuple(vf), tuple(af))
+        self._filter_cache_lut_dir = lut_dir
+        return self._filter_cache
+
+    def label(self) -> str:
+        """Ritorna l'etichetta di riga del clip (formattata una volta)."""
+        if self._cached_label is None:
+            self._cached_label = f"{self.media.name}  [{self.media.type}]"
+        return self._cached_label
+
+    def duration_effective(self) -> float:
+        """
+        Calcola la durata effettiva del clip considerando trim.
         
         Returns:
             Durata in secondi
         """
-        # Base duration from media or default for images
-        if self.media.duration is None:
-            base = 5.0
-        else:
-            start = self.start or 0.0
-            end = self.end if self.end is not None else self.media.duration
-            base = max(0.2, end - start)
-
-        # Apply speed scaling; guard against invalid values
-        spd = self.speed if isinstance(getattr(self, 'speed', 1.0), (int, float)) else 1.0
-        spd = 1.0 if spd <= 0 else float(spd)
-        # Faster speed shortens effective duration; slower speed lengthens it
-        return max(0.2, base / spd)
+        if self._cached_dur is not None:
+            return self._cached_dur
+
+        # Base duration from media or default for images
+        if self.media.duration is None:
+            base = 5.0
+        else:
+            start = self.start or 0.0
+            end = self.end if self.end is not None else self.media.duration
+            base = max(0.2, end - start)
+
+        # speed e' normalizzato (float > 0) in __init__, from_dict e
+        # apply_speed: lettura diretta, niente getattr/float per chiamata
+        # Faster speed shortens effective duration; slower speed lengthens it
+        self._cached_dur = max(0.2, base / self.speed)
+        return self._cached_dur
     
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self) -> Dict[str, Any]:
         """
         Serializza il clip in dizionario.
         
@@ -142,27 +375,32 @@ class TimelineClip:
             "title_pos": self.title_pos,
             "track": self.track,
             "lut": self.lut,
-            "transition": self.transition,
-            "proxy_path": self.proxy_path,
-            "speed": self.speed
-        }
+            "transition": self.transition,
+            "proxy_path": self.proxy_path,
+            "speed": self.speed
+        }
     
     @staticmethod
-    def from_dict(data: Dict[str, Any], media_items: List[MediaItem]) -> Optional['TimelineClip']:
+    def from_dict(data: Dict[str, Any], media_items) -> Optional['TimelineClip']:
         """
         Deserializza un clip da dizionario.
-        
+
         Args:
             data: Dizionario con i dati
-            media_items: Lista dei MediaItem disponibili
-            
+            media_items: Dizionario path -> MediaItem, oppure lista di
+                MediaItem (compatibilita': viene scandita linearmente)
+
         Returns:
             TimelineClip o None se il media non è trovato
         """
         media_path = data.get("media_path")
-        
-        # Cerca il MediaItem corrispondente
-        media = next((m for m in media_items if m.path == media_path), None)
+
+        # Cerca il MediaItem corrispondente: lookup O(1) con il dict,
+        # cosi' il caricamento non e' O(clip x media)
+        if isinstance(media_items, dict):
+            media = media_items.get(media_path)
+        else:
+            media = next((m for m in media_items if m.path == media_path), None)
         
         if not media:
             # Crea nuovo MediaItem se il file esiste
@@ -179,11 +417,13 @@ class TimelineClip:
         clip.title_pos = data.get("title_pos", "(w-text_w)/2")
         clip.track = int(data.get("track", 0))
         clip.lut = data.get("lut", "none")
-        clip.transition = data.get("transition", "none")
-        clip.proxy_path = data.get("proxy_path")
-        try:
-            clip.speed = float(data.get("speed", 1.0))
-        except Exception:
-            clip.speed = 1.0
-
-        return clip
+        clip.transition = data.get("transition", "none")
+        clip.proxy_path = data.get("proxy_path")
+        try:
+            clip.speed = float(data.get("speed", 1.0))
+        except Exception:
+            clip.speed = 1.0
+        if clip.speed <= 0:
+            clip.speed = 1.0
+
+        return clip
@@ -5,20 +5,40 @@ preview_worker.py
 Worker asincrono per generare preview (thumbnail e waveform) dei clip.
 """
 
+import itertools
 import os
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List
 
 from PySide6.QtCore import QObject, QRunnable, Signal, Slot
 
 from config import UIConfig
 from models import TimelineClip
-from utils import ensure_dir, generate_thumbnails, generate_waveform, generate_proxy
+from utils import generate_thumbnails, generate_waveform, generate_proxy
+
+# Pillow opzionale: scala le immagini in-process, senza pagare l'avvio
+# di un ffmpeg per una singola miniatura; in sua assenza resta ffmpeg
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+# Limite globale ai processi ffmpeg delle preview: i passi di ogni worker
+# girano in parallelo tra loro, ma il totale resta entro i core anche con
+# molti clip in coda contemporaneamente
+_ffmpeg_slots = threading.Semaphore(os.cpu_count() or 2)
+
+# Nomi progressivi per le directory dei clip: la root temporanea e' gia'
+# unica per sessione, un contatore basta ed evita una lettura di
+# /dev/urandom (uuid4) per clip
+_clip_dir_ids = itertools.count()
 
 
 class PreviewSignals(QObject):
     """Segnali emessi dal worker di preview."""
     started = Signal(object)  # Emesso quando il worker inizia (clip)
+    progress = Signal(int)  # Percentuale 0-100 a ogni passo completato
     done = Signal(object)  # Emette il TimelineClip quando pronto
 
 
@@ -66,61 +86,111 @@ class PreviewWorker(QRunnable):
         except Exception:
             pass
         media = self.clip.media
-        
+        # True se thumb/waveform del clip cambiano: in quel caso la
+        # versione preview viene incrementata prima di notificare la GUI
+        changed = False
+
         # Controlla cache waveform
         if media.path in self.wave_cache:
             cached_wave = self.wave_cache[media.path]
             if os.path.exists(cached_wave):
                 self.clip.waveform_path = cached_wave
-        
-        # Controlla cache thumbnails
+                changed = True
+
+        # Controlla cache thumbnails: una sola enumerazione della directory
+        # al posto di uno stat per file (che pesa sui filesystem di rete);
+        # per i video un numero di thumb diverso dall'atteso invalida subito
         if media.path in self.thumbs_cache:
             cached_thumbs = self.thumbs_cache[media.path]
-            if all(os.path.exists(p) for p in cached_thumbs):
+            expected_ok = (
+                media.type != "video"
+                or len(cached_thumbs) == UIConfig.THUMBNAIL_COUNT
+            )
+            if cached_thumbs and expected_ok and self._all_files_present(cached_thumbs):
                 self.clip.thumb_paths = list(cached_thumbs)
-        
+                changed = True
+
         # Se entrambi presenti nella cache, finito
         if self.clip.waveform_path and self.clip.thumb_paths:
+            if changed:
+                self.clip._thumbs_version += 1
+            self.signals.progress.emit(100)
             self.signals.done.emit(self.clip)
             return
-        
-        # Crea directory per questo clip
-        clip_dir = ensure_dir(
-            os.path.join(self.temp_root, f"clip_{uuid.uuid4().hex}")
-        )
+
+        # Passi del progresso: proxy opzionale + thumbnails + waveform
+        total_steps = (1 if self.proxy_enabled else 0) + 2
+
+        # Crea directory per questo clip: la root esiste gia', basta un
+        # singolo mkdir (ensure_dir farebbe anche l'exist-check ricorsivo)
+        clip_dir = os.path.join(self.temp_root, f"clip_{next(_clip_dir_ids)}")
+        try:
+            os.mkdir(clip_dir)
+        except FileExistsError:
+            pass
         self.clip.preview_dir = clip_dir
 
-        # If proxying is enabled, attempt to generate a proxy for faster processing
-        if self.proxy_enabled:
-            try:
-                p = generate_proxy(media.path, self.temp_root, width=self.proxy_width)
-                if p:
-                    self.proxy_path = p
-            except Exception:
-                # don't fail the whole worker if proxy generation fails
-                self.proxy_path = ""
-        
         # Parametri tempo
         start = self.clip.start or 0.0
         end = self.clip.end if self.clip.end is not None else (media.duration or 0.0)
         effective_dur = max(0.2, (end - start) if end > start else (media.duration or 0.0))
-        
-        # Genera thumbnails
+
+        # Proxy, thumbnails e waveform sono processi ffmpeg indipendenti
+        # sulla stessa sorgente: girano in parallelo su un piccolo executor
+        # (il GIL e' rilasciato nell'attesa del subprocess), contingentati
+        # dal semaforo globale. Thumbnails e waveform leggono l'originale,
+        # non il proxy ancora in corso di generazione.
+        def _job_proxy():
+            with _ffmpeg_slots:
+                return generate_proxy(media.path, self.temp_root, width=self.proxy_width)
+
+        def _job_thumbs():
+            with _ffmpeg_slots:
+                return self._generate_thumbs_from_source(media.path, clip_dir, start, effective_dur)
+
+        def _job_wave():
+            with _ffmpeg_slots:
+                return self._generate_wave_from_source(media.path, clip_dir, start, effective_dur)
+
+        jobs = {}
+        if self.proxy_enabled:
+            jobs["proxy"] = _job_proxy
         if not self.clip.thumb_paths:
-            # use proxy if available
-            source_for_thumbs = self.proxy_path or media.path
-            new_thumbs = self._generate_thumbs_from_source(source_for_thumbs, clip_dir, start, effective_dur)
-            self.clip.thumb_paths = new_thumbs
-            if new_thumbs:
-                self.thumbs_cache[media.path] = list(new_thumbs)
-        
-        # Genera waveform
+            jobs["thumbs"] = _job_thumbs
         if not self.clip.waveform_path and media.type in ("video", "audio"):
-            source_for_wave = self.proxy_path or media.path
-            wave_path = self._generate_wave_from_source(source_for_wave, clip_dir, start, effective_dur)
-            if wave_path:
-                self.clip.waveform_path = wave_path
-                self.wave_cache[media.path] = wave_path
+            jobs["wave"] = _job_wave
+
+        # Passi gia' soddisfatti dalla cache (o non applicabili) contano
+        # subito nel progresso
+        done_steps = total_steps - len(jobs)
+        if done_steps > 0:
+            self.signals.progress.emit(int(done_steps * 100 / total_steps))
+
+        if jobs:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = {executor.submit(fn): kind for kind, fn in jobs.items()}
+                for future in as_completed(futures):
+                    kind = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        result = None
+
+                    if kind == "proxy":
+                        self.proxy_path = result or ""
+                    elif kind == "thumbs":
+                        self.clip.thumb_paths = result or []
+                        if result:
+                            changed = True
+                            self.thumbs_cache[media.path] = list(result)
+                    elif kind == "wave":
+                        if result:
+                            changed = True
+                            self.clip.waveform_path = result
+                            self.wave_cache[media.path] = result
+
+                    done_steps += 1
+                    self.signals.progress.emit(int(done_steps * 100 / total_steps))
 
         # If we generated/identified a proxy, attach it to the clip for reuse
         if self.proxy_path:
@@ -129,8 +199,21 @@ class PreviewWorker(QRunnable):
             except Exception:
                 pass
 
+        if changed:
+            self.clip._thumbs_version += 1
+
         self.signals.done.emit(self.clip)
     
+    @staticmethod
+    def _all_files_present(paths: List[str]) -> bool:
+        """True se tutti i file esistono (una scandir, non uno stat l'uno)."""
+        try:
+            cache_dir = os.path.dirname(paths[0])
+            names = {entry.name for entry in os.scandir(cache_dir)}
+        except OSError:
+            return False
+        return all(os.path.basename(p) in names for p in paths)
+
     def _generate_thumbs(self, output_dir: str, start: float, duration: float) -> List[str]:
         """Genera thumbnail per video o immagini. Kept for backward compatibility."""
         return self._generate_thumbs_from_source(self.clip.media.path, output_dir, start, duration)
@@ -152,8 +235,24 @@ class PreviewWorker(QRunnable):
                 width=UIConfig.THUMBNAIL_WIDTH
             )
         elif media.type == "image":
-            from utils import run_cmd
             output_path = os.path.join(output_dir, "thumb_00.jpg")
+
+            if Image is not None:
+                try:
+                    with Image.open(source_path) as img:
+                        img.thumbnail((
+                            UIConfig.THUMBNAIL_WIDTH,
+                            UIConfig.THUMBNAIL_WIDTH * 9 // 16
+                        ))
+                        if img.mode not in ("RGB", "L"):
+                            img = img.convert("RGB")
+                        img.save(output_path, "JPEG", quality=85)
+                    return [output_path]
+                except Exception:
+                    # Formato non supportato da Pillow: sotto c'e' ffmpeg
+                    pass
+
+            from utils import run_cmd
             cmd = [
                 "ffmpeg", "-y", "-loop", "1",
                 "-i", media.path,
@@ -176,4 +275,21 @@ class PreviewWorker(QRunnable):
             duration,
             size=UIConfig.WAVEFORM_SIZE
         )
+        if success:
+            # Raccoglie i livelli mipmap scritti accanto al file base dal
+            # percorso veloce (assenti se ha lavorato showwavespic)
+            try:
+                from waveforms import MIPMAP_WIDTHS
+                base, ext = os.path.splitext(wave_path)
+                levels = {}
+                for w in MIPMAP_WIDTHS:
+                    level_path = f"{base}_w{w}{ext}"
+                    if os.path.exists(level_path):
+                        levels[w] = level_path
+                self.clip.waveform_levels = levels
+                pcm_path = f"{base}.pcm"
+                if os.path.exists(pcm_path):
+                    self.clip.waveform_pcm = pcm_path
+            except Exception:
+                pass
         return wave_path if success else None
\ No newline at end of file
@@ -6,10 +6,15 @@ Provides TextGraphicsItem for text/graphics creation and animation in the timeli
 
 from PySide6.QtWidgets import QGraphicsItem, QGraphicsTextItem
 from PySide6.QtGui import QFont, QColor, QPainter, QBrush
-from PySide6.QtCore import QRectF, QPropertyAnimation, QPointF, Qt
+from PySide6.QtCore import QRectF, QPropertyAnimation, QVariantAnimation, QPointF, Qt
 
 class TextGraphicsItem(QGraphicsTextItem):
     """Text/graphics item with animation support."""
+
+    # Pennello dello sfondo condiviso: paint gira a ogni frame e non deve
+    # riallocare QBrush/QColor identici ogni volta
+    _BG_BRUSH = QBrush(QColor(0, 0, 0, 120))
+
     def __init__(self, text, font=None, color=None, style=None, animation=None, parent=None):
         super().__init__(text, parent)
         self.setFlag(QGraphicsItem.ItemIsMovable)
@@ -22,10 +27,17 @@ class TextGraphicsItem(QGraphicsTextItem):
 
     def _init_animation(self):
         if self.animation_type == "typewriter":
-            self.setPlainText("")
+            # QVariantAnimation guida la lunghezza del testo sul timer
+            # condiviso del framework di animazione, al posto di un timer
+            # per item da 50ms che forzava un relayout a ogni tick
             self._full_text = self.toPlainText()
-            self._timer = self.scene().views()[0].startTimer(50)
-            self._char_index = 0
+            self.setPlainText("")
+            self._type_anim = QVariantAnimation()
+            self._type_anim.setStartValue(0)
+            self._type_anim.setEndValue(len(self._full_text))
+            self._type_anim.setDuration(50 * len(self._full_text))
+            self._type_anim.valueChanged.connect(self._on_typewriter_value)
+            self._type_anim.start()
         elif self.animation_type == "fade":
             self.setOpacity(0)
             self._fade_anim = QPropertyAnimation(self, b"opacity")
@@ -42,20 +54,17 @@ class TextGraphicsItem(QGraphicsTextItem):
             self._fly_anim.start()
             self.setOpacity(1)
 
-    def timerEvent(self, event):
-        if self.animation_type == "typewriter":
-            if self._char_index < len(self._full_text):
-                self.setPlainText(self._full_text[:self._char_index+1])
-                self._char_index += 1
-            else:
-                self.scene().views()[0].killTimer(self._timer)
+    def _on_typewriter_value(self, value):
+        shown = self._full_text[:int(value)]
+        if shown != self.toPlainText():
+            self.setPlainText(shown)
 
     def boundingRect(self):
         return super().boundingRect()
 
     def paint(self, painter, option, widget=None):
         painter.setRenderHint(QPainter.Antialiasing)
-        painter.setBrush(QBrush(QColor(0,0,0,120)))
+        painter.setBrush(self._BG_BRUSH)
         painter.setPen(Qt.NoPen)
         painter.drawRect(self.boundingRect())
         super().paint(painter, option, widget)
@@ -5,22 +5,109 @@ utils.py
 Funzioni utility per PyEditor: ffmpeg helpers, generazione preview, ecc.
 """
 
+import json
 import os
+import shutil
 import subprocess
-from typing import Tuple, List
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, List
+
+
+@lru_cache(maxsize=None)
+def _resolve_exe(name: str) -> str:
+    """Risolve un eseguibile sul PATH una sola volta per processo."""
+    return shutil.which(name) or name
+
+
+@lru_cache(maxsize=128)
+def resolve_lut(lut_dir: str, lut_name: str) -> Optional[str]:
+    """
+    Risolve il percorso di un file LUT, con cache per evitare uno stat
+    su disco a ogni render dello stesso LUT.
+
+    Args:
+        lut_dir: Directory contenente i file LUT
+        lut_name: Nome del file LUT
+
+    Returns:
+        Percorso completo se il file esiste, altrimenti None
+    """
+    path = os.path.join(lut_dir, lut_name)
+    return path if os.path.exists(path) else None
+
+
+def ffmpeg_filter_escape(s: str) -> str:
+    """
+    Escapa una stringa per l'uso dentro un filter graph ffmpeg.
+
+    Gestisce backslash, due punti, apici e percentuali: un titolo con
+    ':' o '%' non escapato fa fallire il parse del grafo (e quindi un
+    intero encode da ripetere).
+
+    Args:
+        s: Stringa originale (testo titolo, percorso LUT, ...)
+
+    Returns:
+        Stringa escapata per il parser lavfi
+    """
+    return (
+        str(s)
+        .replace("\\", "\\\\")
+        .replace(":", "\\:")
+        .replace("'", "\\'")
+        .replace("%", "\\%")
+    )
+
+
+@lru_cache(maxsize=256)
+def atempo_chain(v: float) -> str:
+    """
+    Scompone una velocita' in una catena di filtri atempo entro [0.5, 2.0].
+
+    Le velocita' usate in pratica sono poche (0.5, 1.5, 2.0, ...), quindi
+    il risultato viene memoizzato; il valore e' quantizzato a 4 decimali
+    per non gonfiare la cache con rumore floating point.
+
+    Args:
+        v: Fattore di velocita'
+
+    Returns:
+        Catena atempo pronta per un filtro audio ffmpeg
+    """
+    v = round(v, 4)
+    if v <= 0:
+        v = 1.0
+    chain = []
+    remaining = v
+    while remaining > 2.0:
+        chain.append("atempo=2.0")
+        remaining /= 2.0
+    while remaining < 0.5:
+        chain.append("atempo=0.5")
+        remaining *= 2.0
+    chain.append(f"atempo={remaining:.6f}")
+    return ",".join(chain)
 
 
 def run_cmd(cmd: List[str], timeout: int = 300) -> Tuple[int, str, str]:
     """
     Esegue un comando e ritorna codice di uscita, stdout e stderr.
-    
+
     Args:
         cmd: Comando da eseguire come lista
         timeout: Timeout in secondi
-        
+
     Returns:
         Tupla (codice_uscita, stdout, stderr)
     """
+    # Per ffmpeg/ffprobe: percorso assoluto in cache (evita la scansione
+    # del PATH a ogni spawn) e meno lavoro di startup per invocazione
+    if cmd and cmd[0] in ("ffmpeg", "ffprobe"):
+        head = [_resolve_exe(cmd[0]), "-hide_banner"]
+        if cmd[0] == "ffmpeg":
+            head.append("-nostdin")
+        cmd = head + cmd[1:]
+
     try:
         result = subprocess.run(
             cmd,
@@ -51,6 +138,46 @@ def ensure_dir(path: str) -> str:
     return path
 
 
+def probe_cache_file() -> str:
+    """Percorso del file di cache persistente dei probe ffprobe."""
+    return os.path.join(
+        os.path.expanduser("~"), ".cache", "pyeditor", "probe.json"
+    )
+
+
+def load_probe_cache() -> Dict[str, Optional[float]]:
+    """
+    Carica la cache dei probe da disco.
+
+    Returns:
+        Dizionario chiave -> durata (vuoto se il file manca o e' corrotto)
+    """
+    try:
+        with open(probe_cache_file(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data
+    except Exception:
+        pass
+    return {}
+
+
+def save_probe_cache(cache: Dict[str, Optional[float]]):
+    """
+    Scrive la cache dei probe su disco (best effort).
+
+    Args:
+        cache: Dizionario chiave -> durata da persistere
+    """
+    path = probe_cache_file()
+    try:
+        ensure_dir(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+    except Exception:
+        pass
+
+
 def safe_path_for_concat(path: str) -> str:
     """
     Prepara un percorso per il file concat di ffmpeg.
@@ -86,6 +213,77 @@ def format_time(seconds: float) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
+def generate_thumbnails_bytes(
+    video_path: str,
+    start: float,
+    duration: float,
+    count: int = 6,
+    width: int = 240
+) -> List[bytes]:
+    """
+    Estrae i thumbnail come JPEG in memoria via pipe MJPEG.
+
+    Un solo processo ffmpeg scrive tutti i frame su stdout con il muxer
+    image2pipe: niente apertura/chiusura di N file da parte del muxer
+    image2. I frame vengono separati sui marker JPEG FFD8/FFD9.
+
+    Args:
+        video_path: Percorso del video
+        start: Tempo di inizio (secondi)
+        duration: Durata da cui estrarre (secondi)
+        count: Numero di thumbnail da generare
+        width: Larghezza dei thumbnail
+
+    Returns:
+        Lista di buffer JPEG (vuota in caso di errore)
+    """
+    if duration <= 0 or count <= 0:
+        return []
+
+    interval = duration / max(count, 1)
+
+    from config import UIConfig
+    hw_args = ["-hwaccel", "auto"] if UIConfig.HW_PREVIEW else []
+
+    # run_cmd lavora in modalita' testo: qui serve lo stdout binario
+    cmd = [
+        "ffmpeg", "-v", "error",
+    ] + hw_args + [
+        "-ss", str(start),
+        "-t", str(duration),
+        "-i", video_path,
+        "-vf", f"fps=1/{interval:.6f},scale={width}:-2",
+        "-frames:v", str(count),
+        "-vsync", "0",
+        "-f", "image2pipe",
+        "-vcodec", "mjpeg",
+        "-"
+    ]
+
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=10 * count)
+    except Exception:
+        return []
+
+    if proc.returncode != 0 or not proc.stdout:
+        return []
+
+    frames: List[bytes] = []
+    data = proc.stdout
+    pos = 0
+    while len(frames) < count:
+        s = data.find(b"\xff\xd8", pos)
+        if s < 0:
+            break
+        e = data.find(b"\xff\xd9", s + 2)
+        if e < 0:
+            break
+        frames.append(data[s:e + 2])
+        pos = e + 2
+
+    return frames
+
+
 def generate_thumbnails(
     video_path: str,
     output_dir: str,
@@ -109,17 +307,65 @@ def generate_thumbnails(
         Lista di percorsi ai thumbnail generati
     """
     thumb_paths = []
-    
+
     if duration <= 0 or count <= 0:
         return thumb_paths
-    
+
     # Calcola l'intervallo tra i thumbnail
     interval = duration / max(count, 1)
-    
+
+    # Percorso preferito: pipe MJPEG e scrittura dei JPEG da Python.
+    # I file su disco restano necessari alle cache e al ricaricamento
+    # dei progetti, ma li scrive un'unica passata bufferizzata
+    frames = generate_thumbnails_bytes(video_path, start, duration, count, width)
+    if frames:
+        try:
+            for i, buf in enumerate(frames):
+                output_path = os.path.join(output_dir, f"thumb_{i:02d}.jpg")
+                with open(output_path, "wb") as f:
+                    f.write(buf)
+                thumb_paths.append(output_path)
+            return thumb_paths
+        except OSError:
+            thumb_paths = []
+
+    # Un solo processo ffmpeg per tutte le miniature: il filtro fps
+    # campiona un frame ogni `interval` secondi in un'unica passata di
+    # decodifica, invece di N spawn con N seek e init del decoder
+    pattern = os.path.join(output_dir, "thumb_%02d.jpg")
+    # Decodifica hardware se disponibile: ffmpeg sceglie da solo il
+    # backend e ripiega in software se il codec non e' supportato
+    from config import UIConfig
+    hw_args = ["-hwaccel", "auto"] if UIConfig.HW_PREVIEW else []
+    cmd = [
+        "ffmpeg", "-y",
+    ] + hw_args + [
+        "-ss", str(start),
+        "-t", str(duration),
+        "-i", video_path,
+        "-vf", f"fps=1/{interval:.6f},scale={width}:-2",
+        "-frames:v", str(count),
+        "-vsync", "0",
+        "-start_number", "0",
+        pattern
+    ]
+
+    code, _, _ = run_cmd(cmd, timeout=10 * count)
+
+    if code == 0:
+        for i in range(count):
+            output_path = os.path.join(output_dir, f"thumb_{i:02d}.jpg")
+            if os.path.exists(output_path):
+                thumb_paths.append(output_path)
+        if thumb_paths:
+            return thumb_paths
+
+    # Fallback: estrazione frame per frame come in passato (sorgenti che
+    # non reggono la passata unica, es. stream con timestamp rotti)
     for i in range(count):
         timestamp = start + (i * interval)
         output_path = os.path.join(output_dir, f"thumb_{i:02d}.jpg")
-        
+
         cmd = [
             "ffmpeg", "-y",
             "-ss", str(timestamp),
@@ -128,12 +374,12 @@ def generate_thumbnails(
             "-vf", f"scale={width}:-2",
             output_path
         ]
-        
+
         code, _, _ = run_cmd(cmd, timeout=10)
-        
+
         if code == 0 and os.path.exists(output_path):
             thumb_paths.append(output_path)
-    
+
     return thumb_paths
 
 
@@ -157,8 +403,17 @@ def generate_waveform(
     Returns:
         True se la generazione ha successo
     """
+    # Percorso veloce: kernel numpy/numba (vedi waveforms.py), molto piu'
+    # rapido del filtro showwavespic; in caso di problemi si ripiega sotto
+    try:
+        from waveforms import generate_waveform_fast
+        if generate_waveform_fast(media_path, output_path, start, duration, size):
+            return True
+    except Exception:
+        pass
+
     width, height = size
-    
+
     cmd = [
         "ffmpeg", "-y",
         "-ss", str(start),
@@ -195,21 +450,35 @@ def generate_proxy(
     if os.path.exists(proxy_path):
         return proxy_path
 
-    # Use ffmpeg to create a proxy with lower resolution and codec settings
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", media_path,
-        "-vf", f"scale={width}:-2",
-        "-c:v", "libx264",
-        "-preset", "veryfast",
-        "-crf", "28",
-        "-c:a", "aac",
-        "-b:a", audio_bitrate,
-        proxy_path
-    ]
+    # Encoder hardware se rilevato (la qualita' del proxy non e'
+    # critica, la velocita' si'); con PYEDITOR_HW_PREVIEW=0 o senza
+    # encoder hardware si usa il solito libx264
+    from config import FFmpegConfig, UIConfig
+    software_args = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "28"]
+    if UIConfig.HW_PREVIEW:
+        video_args = FFmpegConfig.video_encoder_args(preset="veryfast", crf=28)
+    else:
+        video_args = software_args
+
+    def _encode(args):
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", media_path,
+            "-vf", f"scale={width}:-2",
+        ] + args + [
+            "-c:a", "aac",
+            "-b:a", audio_bitrate,
+            proxy_path
+        ]
+        code, _, _ = run_cmd(cmd, timeout=300)
+        return code == 0 and os.path.exists(proxy_path)
+
+    if _encode(video_args):
+        return proxy_path
 
-    code, _, _ = run_cmd(cmd, timeout=300)
-    if code == 0 and os.path.exists(proxy_path):
+    # L'encoder hardware puo' rifiutare risoluzioni o pixel format
+    # particolari: ritenta in software prima di arrendersi
+    if video_args is not software_args and _encode(software_args):
         return proxy_path
 
     return ""
\ No newline at end of file
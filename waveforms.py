@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+waveforms.py
+
+Generazione waveform con kernel NumPy/Numba: decodifica PCM via ffmpeg e
+riduzione min/max per colonna scritta direttamente in un buffer RGBA.
+Percorso veloce opzionale rispetto al filtro showwavespic di ffmpeg.
+"""
+
+import os
+import subprocess
+from typing import Dict, Optional, Tuple
+
+# Dipendenze opzionali: senza numpy si ripiega su showwavespic in utils
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from numba import njit, prange
+except Exception:
+    njit = None
+    prange = range
+
+# Colori coerenti con il filtro showwavespic usato finora
+_FG = (0x44, 0x88, 0xFF, 0xFF)
+_BG = (0x16, 0x16, 0x16, 0xFF)
+
+# Larghezze dei livelli mipmap scritti accanto alla waveform base: la
+# timeline sceglie il piu' piccolo >= ai pixel da disegnare, cosi' il
+# resample in paint parte da un'immagine gia' vicina alla scala giusta
+MIPMAP_WIDTHS = (256, 1024, 4096)
+
+
+def decode_pcm(
+    media_path: str,
+    start: float,
+    duration: float,
+    rate: int = 8000
+) -> Optional["np.ndarray"]:
+    """
+    Decodifica l'audio in PCM mono int16 tramite ffmpeg.
+
+    Args:
+        media_path: Percorso del file media
+        start: Tempo di inizio (secondi)
+        duration: Durata (secondi)
+        rate: Sample rate di decodifica (basso: serve solo per il disegno)
+
+    Returns:
+        Array int16 dei campioni, o None in caso di errore
+    """
+    if np is None:
+        return None
+
+    # run_cmd lavora in modalita' testo: qui serve lo stdout binario
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-ss", str(start),
+        "-t", str(duration),
+        "-i", media_path,
+        "-f", "s16le",
+        "-ac", "1",
+        "-ar", str(rate),
+        "-"
+    ]
+
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=60)
+    except Exception:
+        return None
+
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+
+    return np.frombuffer(proc.stdout, dtype=np.int16)
+
+
+if njit is not None and np is not None:
+    @njit(parallel=True, cache=True)
+    def _fill_columns(samples, out, w, h):  # pragma: no cover - JIT
+        n = samples.shape[0]
+        step = n / w
+        for x in prange(w):
+            s0 = int(x * step)
+            s1 = int((x + 1) * step)
+            if s1 <= s0:
+                s1 = s0 + 1
+            if s1 > n:
+                s1 = n
+
+            mn = samples[s0]
+            mx = samples[s0]
+            for i in range(s0, s1):
+                v = samples[i]
+                if v < mn:
+                    mn = v
+                if v > mx:
+                    mx = v
+
+            y0 = int((1.0 - (mx / 32768.0 + 1.0) / 2.0) * (h - 1))
+            y1 = int((1.0 - (mn / 32768.0 + 1.0) / 2.0) * (h - 1))
+            for y in range(y0, y1 + 1):
+                out[y, x, 0] = 0x44
+                out[y, x, 1] = 0x88
+                out[y, x, 2] = 0xFF
+                out[y, x, 3] = 0xFF
+else:
+    _fill_columns = None
+
+
+def build_waveform_rgba(samples: "np.ndarray", w: int, h: int) -> "np.ndarray":
+    """
+    Costruisce l'immagine RGBA della waveform (min/max per colonna).
+
+    Usa il kernel numba parallelo se disponibile, altrimenti una
+    riduzione numpy vettorizzata.
+
+    Args:
+        samples: Campioni PCM int16 mono
+        w: Larghezza in pixel
+        h: Altezza in pixel
+
+    Returns:
+        Array uint8 di shape (h, w, 4)
+    """
+    out = np.empty((h, w, 4), dtype=np.uint8)
+    out[:, :] = _BG
+
+    if samples.size == 0:
+        return out
+
+    if _fill_columns is not None:
+        _fill_columns(samples, out, w, h)
+        return out
+
+    # Fallback numpy: pad a multiplo di w, reshape e min/max per colonna
+    n = samples.size
+    per_col = max(1, -(-n // w))
+    padded = np.zeros(per_col * w, dtype=np.int16)
+    padded[:n] = samples
+    cols = padded.reshape(w, per_col)
+
+    mx = cols.max(axis=1).astype(np.float64)
+    mn = cols.min(axis=1).astype(np.float64)
+    y0 = ((1.0 - (mx / 32768.0 + 1.0) / 2.0) * (h - 1)).astype(np.int64)
+    y1 = ((1.0 - (mn / 32768.0 + 1.0) / 2.0) * (h - 1)).astype(np.int64)
+
+    ys = np.arange(h).reshape(h, 1)
+    mask = (ys >= y0) & (ys <= y1)
+    out[mask] = _FG
+    return out
+
+
+def generate_waveform_fast(
+    media_path: str,
+    output_path: str,
+    start: float,
+    duration: float,
+    size: Tuple[int, int] = (1000, 100)
+) -> bool:
+    """
+    Genera l'immagine della waveform con il kernel numpy/numba.
+
+    Args:
+        media_path: Percorso del file media
+        output_path: Percorso dell'immagine di output
+        start: Tempo di inizio (secondi)
+        duration: Durata (secondi)
+        size: Dimensioni (larghezza, altezza)
+
+    Returns:
+        True se la generazione ha successo
+    """
+    if np is None:
+        return False
+
+    samples = decode_pcm(media_path, start, duration)
+    if samples is None or samples.size == 0:
+        return False
+
+    w, h = size
+    rgba = build_waveform_rgba(samples, w, h)
+
+    # QImage e' utilizzabile anche fuori dal thread GUI (QPixmap no)
+    from PySide6.QtGui import QImage
+
+    img = QImage(rgba.data, w, h, w * 4, QImage.Format_RGBA8888)
+    if not img.save(output_path, "PNG"):
+        return False
+
+    # Livelli mipmap dalla stessa decodifica PCM: la riduzione min/max
+    # per colonna e' economica, il costo vero era il decode gia' pagato
+    build_waveform_mipmaps(samples, output_path, h)
+
+    # Spill del PCM grezzo accanto alla waveform: permette di renderizzare
+    # larghezze arbitrarie (zoom oltre il mipmap piu' grande) rimappando
+    # il file, senza mai rilanciare ffmpeg
+    try:
+        base, _ = os.path.splitext(output_path)
+        samples.tofile(f"{base}.pcm")
+    except Exception:
+        pass
+
+    return True
+
+
+def render_waveform_from_pcm(
+    pcm_path: str,
+    width: int,
+    height: int
+) -> Optional["QImage"]:
+    """
+    Renderizza la waveform a una larghezza arbitraria dal PCM spillato.
+
+    Il file viene mappato in memoria con np.memmap: nessuna nuova
+    decodifica ffmpeg, solo la riduzione min/max vettorizzata alla
+    larghezza richiesta.
+
+    Args:
+        pcm_path: Percorso del file PCM int16 mono (vedi lo spill in
+            generate_waveform_fast)
+        width: Larghezza in pixel
+        height: Altezza in pixel
+
+    Returns:
+        QImage della waveform, o None se numpy manca o il file non e'
+        leggibile
+    """
+    if np is None:
+        return None
+
+    try:
+        samples = np.memmap(pcm_path, dtype=np.int16, mode="r")
+    except (OSError, ValueError):
+        return None
+
+    if samples.size == 0:
+        return None
+
+    rgba = build_waveform_rgba(samples, int(width), int(height))
+
+    from PySide6.QtGui import QImage
+
+    img = QImage(rgba.data, int(width), int(height), int(width) * 4,
+                 QImage.Format_RGBA8888)
+    # QImage non possiede il buffer numpy: serve una copia che sopravviva
+    return img.copy()
+
+
+def build_waveform_mipmaps(
+    samples: "np.ndarray",
+    base_path: str,
+    height: int,
+    widths: Tuple[int, ...] = MIPMAP_WIDTHS
+) -> Dict[int, str]:
+    """
+    Scrive i livelli mipmap della waveform accanto al file base.
+
+    Args:
+        samples: Campioni PCM int16 mono gia' decodificati
+        base_path: Percorso della waveform base (es. .../wave.png)
+        height: Altezza in pixel dei livelli
+        widths: Larghezze dei livelli da generare
+
+    Returns:
+        Dizionario larghezza -> percorso dei livelli scritti
+    """
+    from PySide6.QtGui import QImage
+
+    base, ext = os.path.splitext(base_path)
+    out: Dict[int, str] = {}
+
+    for w in widths:
+        try:
+            rgba = build_waveform_rgba(samples, w, height)
+            img = QImage(rgba.data, w, height, w * 4, QImage.Format_RGBA8888)
+            level_path = f"{base}_w{w}{ext}"
+            if img.save(level_path, "PNG"):
+                out[w] = level_path
+        except Exception:
+            continue
+
+    return out
@@ -43,7 +43,7 @@ class MediaListWidget(QListWidget):
         
         # Crea mime data con il percorso del file
         mime_data = QMimeData()
-        mime_data.setData("application/x-media-path", media_item.path.encode("utf-8"))
+        mime_data.setData("application/x-media-path", media_item._path_utf8)
         mime_data.setText(media_item.path)
         
         # Crea e avvia il drag